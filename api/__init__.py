@@ -6,5 +6,7 @@ from .auth import auth_bp
 from .empresa import empresa_bp
 from .cola import cola_bp
 from .cola_config import cola_config_bp
+from .internal import internal_bp
+from .sse import sse_bp
 
-__all__ = ['auth_bp', 'empresa_bp', 'cola_bp', 'cola_config_bp']
+__all__ = ['auth_bp', 'empresa_bp', 'cola_bp', 'cola_config_bp', 'internal_bp', 'sse_bp']
@@ -1,8 +1,27 @@
 from flask import Blueprint, request, jsonify
 from services.auth_service import add_user, validate_user
+from core.sesiones import emitir_token
+from core.contrasenas import PoolSaturado
+from core.limites import consumir, respuesta_limitada
+from core.proxy import ip_cliente
+from config import get_config
 
 auth_bp = Blueprint('auth', __name__)
 
+def _limitar_intentos(email):
+    """Segundos a esperar si la IP o el email agotaron sus intentos (0 si no)"""
+    config = get_config()
+    espera = consumir('login-ip', ip_cliente(), config.LOGIN_POR_MINUTO_IP / 60, config.LOGIN_RAFAGA_IP)
+    if not espera and email:
+        espera = consumir('login-email', email.lower(), config.LOGIN_POR_MINUTO_EMAIL / 60, config.LOGIN_RAFAGA_EMAIL)
+    return espera
+
+def _saturado():
+    respuesta = jsonify({'message': 'Servidor ocupado, intenta de nuevo'})
+    respuesta.status_code = 503
+    respuesta.headers['Retry-After'] = '1'
+    return respuesta
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.json
@@ -13,7 +32,19 @@ def register():
     if not username or not email or not password:
         return jsonify({'message': 'Todos los campos son requeridos'}), 400
 
-    if add_user(username, email, password):
+    espera = _limitar_intentos(None)
+    if espera:
+        return respuesta_limitada(espera)
+
+    try:
+        creado = add_user(username, email, password)
+    except PoolSaturado:
+        return _saturado()
+
+    if creado is None:
+        # Error transitorio de la BD: no es lo mismo que un usuario repetido
+        return _saturado()
+    if creado:
         return jsonify({'message': 'Usuario registrado exitosamente'}), 201
     else:
         return jsonify({'message': 'El usuario ya existe'}), 400
@@ -28,7 +59,18 @@ def login():
     if not username or not password:
         return jsonify({'message': 'Todos los campos son requeridos'}), 400
 
-    if validate_user(username, password):
-        return jsonify({'message': 'Inicio de sesión exitoso'}), 200
+    espera = _limitar_intentos(username)
+    if espera:
+        return respuesta_limitada(espera)
+
+    try:
+        valido = validate_user(username, password)
+    except PoolSaturado:
+        return _saturado()
+
+    if valido:
+        # Las peticiones siguientes se autentican con el token, sin repetir bcrypt
+        token, expira = emitir_token(username)
+        return jsonify({'message': 'Inicio de sesión exitoso', 'token': token, 'expira': expira}), 200
     else:
         return jsonify({'message': 'Credenciales inválidas'}), 401
@@ -1,16 +1,32 @@
 from flask import Blueprint, request, jsonify
 from services.cola_service import agregar_turno, siguiente_turno, obtener_turnos, eliminar_cola, obtener_turno_actual, obtener_posicion_turno, buscar_turno_global, obtener_estadisticas_cola
+from services.cola_config_service import obtener_configuracion, obtener_categoria
+from services.auth_service import obtener_propietario_empresa
+from core.longpoll import esperar_cambio_cola, esperar_cambio_empresa, colas_cambiadas
+from core.snapshots import snapshot_cola
+from core.llamadas import recientes_empresa
+from core.sesiones import requiere_sesion
+from core.limites import limitar_mutacion
+from config import get_config
 import uuid
 import json
 
 cola_bp = Blueprint('cola', __name__)
 
+def _parametros_longpoll():
+    """Lee la versión conocida por el cliente y el timeout de espera"""
+    config = get_config()
+    version = request.args.get("version", type=int)
+    timeout = request.args.get("timeout", config.LONGPOLL_TIMEOUT_SEGUNDOS, type=float)
+    return version, max(0, min(timeout, config.LONGPOLL_TIMEOUT_MAXIMO))
+
 @cola_bp.route('/proyectos/<id_empresa>/cola/<id_cola>', methods=['GET'])
 def api_obtener_turnos(id_empresa, id_cola):
     turnos = obtener_turnos(id_empresa, id_cola)
     return jsonify({"turnos": turnos})
 
 @cola_bp.route('/proyectos/<id_empresa>/cola/<id_cola>', methods=['POST'])
+@limitar_mutacion()
 def api_agregar_turno(id_empresa, id_cola):
     data = request.get_json()
     turno = {
@@ -23,6 +39,8 @@ def api_agregar_turno(id_empresa, id_cola):
     return jsonify({"error": "No se pudo agregar el turno"}), 400
 
 @cola_bp.route('/proyectos/<id_empresa>/cola/<id_cola>/siguiente', methods=['POST'])
+@requiere_sesion(empresa='id_empresa')
+@limitar_mutacion()
 def api_siguiente_turno(id_empresa, id_cola):
     turno = siguiente_turno(id_empresa, id_cola)
     if turno:
@@ -30,6 +48,8 @@ def api_siguiente_turno(id_empresa, id_cola):
     return jsonify({"mensaje": "No hay turnos"}), 404
 
 @cola_bp.route('/proyectos/<id_empresa>/cola/<id_cola>', methods=['DELETE'])
+@requiere_sesion(empresa='id_empresa')
+@limitar_mutacion()
 def api_eliminar_cola(id_empresa, id_cola):
     if eliminar_cola(id_empresa, id_cola):
         return jsonify({"message": "Cola eliminada correctamente"})
@@ -58,6 +78,59 @@ def api_estadisticas_cola(id_empresa, id_cola):
     estadisticas = obtener_estadisticas_cola(id_empresa, id_cola)
     return jsonify(estadisticas)
 
+@cola_bp.route('/proyectos/<id_empresa>/cola/<id_cola>/cambios', methods=['GET'])
+def api_esperar_cambios_cola(id_empresa, id_cola):
+    # Una espera sobre una cola inexistente solo ocuparía la conexión hasta el timeout
+    if obtener_categoria(id_empresa, id_cola) is None:
+        return jsonify({"message": "Cola no encontrada"}), 404
+    version, timeout = _parametros_longpoll()
+    nueva_version = esperar_cambio_cola(id_empresa, id_cola, version, timeout)
+    if nueva_version == version:
+        return jsonify({"version": nueva_version, "cambios": False})
+
+    # Todos los clientes despertados por el mismo cambio comparten una lectura de la BD
+    snapshot = snapshot_cola(id_empresa, id_cola)
+    return jsonify({
+        "version": nueva_version,
+        "cambios": True,
+        "turnos": snapshot["turnos"],
+        "turnoActual": snapshot["turnoActual"]
+    })
+
+@cola_bp.route('/proyectos/<id_empresa>/cambios', methods=['GET'])
+def api_esperar_cambios_empresa(id_empresa):
+    if obtener_propietario_empresa(id_empresa) is None:
+        return jsonify({"message": "Empresa no encontrada"}), 404
+    version, timeout = _parametros_longpoll()
+    nueva_version = esperar_cambio_empresa(id_empresa, version, timeout)
+    if nueva_version == version:
+        return jsonify({"version": nueva_version, "cambios": False})
+
+    existentes = {c["id"] for c in obtener_configuracion(id_empresa)["categorias"]}
+
+    # Sin versión válida (primera petición o BD restaurada) se envían todas las colas
+    if version is None or version > nueva_version:
+        cambiadas = existentes
+    else:
+        cambiadas = set(colas_cambiadas(id_empresa, version))
+
+    colas = {}
+    for cola_id in cambiadas & existentes:
+        snapshot = snapshot_cola(id_empresa, cola_id)
+        colas[cola_id] = {"turnos": snapshot["turnos"], "turnoActual": snapshot["turnoActual"]}
+    return jsonify({
+        "version": nueva_version,
+        "cambios": True,
+        "colas": colas,
+        "eliminadas": sorted(cambiadas - existentes)
+    })
+
+@cola_bp.route('/proyectos/<id_empresa>/llamadas', methods=['GET'])
+def api_llamadas_recientes(id_empresa):
+    """Últimas llamadas de todas las colas de la empresa para pantallas de sala de espera"""
+    limite = request.args.get("limite", type=int)
+    return jsonify({"llamadas": recientes_empresa(id_empresa, limite)})
+
 @cola_bp.route('/verificar-global', methods=['GET'])
 def verificar_global():
     codigo = request.args.get("codigo")
@@ -9,6 +9,7 @@ from services.cola_config_service import (
     obtener_categorias_resumen,
     resetear_contador_categoria
 )
+from core.sesiones import requiere_sesion
 
 cola_config_bp = Blueprint("cola_config", __name__)
 
@@ -17,6 +18,7 @@ def get_config(empresa_id):
     return jsonify(obtener_configuracion(empresa_id))
 
 @cola_config_bp.route("/configuracion/<empresa_id>", methods=["POST"])
+@requiere_sesion(empresa='empresa_id')
 def save_config(empresa_id):
     config_data = request.get_json()
     exito, mensaje = guardar_configuracion_empresa(empresa_id, config_data)
@@ -25,6 +27,7 @@ def save_config(empresa_id):
     return jsonify({"error": mensaje}), 400
 
 @cola_config_bp.route("/configuracion/<empresa_id>/categorias", methods=["POST"])
+@requiere_sesion(empresa='empresa_id')
 def add_categoria(empresa_id):
     categoria_data = request.get_json()
     categoria, mensaje = agregar_categoria(empresa_id, categoria_data)
@@ -33,6 +36,7 @@ def add_categoria(empresa_id):
     return jsonify({"error": mensaje}), 400
 
 @cola_config_bp.route("/configuracion/<empresa_id>/categorias/<categoria_id>", methods=["PUT"])
+@requiere_sesion(empresa='empresa_id')
 def update_categoria(empresa_id, categoria_id):
     categoria_data = request.get_json()
     exito, mensaje = actualizar_categoria(empresa_id, categoria_id, categoria_data)
@@ -41,6 +45,7 @@ def update_categoria(empresa_id, categoria_id):
     return jsonify({"error": mensaje}), 400
 
 @cola_config_bp.route("/configuracion/<empresa_id>/categorias/<categoria_id>", methods=["DELETE"])
+@requiere_sesion(empresa='empresa_id')
 def delete_categoria(empresa_id, categoria_id):
     exito, mensaje = eliminar_categoria(empresa_id, categoria_id)
     if exito:
@@ -60,6 +65,7 @@ def get_resumen(empresa_id):
     return jsonify({"categorias": categorias})
 
 @cola_config_bp.route("/configuracion/<empresa_id>/categorias/<categoria_id>/resetear-contador", methods=["POST"])
+@requiere_sesion(empresa='empresa_id')
 def reset_contador(empresa_id, categoria_id):
     exito, mensaje = resetear_contador_categoria(empresa_id, categoria_id)
     if exito:
@@ -1,10 +1,12 @@
 from flask import Blueprint, jsonify, request
 from services.auth_service import get_user_projects, add_user_project, get_user_project_by_id, update_user_project, delete_user_project
+from core.sesiones import requiere_sesion
 
 
 empresa_bp = Blueprint('empresa', __name__)
 
 @empresa_bp.route('/usuarios/<correo>/proyectos', methods=['GET'])
+@requiere_sesion(usuario='correo')
 def obtener_empresas(correo):
     proyectos = get_user_projects(correo)
     if proyectos is None:
@@ -12,6 +14,7 @@ def obtener_empresas(correo):
     return jsonify({'empresas': proyectos})
 
 @empresa_bp.route('/usuarios/<correo>/proyectos', methods=['POST'])
+@requiere_sesion(usuario='correo')
 def agregar_empresa(correo):
     data = request.get_json()
     exito, resultado = add_user_project(correo, data)
@@ -20,6 +23,7 @@ def agregar_empresa(correo):
     return jsonify({'message': 'Proyecto creado exitosamente', 'empresa': resultado}), 201
 
 @empresa_bp.route('/usuarios/<correo>/proyectos/<proyecto_id>', methods=['GET'])
+@requiere_sesion(usuario='correo')
 def obtener_empresa_por_id(correo, proyecto_id):
     proyecto = get_user_project_by_id(correo, proyecto_id)
     if not proyecto:
@@ -27,6 +31,7 @@ def obtener_empresa_por_id(correo, proyecto_id):
     return jsonify({'empresa': proyecto})
 
 @empresa_bp.route('/usuarios/<correo>/proyectos/<proyecto_id>', methods=['PUT'])
+@requiere_sesion(usuario='correo')
 def actualizar_empresa(correo, proyecto_id):
     data = request.get_json()
     exito, resultado = update_user_project(correo, proyecto_id, data)
@@ -35,6 +40,7 @@ def actualizar_empresa(correo, proyecto_id):
     return jsonify({"message": "Actualizado correctamente"})
 
 @empresa_bp.route('/usuarios/<correo>/proyectos/<proyecto_id>', methods=['DELETE'])
+@requiere_sesion(usuario='correo')
 def eliminar_empresa(correo, proyecto_id):
     exito, resultado = delete_user_project(correo, proyecto_id)
     if not exito:
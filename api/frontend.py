@@ -0,0 +1,89 @@
+"""
+Frontend compilado (dist/), servido opcionalmente por el backend
+Solo se registra con SERVIR_FRONTEND=1; en producción normalmente lo sirve
+el proxy. Los assets con hash en el nombre (index-BGMYLn1n.js) no cambian
+nunca y se cachean un año como immutable; index.html se revalida siempre.
+
+Si junto a un archivo existen variantes precomprimidas (app.js.br,
+app.js.gz, generadas con scripts/comprimir_dist.py) se envía la mejor que
+acepte el cliente, sin comprimir nada en cada petición. send_file entrega
+el archivo con wsgi.file_wrapper, que gunicorn resuelve con sendfile().
+"""
+import mimetypes
+import os
+import re
+from flask import Blueprint, send_file, abort
+from werkzeug.security import safe_join
+from core.compresion import acepta
+from config import get_config
+
+frontend_bp = Blueprint('frontend', __name__)
+
+# Assets generados por Vite: nombre-<hash de 8 caracteres>.ext
+_CON_HASH = re.compile(r'-[A-Za-z0-9_-]{8}\.[a-z0-9]+$')
+
+# Codificaciones precomprimidas por orden de preferencia
+_VARIANTES = (('br', '.br'), ('gzip', '.gz'))
+
+# Variantes disponibles por archivo: ruta -> [(codificación, ruta variante)]
+_variantes = {}
+
+def _directorio():
+    return os.path.abspath(get_config().FRONTEND_DIR)
+
+def _variantes_de(ruta):
+    """Variantes precomprimidas de un archivo (se consultan al disco una vez)"""
+    variantes = _variantes.get(ruta)
+    if variantes is None:
+        variantes = _variantes[ruta] = [
+            (codificacion, ruta + extension)
+            for codificacion, extension in _VARIANTES
+            if os.path.isfile(ruta + extension)
+        ]
+    return variantes
+
+def servir_archivo(relativa):
+    """Envía un archivo de dist/ con caché y, si se puede, precomprimido"""
+    ruta = safe_join(_directorio(), relativa)
+    if ruta is None or not os.path.isfile(ruta):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(ruta)[0] or 'application/octet-stream'
+    enviar, codificacion = ruta, None
+    for candidata, variante in _variantes_de(ruta):
+        if acepta(candidata):
+            enviar, codificacion = variante, candidata
+            break
+
+    inmutable = _CON_HASH.search(relativa) is not None
+    respuesta = send_file(
+        enviar,
+        mimetype=mimetype,
+        conditional=True,
+        max_age=get_config().FRONTEND_CACHE_SEGUNDOS if inmutable else 0
+    )
+    if inmutable:
+        respuesta.cache_control.immutable = True
+    else:
+        respuesta.cache_control.no_cache = True
+    if codificacion:
+        respuesta.headers['Content-Encoding'] = codificacion
+    if _variantes_de(ruta):
+        respuesta.vary.add('Accept-Encoding')
+    return respuesta
+
+def servir_index():
+    return servir_archivo('index.html')
+
+@frontend_bp.route('/assets/<path:ruta>')
+def assets(ruta):
+    return servir_archivo(f"assets/{ruta}")
+
+@frontend_bp.route('/<path:ruta>')
+def spa(ruta):
+    """Archivos de la raíz de dist/ y, para el resto, index.html (rutas de React)"""
+    if ruta.startswith(('api/', 'socket.io/')):
+        abort(404)
+    if os.path.isfile(os.path.join(_directorio(), ruta)):
+        return servir_archivo(ruta)
+    return servir_index()
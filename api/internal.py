@@ -0,0 +1,157 @@
+from flask import Blueprint, request, jsonify, send_from_directory
+from core import connections, backpressure, snapshots, tickets, sse, hilos, sesiones, contrasenas, limites, compresion, registro, perfil_db, perfilador, memoria
+from config import get_config
+import hmac
+import os
+import time
+
+internal_bp = Blueprint('internal', __name__)
+
+@internal_bp.before_request
+def verificar_acceso_interno():
+    """Exige el token interno (X-Internal-Token o Authorization: Bearer)
+
+    localhost solo entra sin token con INTERNAL_CONFIAR_LOCALHOST: detrás de
+    un proxy todas las peticiones llegan desde 127.0.0.1.
+    """
+    config = get_config()
+    if config.INTERNAL_CONFIAR_LOCALHOST and request.remote_addr in ('127.0.0.1', '::1'):
+        return None
+
+    token = config.INTERNAL_TOKEN
+    enviado = request.headers.get('X-Internal-Token') or sesiones.token_de_peticion() or ''
+    if token and hmac.compare_digest(enviado, token):
+        return None
+
+    return jsonify({'message': 'No autorizado'}), 403
+
+@internal_bp.route('/ws-stats', methods=['GET'])
+def ws_stats():
+    estadisticas = connections.estadisticas()
+    estadisticas['backpressure'] = backpressure.estadisticas()
+    estadisticas['snapshots'] = snapshots.estadisticas()
+    estadisticas['tickets'] = tickets.estadisticas()
+    estadisticas['sse'] = sse.estadisticas()
+    estadisticas['hilos'] = hilos.estadisticas()
+    estadisticas['sesiones'] = sesiones.estadisticas()
+    estadisticas['bcrypt'] = contrasenas.estadisticas()
+    estadisticas['limites'] = limites.estadisticas()
+    estadisticas['compresion'] = compresion.estadisticas()
+    estadisticas['registro'] = registro.estadisticas()
+    return jsonify(estadisticas)
+
+@internal_bp.route('/db-perfil', methods=['GET'])
+def db_perfil():
+    """Tiempos de SQLite por función de servicio y consultas lentas (DB_PERFIL=1)"""
+    resumen = perfil_db.resumen(limite=request.args.get('limite', 20, type=int))
+    if request.args.get('reiniciar') == '1':
+        perfil_db.reiniciar()
+    return jsonify(resumen)
+
+@internal_bp.route('/perfil', methods=['GET'])
+def perfil_estado():
+    """Peticiones armadas, estado del muestreador y perfiles guardados"""
+    return jsonify(perfilador.estado())
+
+def _entero(data, clave, minimo, maximo):
+    """Lee un entero del body limitado a maximo; None si falta, ValueError si no es válido"""
+    valor = data.get(clave)
+    if valor is None:
+        return None
+    if not isinstance(valor, int) or isinstance(valor, bool) or valor < minimo:
+        raise ValueError(f"'{clave}' debe ser un entero mayor o igual que {minimo}")
+    return min(valor, maximo)
+
+@internal_bp.route('/perfil', methods=['POST'])
+def perfil_armar():
+    """Arma cProfile para las próximas peticiones y/o arranca el muestreador
+
+    Body: {"peticiones": 5, "ruta": "/api/proyectos", "muestreo_segundos": 60}
+    Los valores se limitan a PERFIL_PETICIONES_MAX y PERFIL_MUESTREO_MAX_SEGUNDOS.
+    """
+    config = get_config()
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({'message': 'El body debe ser un objeto JSON'}), 400
+
+    # Se valida todo antes de actuar: un body inválido no arma nada a medias
+    try:
+        peticiones = _entero(data, 'peticiones', 0, config.PERFIL_PETICIONES_MAX)
+        segundos = _entero(data, 'muestreo_segundos', 1, config.PERFIL_MUESTREO_MAX_SEGUNDOS)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    ruta = data.get('ruta', '')
+    if not isinstance(ruta, str):
+        return jsonify({'message': "'ruta' debe ser texto"}), 400
+
+    if peticiones is not None:
+        perfilador.armar(peticiones, ruta)
+    if segundos is not None:
+        perfilador.iniciar_muestreo(segundos)
+    if data.get('detener_muestreo'):
+        perfilador.detener_muestreo()
+    return jsonify(perfilador.estado())
+
+@internal_bp.route('/perfil/token', methods=['POST'])
+def perfil_token():
+    """Token para perfilar peticiones concretas con la cabecera X-Perfil"""
+    token, expira = perfilador.emitir_token()
+    return jsonify({'token': token, 'expira': expira})
+
+@internal_bp.route('/perfil/<nombre>', methods=['GET'])
+def perfil_archivo(nombre):
+    return send_from_directory(os.path.abspath(get_config().PERFIL_DIR), nombre, as_attachment=True)
+
+@internal_bp.route('/memoria', methods=['GET'])
+def memoria_estado():
+    """RSS, memoria seguida por tracemalloc e instantáneas guardadas"""
+    return jsonify(memoria.estado())
+
+@internal_bp.route('/memoria/tracemalloc', methods=['POST'])
+def memoria_tracemalloc():
+    """Arranca o detiene tracemalloc. Body: {"activo": true, "marcos": 1}"""
+    data = request.get_json(silent=True) or {}
+    if data.get('activo', True):
+        return jsonify(memoria.iniciar(data.get('marcos')))
+    return jsonify(memoria.detener())
+
+@internal_bp.route('/memoria/instantaneas', methods=['POST'])
+def memoria_instantanea():
+    """Toma una instantánea con nombre. Body: {"nombre": "antes"}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(memoria.instantanea(data.get('nombre') or time.strftime('%H%M%S'))), 201
+    except memoria.MemoriaError as e:
+        return jsonify({'message': str(e)}), 409
+
+@internal_bp.route('/memoria/instantaneas/<nombre>', methods=['GET'])
+def memoria_resumen(nombre):
+    """Memoria viva de una instantánea por módulo (?por_linea=1 para detallar)"""
+    try:
+        return jsonify(memoria.resumen(
+            nombre,
+            por_linea=request.args.get('por_linea') == '1',
+            limite=request.args.get('limite', 20, type=int)
+        ))
+    except memoria.MemoriaError as e:
+        return jsonify({'message': str(e)}), 404
+
+@internal_bp.route('/memoria/comparar', methods=['GET'])
+def memoria_comparar():
+    """Crecimiento por módulo entre ?desde=antes&hasta=despues (sin hasta: hasta ahora)"""
+    try:
+        return jsonify(memoria.comparar(
+            request.args.get('desde', ''),
+            request.args.get('hasta'),
+            por_linea=request.args.get('por_linea') == '1',
+            limite=request.args.get('limite', 20, type=int)
+        ))
+    except memoria.MemoriaError as e:
+        return jsonify({'message': str(e)}), 409
+
+@internal_bp.route('/memoria/objetos', methods=['GET'])
+def memoria_objetos():
+    """Objetos vivos por tipo y su cambio desde la consulta anterior"""
+    return jsonify(memoria.objetos(limite=request.args.get('limite', 30, type=int)))
@@ -0,0 +1,42 @@
+from flask import Blueprint, Response
+from core import metricas, connections, sse, hilos, contrasenas, limites, backpressure
+from services.cola_service import contar_turnos_en_espera
+from api.internal import verificar_acceso_interno
+
+metricas_bp = Blueprint('metricas', __name__)
+
+# Mismo acceso que /api/internal: token interno (Prometheus puede enviarlo como bearer_token)
+metricas_bp.before_request(verificar_acceso_interno)
+
+# Métricas calculadas en cada scrape a partir de lo que ya lleva cada módulo
+metricas.medidor('ttoca_cola_en_espera', 'Turnos en espera por cola',
+                 contar_turnos_en_espera, ('empresa', 'cola'))
+metricas.medidor('ttoca_ws_conexiones', 'Conexiones Socket.IO abiertas',
+                 lambda: connections.estadisticas()['conexiones'])
+metricas.medidor('ttoca_ws_rechazos_total', 'Conexiones y llamadas RPC rechazadas por límite',
+                 lambda: {(motivo,): n for motivo, n in connections.estadisticas()['rechazos'].items()},
+                 ('motivo',), tipo='counter')
+metricas.medidor('ttoca_ws_clientes_lentos', 'Clientes con eventos retenidos por contrapresión',
+                 lambda: backpressure.estadisticas().get('clientes_retenidos', 0))
+metricas.medidor('ttoca_sse_suscriptores', 'Suscriptores SSE conectados',
+                 lambda: sse.estadisticas()['suscriptores'])
+metricas.medidor('ttoca_pool_en_curso', 'Llamadas al pool de hilos en ejecución o esperando hilo',
+                 lambda: hilos.estadisticas()['en_curso'])
+metricas.medidor('ttoca_pool_en_cola', 'Llamadas al pool de hilos esperando un hilo libre',
+                 lambda: hilos.estadisticas()['en_cola'])
+metricas.medidor('ttoca_pool_llamadas_total', 'Llamadas al pool de hilos por tipo de trabajo',
+                 lambda: {(tipo,): m['total'] for tipo, m in hilos.estadisticas()['por_tipo'].items()},
+                 ('tipo',), tipo='counter')
+metricas.medidor('ttoca_pool_segundos_total', 'Tiempo total en el pool de hilos (espera incluida) por tipo de trabajo',
+                 lambda: {(tipo,): m['ms_total'] / 1000 for tipo, m in hilos.estadisticas()['por_tipo'].items()},
+                 ('tipo',), tipo='counter')
+metricas.medidor('ttoca_bcrypt_esperando', 'Cálculos de bcrypt esperando turno',
+                 lambda: contrasenas.estadisticas()['esperando'])
+metricas.medidor('ttoca_limites_rechazos_total', 'Peticiones rechazadas por límite de ritmo',
+                 lambda: {(tipo,): n for tipo, n in limites.estadisticas()['rechazos'].items()},
+                 ('tipo',), tipo='counter')
+
+@metricas_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas de este proceso en el formato de texto de Prometheus"""
+    return Response(metricas.exponer(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,39 @@
+from flask import Blueprint, jsonify
+from core.salud import vivo, preparado
+from datetime import datetime
+
+salud_bp = Blueprint('salud', __name__)
+
+@salud_bp.route('/health/live', methods=['GET'])
+def health_live():
+    """Liveness probe: el proceso responde"""
+    return jsonify(vivo())
+
+@salud_bp.route('/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness probe: 503 si la instancia no debe recibir tráfico"""
+    informe = preparado()
+    return jsonify(informe), 200 if informe['preparado'] else 503
+
+@salud_bp.route('/api/health', methods=['GET'])
+def api_health():
+    """API health check endpoint"""
+    informe = preparado()
+    return jsonify({
+        "status": "healthy" if informe['preparado'] else "unhealthy",
+        "api": "operational",
+        "database": "error" if 'error' in informe['base_datos'] else "connected",
+        "timestamp": datetime.utcnow().isoformat()
+    }), 200 if informe['preparado'] else 503
+
+@salud_bp.route('/api/status', methods=['GET'])
+def api_status():
+    """Endpoint de estado detallado"""
+    informe = preparado()
+    return jsonify(dict(
+        informe,
+        api="operational",
+        websocket="enabled",
+        version="1.0.0",
+        timestamp=datetime.utcnow().isoformat()
+    ))
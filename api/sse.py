@@ -0,0 +1,39 @@
+from flask import Blueprint, request, Response, jsonify
+from core import snapshots, sse
+from core.difusion import construir_resumen_empresa
+from services.auth_service import obtener_propietario_empresa
+from services.cola_config_service import obtener_categoria
+
+sse_bp = Blueprint('sse', __name__)
+
+def _respuesta_sse(sala, snapshot):
+    """Abre el flujo text/event-stream de una sala (mismas salas que Socket.IO)"""
+    # EventSource reenvía el último id en la cabecera; algunos polyfills usan la query
+    ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    return Response(
+        sse.suscribir(sala, ultimo_id, snapshot),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Evita que nginx acumule el flujo
+        }
+    )
+
+@sse_bp.route('/proyectos/<id_empresa>/cola/<id_cola>/eventos', methods=['GET'])
+def api_eventos_cola(id_empresa, id_cola):
+    # Cada sala con suscriptores guarda un historial: no se crean para colas inexistentes
+    if obtener_categoria(id_empresa, id_cola) is None:
+        return jsonify({"message": "Cola no encontrada"}), 404
+    return _respuesta_sse(
+        f"queue_{id_empresa}_{id_cola}",
+        lambda: ('queue_snapshot', snapshots.snapshot_cola(id_empresa, id_cola))
+    )
+
+@sse_bp.route('/proyectos/<id_empresa>/eventos', methods=['GET'])
+def api_eventos_empresa(id_empresa):
+    if obtener_propietario_empresa(id_empresa) is None:
+        return jsonify({"message": "Empresa no encontrada"}), 404
+    return _respuesta_sse(
+        f"empresa_{id_empresa}",
+        lambda: ('resumen_empresa', snapshots.resumen_empresa(id_empresa, construir_resumen_empresa))
+    )
@@ -1,16 +1,34 @@
+# Monkey-patching antes de cualquier otro import: sockets, time y threading
+# pasan a ser cooperativos (gunicorn -k eventlet ya lo hace, python app.py no)
+import eventlet
+eventlet.monkey_patch()
+
 from flask import Flask, jsonify
 from flask_cors import CORS
 from api.auth import auth_bp
 from api.empresa import empresa_bp
 from api.cola import cola_bp
 from api.cola_config import cola_config_bp
+from api.internal import internal_bp
+from api.sse import sse_bp
+from api.metricas import metricas_bp
+from api.salud import salud_bp
 from core.database import init_database
 from core.websocket import init_socketio
+from core.bus import iniciar_bus
+from core.compresion import comprimir_json
+from core.serializacion import ProveedorJSON
+from core.metricas import instrumentar
+from core import perfilador, proxy
+from core.salud import iniciar_monitor_hub
+from api.frontend import frontend_bp, servir_index
+from config import get_config
 import atexit
 from datetime import datetime
 
 # Inicializa Flask sin static_folder
 app = Flask(__name__, static_folder=None)
+app.json = ProveedorJSON(app)  # orjson si está instalado
 
 # CORS configurado para permitir orígenes específicos
 CORS(
@@ -29,11 +47,35 @@ init_database()
 # Inicializa WebSocket
 socketio = init_socketio(app)
 
+# IP real del cliente detrás de nginx (después de Socket.IO para cubrir sus conexiones)
+proxy.configurar(app)
+
+# Conecta con los demás workers (si hay un bus de mensajes configurado)
+iniciar_bus()
+
+# Mide el retraso del hub de eventlet para /health/ready
+iniciar_monitor_hub()
+
 # Blueprints API
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(empresa_bp, url_prefix='/api')
 app.register_blueprint(cola_bp, url_prefix='/api')
 app.register_blueprint(cola_config_bp, url_prefix='/api')
+app.register_blueprint(internal_bp, url_prefix='/api/internal')
+app.register_blueprint(sse_bp, url_prefix='/api')
+app.register_blueprint(metricas_bp)
+app.register_blueprint(salud_bp)
+
+# Frontend de dist/ (opcional) y gzip para JSON grandes
+if get_config().SERVIR_FRONTEND:
+    app.register_blueprint(frontend_bp)
+app.after_request(comprimir_json)
+instrumentar(app)
+
+# Perfilado bajo demanda (cProfile por petición y muestreador de pilas)
+perfilador.instrumentar(app)
+if get_config().PERFIL_MUESTREO:
+    perfilador.iniciar_muestreo()
 
 # Limpieza al salir
 def cleanup_old_records():
@@ -51,6 +93,8 @@ atexit.register(cleanup_old_records)
 @app.route("/")
 def root():
     """Endpoint raíz que indica que es una API"""
+    if get_config().SERVIR_FRONTEND:
+        return servir_index()
     return jsonify({
         "message": "TTOCA API",
         "version": "1.0.0",
@@ -65,35 +109,6 @@ def health():
         "timestamp": datetime.utcnow().isoformat()
     })
 
-@app.route("/api/health")
-def api_health():
-    """API health check endpoint"""
-    return jsonify({
-        "status": "healthy",
-        "api": "operational",
-        "database": "connected",
-        "timestamp": datetime.utcnow().isoformat()
-    })
-
-@app.route("/api/status")
-def api_status():
-    """Endpoint de estado detallado"""
-    try:
-        # Verificar conexión a base de datos
-        from core.database import db
-        db.execute_query("SELECT 1")
-        db_status = "connected"
-    except Exception as e:
-        db_status = f"error: {str(e)}"
-
-    return jsonify({
-        "api": "operational",
-        "database": db_status,
-        "websocket": "enabled",
-        "version": "1.0.0",
-        "timestamp": datetime.utcnow().isoformat()
-    })
-
 if __name__ == "__main__":
     # Usar socketio.run() en lugar de app.run() para soporte de WebSocket
     socketio.run(app, debug=False, host="0.0.0.0", port=8001)
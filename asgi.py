@@ -0,0 +1,143 @@
+"""
+Punto de entrada ASGI, alternativo al modo eventlet de app.py
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8001
+
+Sirve las mismas rutas REST (los blueprints de api/) y los mismos eventos
+Socket.IO (core.websocket_asgi sobre python-socketio AsyncServer). Los
+servicios de services/ se ejecutan en el executor de core.hilos, así el
+event loop nunca espera a SQLite ni a bcrypt. No se hace monkey-patching.
+
+Diferencias con el modo eventlet: sin SSE, cada long-poll en espera ocupa
+un hilo del executor y no hay bus entre workers (usar un solo proceso).
+"""
+import io
+import sys
+import socketio
+from flask import Flask, jsonify
+from flask_cors import CORS
+from api.auth import auth_bp
+from api.empresa import empresa_bp
+from api.cola import cola_bp
+from api.cola_config import cola_config_bp
+from api.internal import internal_bp
+from api.metricas import metricas_bp
+from api.salud import salud_bp
+from core.compresion import comprimir_json
+from core.serializacion import ProveedorJSON
+from core.metricas import instrumentar
+from core import perfilador, proxy
+from config import get_config
+from core.database import init_database
+from core.hilos import ejecutar_async
+from core.websocket_asgi import init_socketio_asgi, iniciar
+
+ORIGENES = [
+    "http://localhost:5173",
+    "https://ttoca.online",
+    "https://www.ttoca.online",
+]
+
+class FlaskASGI:
+    """Adaptador WSGI -> ASGI: cada petición se atiende en el executor
+
+    El cuerpo de la respuesta se lee completo, por eso no sirve para
+    respuestas en streaming (SSE).
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+
+        cuerpo = b''
+        while True:
+            mensaje = await receive()
+            cuerpo += mensaje.get('body', b'')
+            if not mensaje.get('more_body'):
+                break
+
+        estado, cabeceras, contenido = await ejecutar_async('wsgi', self._atender, self._environ(scope, cuerpo))
+        await send({
+            'type': 'http.response.start',
+            'status': estado,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in cabeceras]
+        })
+        await send({'type': 'http.response.body', 'body': contenido})
+
+    def _atender(self, environ):
+        respuesta = {}
+
+        def start_response(status, headers, exc_info=None):
+            respuesta['estado'] = int(status.split(' ', 1)[0])
+            respuesta['cabeceras'] = headers
+
+        resultado = self.wsgi_app(environ, start_response)
+        try:
+            contenido = b''.join(resultado)
+        finally:
+            if hasattr(resultado, 'close'):
+                resultado.close()
+        return respuesta['estado'], respuesta['cabeceras'], contenido
+
+    def _environ(self, scope, cuerpo):
+        servidor = scope.get('server') or ('localhost', 80)
+        cliente = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            # WSGI espera la ruta como bytes decodificados en latin-1
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': servidor[0],
+            'SERVER_PORT': str(servidor[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': cliente[0],
+            'CONTENT_LENGTH': str(len(cuerpo)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(cuerpo),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for nombre, valor in scope.get('headers', []):
+            nombre = nombre.decode('latin-1').upper().replace('-', '_')
+            valor = valor.decode('latin-1')
+            if nombre == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = valor
+            elif nombre != 'CONTENT_LENGTH':
+                clave = f"HTTP_{nombre}"
+                environ[clave] = f"{environ[clave]},{valor}" if clave in environ else valor
+        return environ
+
+flask_app = Flask(__name__, static_folder=None)
+flask_app.json = ProveedorJSON(flask_app)
+CORS(flask_app, origins=ORIGENES, supports_credentials=True)
+proxy.configurar(flask_app)
+
+init_database()
+
+flask_app.register_blueprint(auth_bp, url_prefix='/api/auth')
+flask_app.register_blueprint(empresa_bp, url_prefix='/api')
+flask_app.register_blueprint(cola_bp, url_prefix='/api')
+flask_app.register_blueprint(cola_config_bp, url_prefix='/api')
+flask_app.register_blueprint(internal_bp, url_prefix='/api/internal')
+flask_app.register_blueprint(metricas_bp)
+flask_app.register_blueprint(salud_bp)
+flask_app.after_request(comprimir_json)
+instrumentar(flask_app)
+perfilador.instrumentar(flask_app)
+if get_config().PERFIL_MUESTREO:
+    perfilador.iniciar_muestreo()
+
+@flask_app.route("/health")
+def health():
+    """Health check endpoint"""
+    return jsonify({"status": "healthy", "modo": "asgi"})
+
+sio = init_socketio_asgi(ORIGENES)
+app = socketio.ASGIApp(sio, other_asgi_app=FlaskASGI(flask_app), on_startup=iniciar)
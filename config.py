@@ -14,6 +14,13 @@ class Config:
     
     # Configuración de Flask
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    # Claves retiradas que aún validan tokens emitidos antes de rotar SECRET_KEY
+    SECRET_KEYS_ANTERIORES = [k for k in os.environ.get('SECRET_KEYS_ANTERIORES', '').split(',') if k]
+    
+    # Sesiones (ver core/sesiones.py)
+    SESION_DURACION_SEGUNDOS = 12 * 3600
+    SESION_CACHE_MAX = 10000  # Tokens verificados que se recuerdan en memoria
+    AUTH_REQUERIDA = os.environ.get('AUTH_REQUERIDA') == '1'  # Desactivado mientras el frontend no envíe tokens
     
     # CORS - URLs permitidas
     CORS_ORIGINS = [
@@ -21,6 +28,15 @@ class Config:
         'https://www.ttoca.online'
     ]
     
+    # Frontend compilado (ver api/frontend.py); normalmente lo sirve el proxy
+    SERVIR_FRONTEND = os.environ.get('SERVIR_FRONTEND') == '1'
+    FRONTEND_DIR = os.environ.get('FRONTEND_DIR', 'dist')
+    FRONTEND_CACHE_SEGUNDOS = 365 * 24 * 3600  # Assets con hash en el nombre
+    
+    # Compresión gzip de respuestas JSON (ver core/compresion.py)
+    COMPRESION_MIN_BYTES = 1024
+    COMPRESION_NIVEL = 6
+    
     # Configuración de limpieza automática
     AUTO_CLEANUP_DAYS = 1  # Días después de los cuales limpiar turnos antiguos
     
@@ -28,6 +44,122 @@ class Config:
     AUTO_BACKUP_ENABLED = False
     AUTO_BACKUP_INTERVAL_HOURS = 24
     
+    # Configuración de long-polling (respaldo para clientes sin WebSocket)
+    LONGPOLL_TIMEOUT_SEGUNDOS = 25  # Espera por defecto antes de responder sin cambios
+    LONGPOLL_TIMEOUT_MAXIMO = 55  # Límite para no superar timeouts de proxies
+    
+    # Protocolo incremental de WebSocket
+    WS_DELTA_BUFFER = 256  # Deltas recientes por cola disponibles para reanudar
+    WS_COALESCE_VENTANA_MS = 50  # Cambios de una cola dentro de esta ventana viajan en un solo delta
+    WS_SNAPSHOT_TTL_SEGUNDOS = 30  # Vida máxima de un snapshot en caché aunque no cambie su versión
+    WS_SNAPSHOT_MAX_ENTRADAS = 5000  # Salas en la caché de snapshots; se descartan las menos usadas
+    
+    # Pantallas de sala de espera
+    LLAMADAS_RECIENTES = 10  # Últimas llamadas guardadas en memoria por cola
+    TICKET_AVISOS_MAX = 5  # Posiciones de aviso que puede pedir un cliente en join_ticket
+    SSE_BUFFER = 256  # Eventos recientes por sala para reanudar con Last-Event-ID
+    SSE_COLA_MAX = 64  # Eventos pendientes por suscriptor antes de cortar su conexión
+    SSE_KEEPALIVE_SEGUNDOS = 15
+    SSE_RETRY_MS = 2000  # Espera sugerida al navegador antes de reconectar
+    
+    # Límites de conexiones WebSocket por proceso
+    WS_MAX_CONEXIONES_POR_IP = 100  # Un kiosco o red corporativa detrás de NAT comparte IP
+    WS_MAX_CONEXIONES_POR_EMPRESA = 2000
+    WS_RPC_POR_SEGUNDO = 5  # Ritmo sostenido de issue_ticket/call_next por conexión
+    WS_RPC_RAFAGA = 10
+    
+    # Contrapresión para clientes lentos
+    WS_COLA_SALIDA_MAX = 32  # Paquetes pendientes a partir de los cuales se retienen eventos
+    WS_CRITICOS_MAX = 200  # Avisos críticos retenidos antes de forzar la reconexión
+    WS_DRENAJE_INTERVALO_MS = 100
+    
+    # Hilos nativos para sqlite3 y bcrypt bajo eventlet (ver core/hilos.py)
+    TPOOL_HILOS = int(os.environ.get('EVENTLET_THREADPOOL_SIZE', 20))
+    
+    # bcrypt (ver core/contrasenas.py)
+    BCRYPT_COSTE = int(os.environ.get('BCRYPT_COST', 12))  # Los hashes con otro coste se regeneran al hacer login
+    BCRYPT_CONCURRENCIA = int(os.environ.get('BCRYPT_CONCURRENCIA', 2))  # Hilos del pool que bcrypt puede ocupar a la vez
+    BCRYPT_COLA_MAX = 20  # Cálculos esperando turno; por encima se responde 503
+    
+    # En el modo ASGI cada long-poll en espera ocupa un hilo del executor
+    LONGPOLL_ESPERAS_HILOS = int(os.environ.get('LONGPOLL_ESPERAS_HILOS', TPOOL_HILOS // 2))
+    BCRYPT_ESPERA_MAX_SEGUNDOS = 5
+    
+    # Intentos de login y registro (token bucket, ver core/limites.py)
+    LOGIN_POR_MINUTO_EMAIL = 5
+    LOGIN_RAFAGA_EMAIL = 5
+    LOGIN_POR_MINUTO_IP = 30
+    LOGIN_RAFAGA_IP = 20
+    LIMITES_MAX_CLAVES = 100000  # Cubos recordados en memoria
+    
+    # Mutaciones de colas: emitir, llamar y eliminar (HTTP y Socket.IO)
+    MUTACIONES_POR_SEGUNDO_IP = 5
+    MUTACIONES_RAFAGA_IP = 20
+    MUTACIONES_POR_SEGUNDO_COLA = 10
+    MUTACIONES_RAFAGA_COLA = 30
+    MUTACIONES_POR_SEGUNDO_EMPRESA = 20
+    MUTACIONES_RAFAGA_EMPRESA = 60
+    MUTACIONES_EN_CURSO_POR_EMPRESA = 4  # Escrituras simultáneas de una misma empresa
+    
+    # Registro estructurado (ver core/registro.py)
+    REGISTRO_NIVEL = os.environ.get('REGISTRO_NIVEL', 'INFO')
+    # Nivel por subsistema, p. ej. REGISTRO_NIVELES="ws=DEBUG,auth=WARNING"
+    REGISTRO_NIVELES = dict(
+        par.split('=', 1) for par in os.environ.get('REGISTRO_NIVELES', '').split(',') if '=' in par
+    )
+    REGISTRO_MUESTREO = {'queue_delta': 20, 'resumen_cola': 50, 'posicion_turno': 50}  # 1 de cada N
+    REGISTRO_FORMATO = os.environ.get('REGISTRO_FORMATO', 'texto')  # 'texto' o 'json'
+    REGISTRO_COLA_MAX = 10000
+    
+    # Perfilado de SQLite (ver core/perfil_db.py); desactivado por defecto
+    DB_PERFIL = os.environ.get('DB_PERFIL') == '1'
+    DB_LENTA_MS = float(os.environ.get('DB_LENTA_MS', 100))  # Sentencias a partir de las que se guarda el plan
+    DB_LENTAS_ARCHIVO = os.environ.get('DB_LENTAS_ARCHIVO', 'consultas_lentas.log')
+    DB_LENTAS_MAX_BYTES = 5 * 1024 * 1024  # Tamaño a partir del que se rota el archivo
+    DB_LENTAS_ARCHIVOS = 3  # Archivos rotados que se conservan
+    DB_LENTAS_RECIENTES = 50  # Consultas lentas recordadas en memoria
+    DB_PERFIL_PASOS = 1000  # Instrucciones de la VM de SQLite por llamada al progress handler
+    DB_PERFIL_MAX_SENTENCIAS = 500  # Sentencias distintas acumuladas
+    
+    # Perfilado bajo demanda (ver core/perfilador.py)
+    PERFIL_DIR = os.environ.get('PERFIL_DIR', 'perfiles')
+    PERFIL_POR_MINUTO = 6  # Peticiones perfiladas con cProfile como máximo
+    PERFIL_PETICIONES_MAX = 50  # Peticiones que se pueden armar de una vez
+    PERFIL_TOKEN_SEGUNDOS = 600  # Vigencia del token de la cabecera X-Perfil
+    PERFIL_MUESTREO = os.environ.get('PERFIL_MUESTREO') == '1'  # Muestreador de pilas siempre activo
+    PERFIL_MUESTREO_INTERVALO_MS = 20
+    PERFIL_MUESTREO_VENTANA_SEGUNDOS = 60  # Cada ventana se escribe en su propio archivo
+    PERFIL_MUESTREO_MAX_SEGUNDOS = 600  # Duración máxima de un muestreo pedido por el endpoint
+    PERFIL_MUESTREO_COSTE_MAX = 0.02  # Fracción del intervalo que puede costar una muestra
+    PERFIL_PROFUNDIDAD_MAX = 64
+    PERFIL_MAX_ARCHIVOS = 50  # Archivos conservados de cada tipo
+    
+    # Diagnóstico de memoria (ver core/memoria.py)
+    MEMORIA_MARCOS = 1  # Niveles de pila guardados por reserva al arrancar tracemalloc
+    MEMORIA_INSTANTANEAS_MAX = 10
+    
+    # Probes de salud (ver core/salud.py)
+    SALUD_CACHE_SEGUNDOS = 2
+    SALUD_INTERVALO_HUB_SEGUNDOS = 0.5
+    SALUD_RETRASO_HUB_MAX_MS = 500
+    SALUD_LATENCIA_DB_MAX_MS = 1000
+    SALUD_POOL_EN_COLA_MAX = 50
+    SALUD_WAL_MAX_BYTES = 64 * 1024 * 1024
+    
+    # Proxies de confianza delante de la aplicación (ver core/proxy.py)
+    PROXY_SALTOS = int(os.environ.get('PROXY_SALTOS', 0))
+    
+    # Token para los endpoints internos /api/internal y /metrics
+    INTERNAL_TOKEN = os.environ.get('INTERNAL_TOKEN')
+    # Aceptar localhost sin token: solo si no hay un proxy delante (con nginx
+    # todas las peticiones llegan desde 127.0.0.1)
+    INTERNAL_CONFIAR_LOCALHOST = os.environ.get('INTERNAL_CONFIAR_LOCALHOST') == '1'
+    
+    # Bus de mensajes entre workers (None = un solo proceso)
+    # Ejemplos: 'ipc:///tmp/ttoca-bus', 'redis://localhost:6379/0'
+    MESSAGE_BUS_URL = os.environ.get('MESSAGE_BUS_URL')
+    MESSAGE_BUS_CANAL = 'ttoca'
+    
 class DevelopmentConfig(Config):
     """Configuración para desarrollo"""
     DEBUG = True
@@ -41,6 +173,15 @@ class ProductionConfig(Config):
     # En producción, usar variables de entorno
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-must-set-a-secret-key'
     
+    # Una línea JSON por registro para el recolector de logs
+    REGISTRO_FORMATO = os.environ.get('REGISTRO_FORMATO', 'json')
+    
+    # nginx delante (ver scripts/deploy.py)
+    PROXY_SALTOS = int(os.environ.get('PROXY_SALTOS', 1))
+    
+    # deploy.py arranca varios workers: compartir eventos entre ellos
+    MESSAGE_BUS_URL = os.environ.get('MESSAGE_BUS_URL') or 'ipc:///tmp/ttoca-bus'
+    
     # Configuración más estricta para producción
     AUTO_BACKUP_ENABLED = True
     AUTO_CLEANUP_DAYS = 7  # Mantener turnos por una semana en producción
@@ -0,0 +1,91 @@
+"""
+Control de contrapresión para clientes WebSocket lentos
+Cuando la cola de salida de Engine.IO de un cliente supera el límite, sus
+eventos se retienen aquí en lugar de seguir acumulándose en memoria:
+- los eventos reemplazables (estado de una cola, resúmenes) guardan solo el
+  último valor por clave, así el estado intermedio se sustituye
+- los eventos críticos (turno_llamado, cola_eliminada) nunca se descartan;
+  si un cliente acumula demasiados se desconecta para que se resincronice
+Los retenidos se envían en cuanto la cola de salida del cliente se vacía.
+
+Funciona en los dos modos del servidor a través de su transporte
+(core.difusion.Transporte).
+"""
+from collections import Counter, OrderedDict
+from config import get_config
+
+# Eventos retenidos por cliente: sid -> {'eio_sid', 'criticos': [], 'reemplazables': OrderedDict}
+_retenidos = {}
+
+_contadores = Counter()
+
+def clientes_lentos(transporte, salas):
+    """Obtiene {sid: eio_sid} de los clientes de las salas que no deben recibir directamente"""
+    limite = get_config().WS_COLA_SALIDA_MAX
+    lentos = {}
+    for sid, eio_sid in transporte.participantes(salas):
+        # Un cliente con eventos retenidos sigue retenido para no alterar el orden
+        if sid in _retenidos or (transporte.cola_salida(eio_sid) or 0) >= limite:
+            lentos[sid] = eio_sid
+    return lentos
+
+def retener(transporte, sid, eio_sid, evento, datos, clave=None):
+    """Retiene un evento para un cliente lento
+
+    Sin clave el evento es crítico y se encola; con clave reemplaza al
+    retenido anterior con la misma clave. datos puede ser un callable que
+    se evalúa al enviar (p. ej. un snapshot que sustituye a varios deltas).
+    """
+    retenidos = _retenidos.get(sid)
+    if retenidos is None:
+        retenidos = _retenidos[sid] = {
+            'eio_sid': eio_sid, 'criticos': [], 'reemplazables': OrderedDict()
+        }
+        transporte.iniciar_tarea(_drenar, transporte, sid)
+
+    if clave is None:
+        retenidos['criticos'].append((evento, datos))
+        _contadores['criticos_retenidos'] += 1
+        if len(retenidos['criticos']) > get_config().WS_CRITICOS_MAX:
+            # No se puede descartar un aviso crítico: forzar la reconexión
+            _contadores['desconectados'] += 1
+            olvidar(sid)
+            transporte.desconectar(sid)
+        return
+
+    if clave in retenidos['reemplazables']:
+        _contadores['reemplazados'] += 1
+        del retenidos['reemplazables'][clave]
+    retenidos['reemplazables'][clave] = (evento, datos)
+    _contadores['reemplazables_retenidos'] += 1
+
+def olvidar(sid):
+    """Descarta los eventos retenidos de un cliente desconectado"""
+    _retenidos.pop(sid, None)
+
+def _drenar(transporte, sid):
+    """Espera a que el cliente vacíe su cola de salida y le envía lo retenido"""
+    config = get_config()
+    while True:
+        # En el modo ASGI el cliente puede desconectarse desde otro hilo
+        retenidos = _retenidos.get(sid)
+        if retenidos is None:
+            return
+        tamano = transporte.cola_salida(retenidos['eio_sid'])
+        if tamano is None:
+            olvidar(sid)
+            return
+
+        if tamano < config.WS_COLA_SALIDA_MAX:
+            retenidos = _retenidos.pop(sid, retenidos)
+            eventos = retenidos['criticos'] + list(retenidos['reemplazables'].values())
+            for evento, datos in eventos:
+                transporte.emitir(evento, datos() if callable(datos) else datos, sid)
+            _contadores['drenados'] += 1
+            return
+
+        transporte.dormir(config.WS_DRENAJE_INTERVALO_MS / 1000)
+
+def estadisticas():
+    """Estado de la contrapresión para el endpoint interno"""
+    return dict(_contadores, clientes_retenidos=len(_retenidos))
@@ -0,0 +1,222 @@
+"""
+Bus de mensajes entre procesos
+Con varios workers (gunicorn -w N) cada proceso tiene sus propios sockets,
+salas y clientes de long-polling. El bus reenvía a todos los workers los
+eventos de dominio confirmados para que cada uno los emita a sus clientes.
+
+Se reenvían eventos de dominio y no paquetes de Socket.IO porque la secuencia
+de los deltas es propia de cada worker: cada proceso numera su flujo y los
+clientes, conectados siempre al mismo worker, no ven secuencias mezcladas.
+
+URLs soportadas:
+    ipc:///ruta/al/directorio   - Sockets Unix entre procesos de la misma máquina
+    redis://host:6379/0         - Redis pub/sub (requiere el paquete redis)
+Otros brokers se conectan con registrar_adaptador().
+"""
+import atexit
+import os
+import struct
+import uuid
+from urllib.parse import urlparse
+import eventlet
+from eventlet.green import socket
+from eventlet.queue import Queue
+from eventlet.semaphore import Semaphore
+from core.events import agregar_transmisor, despachar_local
+from core.serializacion import dumps, loads
+from core import registro
+from config import get_config
+
+class BusMensajes:
+    """Interfaz común de los adaptadores de bus
+
+    Las subclases implementan publicar() y escuchar(); el reenvío de los
+    eventos y el descarte de los mensajes propios se hace aquí.
+    """
+
+    def __init__(self, url, canal):
+        self.url = url
+        self.canal = canal
+        self.host_id = uuid.uuid4().hex
+
+    def iniciar(self):
+        """Prepara las conexiones del adaptador"""
+
+    def publicar(self, mensaje):
+        """Envía un mensaje (dict serializable a JSON) a todos los procesos"""
+        raise NotImplementedError('El adaptador debe implementar publicar()')
+
+    def escuchar(self):
+        """Generador bloqueante con los mensajes recibidos de otros procesos"""
+        raise NotImplementedError('El adaptador debe implementar escuchar()')
+
+    def transmitir(self, eventos):
+        """Publica los eventos de una transacción confirmada"""
+        self.publicar({'origen': self.host_id, 'eventos': eventos})
+
+    def bucle(self):
+        """Entrega a los suscriptores locales los eventos de otros procesos"""
+        while True:
+            try:
+                for mensaje in self.escuchar():
+                    if mensaje.get('origen') == self.host_id:
+                        continue
+                    for nombre, datos in mensaje.get('eventos', []):
+                        despachar_local(nombre, datos)
+            except Exception as e:
+                registro.error('bus', 'escucha_fallida', error=repr(e))
+                eventlet.sleep(1)
+
+class BusIPCLocal(BusMensajes):
+    """Bus sobre sockets Unix para workers de una misma máquina
+
+    Cada proceso escucha en <directorio>/<canal>/<host_id>.sock y publica
+    abriendo una conexión persistente con cada socket del directorio.
+    Los mensajes van enmarcados con su longitud (4 bytes, big endian).
+    """
+
+    DIRECTORIO_DEFECTO = '/tmp/ttoca-bus'
+
+    def iniciar(self):
+        base = urlparse(self.url).path or self.DIRECTORIO_DEFECTO
+        self.directorio = os.path.join(base, self.canal)
+        os.makedirs(self.directorio, exist_ok=True)
+        self.ruta = os.path.join(self.directorio, f"{self.host_id}.sock")
+
+        self._servidor = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._servidor.bind(self.ruta)
+        self._servidor.listen(64)
+        atexit.register(self._limpiar)
+
+        self._recibidos = Queue()
+        self._conexiones = {}
+        # Las tramas de varios greenlets no deben mezclarse en una misma conexión
+        self._envio = Semaphore()
+        eventlet.spawn(self._aceptar)
+
+    def publicar(self, mensaje):
+        datos = dumps(mensaje).encode('utf-8')
+        trama = struct.pack('!I', len(datos)) + datos
+
+        with self._envio:
+            for nombre in os.listdir(self.directorio):
+                ruta = os.path.join(self.directorio, nombre)
+                if ruta == self.ruta or not nombre.endswith('.sock'):
+                    continue
+                try:
+                    conexion = self._conexiones.get(ruta)
+                    if conexion is None:
+                        conexion = self._conexiones[ruta] = self._conectar(ruta)
+                    conexion.sendall(trama)
+                except ConnectionRefusedError:
+                    # Nadie escucha: el socket pertenece a un worker terminado
+                    self._descartar(ruta, eliminar=True)
+                except OSError:
+                    self._descartar(ruta)
+
+    def escuchar(self):
+        while True:
+            yield self._recibidos.get()
+
+    def _conectar(self, ruta):
+        conexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conexion.connect(ruta)
+        except OSError:
+            conexion.close()
+            raise
+        return conexion
+
+    def _descartar(self, ruta, eliminar=False):
+        conexion = self._conexiones.pop(ruta, None)
+        if conexion is not None:
+            conexion.close()
+        if eliminar:
+            try:
+                os.unlink(ruta)
+            except OSError:
+                pass
+
+    def _aceptar(self):
+        while True:
+            conexion, _ = self._servidor.accept()
+            eventlet.spawn(self._leer, conexion)
+
+    def _leer(self, conexion):
+        lector = conexion.makefile('rb')
+        try:
+            while True:
+                cabecera = lector.read(4)
+                if len(cabecera) < 4:
+                    break
+                (longitud,) = struct.unpack('!I', cabecera)
+                self._recibidos.put(loads(lector.read(longitud)))
+        except (OSError, ValueError) as e:
+            registro.error('bus', 'lectura_fallida', error=repr(e))
+        finally:
+            lector.close()
+            conexion.close()
+
+    def _limpiar(self):
+        try:
+            os.unlink(self.ruta)
+        except OSError:
+            pass
+
+class BusRedis(BusMensajes):
+    """Bus sobre Redis pub/sub para workers en varias máquinas
+
+    Requiere el paquete redis y que el proceso esté monkey-patcheado por
+    eventlet para que la escucha no bloquee el hub.
+    """
+
+    def iniciar(self):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('Instala el paquete redis para usar un bus redis://')
+
+        self._redis = redis.Redis.from_url(self.url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.canal)
+
+    def publicar(self, mensaje):
+        self._redis.publish(self.canal, dumps(mensaje))
+
+    def escuchar(self):
+        for mensaje in self._pubsub.listen():
+            yield loads(mensaje['data'])
+
+# Adaptadores por esquema de URL
+_adaptadores = {
+    'ipc': BusIPCLocal,
+    'redis': BusRedis,
+    'rediss': BusRedis,
+}
+
+# Bus activo en este proceso (None en modo de un solo proceso)
+bus = None
+
+def registrar_adaptador(esquema, clase):
+    """Registra un adaptador (subclase de BusMensajes) para un esquema de URL"""
+    _adaptadores[esquema] = clase
+
+def iniciar_bus(url=None, canal=None):
+    """Conecta este proceso al bus configurado; sin URL no hace nada"""
+    global bus
+    config = get_config()
+    url = url or config.MESSAGE_BUS_URL
+    if not url or bus is not None:
+        return bus
+
+    esquema = urlparse(url).scheme
+    if esquema not in _adaptadores:
+        raise ValueError(f"Esquema de bus no soportado: {esquema}")
+
+    bus = _adaptadores[esquema](url, canal or config.MESSAGE_BUS_CANAL)
+    bus.iniciar()
+    agregar_transmisor(bus.transmitir)
+    eventlet.spawn(bus.bucle)
+
+    registro.info('bus', 'conectado', esquema=esquema, canal=bus.canal)
+    return bus
@@ -0,0 +1,46 @@
+"""
+Compresión gzip de respuestas JSON grandes
+Las listas de turnos y de colas son JSON muy repetitivo: con gzip ocupan
+entre 5 y 10 veces menos. Las respuestas pequeñas se envían tal cual,
+porque comprimirlas cuesta más CPU de lo que ahorra en red.
+"""
+import gzip
+from flask import request
+from config import get_config
+
+_contadores = {'comprimidas': 0, 'bytes_originales': 0, 'bytes_enviados': 0}
+
+def acepta(codificacion):
+    """Indica si el cliente acepta la codificación (gzip, br) en Accept-Encoding"""
+    return request.accept_encodings[codificacion] > 0
+
+def comprimir_json(respuesta):
+    """after_request: comprime con gzip las respuestas JSON por encima del umbral"""
+    config = get_config()
+    if (respuesta.mimetype != 'application/json'
+            or respuesta.direct_passthrough
+            or respuesta.status_code < 200 or respuesta.status_code >= 300
+            or 'Content-Encoding' in respuesta.headers):
+        return respuesta
+
+    # Las cachés intermedias deben distinguir la versión comprimida
+    respuesta.vary.add('Accept-Encoding')
+    if not acepta('gzip'):
+        return respuesta
+
+    datos = respuesta.get_data()
+    if len(datos) < config.COMPRESION_MIN_BYTES:
+        return respuesta
+
+    comprimido = gzip.compress(datos, compresslevel=config.COMPRESION_NIVEL)
+    respuesta.set_data(comprimido)
+    respuesta.headers['Content-Encoding'] = 'gzip'
+
+    _contadores['comprimidas'] += 1
+    _contadores['bytes_originales'] += len(datos)
+    _contadores['bytes_enviados'] += len(comprimido)
+    return respuesta
+
+def estadisticas():
+    """Ahorro de la compresión para el endpoint interno"""
+    return dict(_contadores)
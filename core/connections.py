@@ -0,0 +1,198 @@
+"""
+Registro de conexiones WebSocket
+Lleva la cuenta de los sockets por sala, empresa e IP, aplica los límites de
+conexiones configurados y mide la latencia y el alcance de cada emisión
+"""
+import os
+import time
+from collections import Counter
+from core import metricas
+from config import get_config
+
+# Conexiones activas: sid -> {'ip', 'conectado', 'salas': set, 'empresas': {empresa_id: set(sala)},
+#                             'rpc': [tokens, actualizado], 'token'}
+_conexiones = {}
+
+# Miembros por sala: sala -> set(sid)
+_salas = {}
+
+_por_ip = Counter()
+_por_empresa = Counter()
+
+# Estadísticas de emisión por evento
+_emisiones = {}
+
+# Conexiones rechazadas por límite: motivo -> total
+_rechazos = Counter()
+
+def registrar_conexion(sid, ip, token=None):
+    """Registra una conexión nueva; devuelve False si la IP superó su límite
+
+    token es el token de sesión enviado al conectar (auth), si lo hay.
+    """
+    if _por_ip[ip] >= get_config().WS_MAX_CONEXIONES_POR_IP:
+        _rechazos['ip'] += 1
+        return False
+
+    _conexiones[sid] = {
+        'ip': ip, 'conectado': time.time(), 'salas': set(), 'empresas': {},
+        'rpc': [get_config().WS_RPC_RAFAGA, time.monotonic()],
+        'token': token
+    }
+    _por_ip[ip] += 1
+    return True
+
+def registrar_desconexion(sid):
+    """Elimina una conexión y su pertenencia a salas y empresas"""
+    conexion = _conexiones.pop(sid, None)
+    if conexion is None:
+        return
+
+    for sala in conexion['salas']:
+        _quitar_de_sala(sid, sala)
+    for empresa_id in conexion['empresas']:
+        _descontar(_por_empresa, empresa_id)
+    _descontar(_por_ip, conexion['ip'])
+
+def unir_sala(sid, sala, empresa_id):
+    """Registra la entrada a una sala; devuelve False si la empresa superó su límite
+
+    Una conexión cuenta para el límite de la empresa mientras esté en alguna
+    de sus salas: al salir de la última deja de contar.
+    """
+    conexion = _conexiones.get(sid)
+    if conexion is None:
+        return True
+
+    salas_empresa = conexion['empresas'].get(empresa_id)
+    if salas_empresa is None:
+        if _por_empresa[empresa_id] >= get_config().WS_MAX_CONEXIONES_POR_EMPRESA:
+            _rechazos['empresa'] += 1
+            return False
+        salas_empresa = conexion['empresas'][empresa_id] = set()
+        _por_empresa[empresa_id] += 1
+
+    salas_empresa.add(sala)
+    conexion['salas'].add(sala)
+    _salas.setdefault(sala, set()).add(sid)
+    return True
+
+def token_sesion(sid):
+    """Token de sesión con el que se conectó un socket (o None)"""
+    conexion = _conexiones.get(sid)
+    return conexion['token'] if conexion else None
+
+def consumir_rpc(sid):
+    """Descuenta una llamada RPC del cupo de la conexión (token bucket)
+
+    Devuelve 0 si se permite o los segundos a esperar hasta el siguiente cupo.
+    """
+    conexion = _conexiones.get(sid)
+    if conexion is None:
+        return 0
+
+    config = get_config()
+    ahora = time.monotonic()
+    tokens, actualizado = conexion['rpc']
+    tokens = min(config.WS_RPC_RAFAGA, tokens + (ahora - actualizado) * config.WS_RPC_POR_SEGUNDO)
+    if tokens < 1:
+        conexion['rpc'] = [tokens, ahora]
+        _rechazos['rpc'] += 1
+        return (1 - tokens) / config.WS_RPC_POR_SEGUNDO
+
+    conexion['rpc'] = [tokens - 1, ahora]
+    return 0
+
+def salir_sala(sid, sala):
+    """Registra la salida de una sala"""
+    conexion = _conexiones.get(sid)
+    if conexion is not None:
+        _olvidar_sala(conexion, sala)
+    _quitar_de_sala(sid, sala)
+
+def cerrar_sala(sala):
+    """Elimina una sala y la pertenencia de todos sus miembros"""
+    for sid in _salas.pop(sala, set()):
+        conexion = _conexiones.get(sid)
+        if conexion is not None:
+            _olvidar_sala(conexion, sala)
+
+def poblacion(salas):
+    """Número de sockets locales que recibirían una emisión a las salas indicadas"""
+    if isinstance(salas, str):
+        return len(_salas.get(salas, ()))
+    miembros = set()
+    for sala in salas:
+        miembros |= _salas.get(sala, set())
+    return len(miembros)
+
+metricas.histograma('ttoca_ws_emision_segundos', 'Duración de cada emisión de Socket.IO por evento', ('evento',))
+metricas.histograma('ttoca_ws_destinatarios', 'Clientes alcanzados por cada emisión', ('evento',), metricas.BUCKETS_TAMANO)
+
+def registrar_emision(evento, destinatarios, segundos):
+    """Acumula la latencia y el alcance de una emisión"""
+    metricas.observar('ttoca_ws_emision_segundos', segundos, (evento,))
+    metricas.observar('ttoca_ws_destinatarios', destinatarios, (evento,))
+    estadistica = _emisiones.get(evento)
+    if estadistica is None:
+        estadistica = _emisiones[evento] = {
+            'total': 0, 'destinatarios': 0, 'ms_total': 0.0, 'ms_max': 0.0
+        }
+    ms = segundos * 1000
+    estadistica['total'] += 1
+    estadistica['destinatarios'] += destinatarios
+    estadistica['ms_total'] += ms
+    estadistica['ms_max'] = max(estadistica['ms_max'], ms)
+
+def estadisticas():
+    """Resumen del estado de las conexiones para el endpoint interno"""
+    rss = _rss_bytes()
+    return {
+        'conexiones': len(_conexiones),
+        'salas': {sala: len(miembros) for sala, miembros in _salas.items()},
+        'por_empresa': dict(_por_empresa),
+        'ips_principales': dict(_por_ip.most_common(20)),
+        'rechazos': dict(_rechazos),
+        'emisiones': {
+            evento: dict(
+                e,
+                ms_promedio=round(e['ms_total'] / e['total'], 3),
+                destinatarios_promedio=round(e['destinatarios'] / e['total'], 1)
+            )
+            for evento, e in _emisiones.items()
+        },
+        'memoria': {
+            'rss_bytes': rss,
+            'rss_por_conexion': rss // len(_conexiones) if rss and _conexiones else None
+        }
+    }
+
+def _olvidar_sala(conexion, sala):
+    """Quita la sala de la conexión y libera su plaza en la empresa si era la última"""
+    conexion['salas'].discard(sala)
+    for empresa_id, salas_empresa in list(conexion['empresas'].items()):
+        salas_empresa.discard(sala)
+        if not salas_empresa:
+            del conexion['empresas'][empresa_id]
+            _descontar(_por_empresa, empresa_id)
+
+def _quitar_de_sala(sid, sala):
+    miembros = _salas.get(sala)
+    if miembros is None:
+        return
+    miembros.discard(sid)
+    if not miembros:
+        del _salas[sala]
+
+def _descontar(contador, clave):
+    contador[clave] -= 1
+    if contador[clave] <= 0:
+        del contador[clave]
+
+def _rss_bytes():
+    """Memoria residente del proceso (solo Linux), o None si no está disponible"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
@@ -0,0 +1,83 @@
+"""
+Hash y verificación de contraseñas con bcrypt
+bcrypt es lento a propósito (~250 ms por intento con coste 12). Sin un
+límite, una ráfaga de logins o un ataque de credential stuffing ocupa todos
+los hilos del pool y deja sin servicio a las colas. Aquí como mucho
+BCRYPT_CONCURRENCIA cálculos se ejecutan a la vez; hasta BCRYPT_COLA_MAX
+esperan su turno y el resto se rechaza de inmediato con PoolSaturado.
+"""
+import threading
+import time
+import bcrypt
+from core.hilos import ejecutar
+from config import get_config
+
+class PoolSaturado(Exception):
+    """No hay capacidad para otro cálculo de bcrypt en este momento"""
+
+_semaforo = None
+_esperando = 0
+_lock = threading.Lock()
+
+_contadores = {'hashes': 0, 'verificaciones': 0, 'rechazados': 0, 'ms_max': 0.0}
+
+def _adquirir():
+    global _semaforo, _esperando
+    config = get_config()
+    with _lock:
+        if _semaforo is None:
+            _semaforo = threading.BoundedSemaphore(config.BCRYPT_CONCURRENCIA)
+        if _esperando >= config.BCRYPT_COLA_MAX:
+            _contadores['rechazados'] += 1
+            raise PoolSaturado()
+        _esperando += 1
+
+    try:
+        obtenido = _semaforo.acquire(timeout=config.BCRYPT_ESPERA_MAX_SEGUNDOS)
+    finally:
+        with _lock:
+            _esperando -= 1
+    if not obtenido:
+        with _lock:
+            _contadores['rechazados'] += 1
+        raise PoolSaturado()
+
+def _calcular(contador, funcion, *args):
+    _adquirir()
+    inicio = time.perf_counter()
+    try:
+        return ejecutar('bcrypt', funcion, *args)
+    finally:
+        _semaforo.release()
+        ms = (time.perf_counter() - inicio) * 1000
+        with _lock:
+            _contadores[contador] += 1
+            _contadores['ms_max'] = max(_contadores['ms_max'], ms)
+
+def hashear(password):
+    """Hash bcrypt con el coste configurado (BCRYPT_COSTE)"""
+    sal = bcrypt.gensalt(rounds=get_config().BCRYPT_COSTE)
+    return _calcular('hashes', bcrypt.hashpw, password.encode('utf-8'), sal).decode('utf-8')
+
+def verificar(password, hashed_password):
+    """Comprueba una contraseña contra su hash"""
+    return _calcular('verificaciones', bcrypt.checkpw, password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def necesita_rehash(hashed_password):
+    """Indica si el hash se generó con un coste distinto del configurado"""
+    try:
+        coste = int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return True
+    return coste != get_config().BCRYPT_COSTE
+
+def estadisticas():
+    """Ocupación del pool de bcrypt para el endpoint interno"""
+    config = get_config()
+    return dict(
+        _contadores,
+        ms_max=round(_contadores['ms_max'], 3),
+        coste=config.BCRYPT_COSTE,
+        concurrencia=config.BCRYPT_CONCURRENCIA,
+        esperando=_esperando
+    )
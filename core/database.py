@@ -1,26 +1,159 @@
 import sqlite3
 import json
 import os
+import sys
 from datetime import datetime
 from contextlib import contextmanager
+from time import perf_counter
+from core import metricas, perfil_db
+from core.events import abrir_outbox, cerrar_outbox, despachar
+from core.hilos import ejecutar
 
 DATABASE_NAME = 'ttoca.db'
 
-@contextmanager
-def get_db_connection():
-    """Context manager para manejar conexiones a la base de datos"""
-    conn = sqlite3.connect(DATABASE_NAME, timeout=10.0)  # Aumentar timeout para evitar locks
+metricas.histograma('ttoca_db_conexion_segundos', 'Apertura de conexión e inicio de transacción (incluye la espera por un hilo del pool)')
+metricas.histograma('ttoca_db_sentencia_segundos', 'Duración de cada sentencia SQL por función de servicio', ('funcion', 'tipo'))
+metricas.histograma('ttoca_db_espera_escritura_segundos', 'Primera escritura de cada transacción, que espera el lock de escritura de SQLite', ('funcion',))
+metricas.histograma('ttoca_db_commit_segundos', 'COMMIT de cada transacción (fsync del WAL) por función de servicio', ('funcion',))
+metricas.histograma('ttoca_db_transaccion_segundos', 'Duración de cada transacción completa (bloque with) por función de servicio', ('funcion',))
+
+def _tipo_sentencia(sql):
+    return 'lectura' if sql.lstrip()[:6].upper().startswith(('SELECT', 'PRAGMA', 'WITH')) else 'escritura'
+
+class _Cursor:
+    """Cursor sqlite3 que mide cada sentencia y, bajo eventlet, la ejecuta en el pool de core.hilos"""
+
+    def __init__(self, cursor, conexion):
+        self._cursor = cursor
+        self._conexion = conexion
+
+    def execute(self, *args):
+        self._conexion._medir(self._cursor.execute, args)
+        return self
+
+    def executemany(self, *args):
+        self._conexion._medir(self._cursor.executemany, args)
+        return self
+
+    def fetchone(self):
+        return ejecutar('sqlite', self._cursor.fetchone)
+
+    def fetchall(self):
+        return ejecutar('sqlite', self._cursor.fetchall)
+
+    def fetchmany(self, *args):
+        return ejecutar('sqlite', self._cursor.fetchmany, *args)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, nombre):
+        # rowcount, lastrowid, description...
+        return getattr(self._cursor, nombre)
+
+class _Conexion:
+    """Conexión sqlite3 que no bloquea el hub de eventlet y mide sus sentencias
+
+    funcion es la función de servicio que abrió la conexión (etiqueta de
+    las métricas).
+    """
+
+    def __init__(self, conn, funcion, perfil=None):
+        self._conn = conn
+        self._funcion = funcion
+        # Duración de la primera escritura (None mientras solo se lee)
+        self._espera_escritura = None
+        # Estado del progress handler de core.perfil_db (None si no está activo)
+        self._perfil = perfil
+
+    def _medir(self, metodo, args):
+        tipo = _tipo_sentencia(args[0])
+        if self._perfil:
+            self._perfil['pasos'] = 0
+        inicio = perf_counter()
+        try:
+            return ejecutar('sqlite', metodo, *args)
+        finally:
+            segundos = perf_counter() - inicio
+            metricas.observar('ttoca_db_sentencia_segundos', segundos, (self._funcion, tipo))
+            if tipo == 'escritura' and self._espera_escritura is None:
+                self._espera_escritura = segundos
+                metricas.observar('ttoca_db_espera_escritura_segundos', segundos, (self._funcion,))
+            if self._perfil:
+                self._perfilar(metodo, args, segundos)
+
+    def _perfilar(self, metodo, args, segundos):
+        pasos = self._perfil['pasos']
+        if perfil_db.sentencia(self._funcion, args[0], segundos, pasos):
+            # Con executemany no hay un único juego de parámetros para el plan
+            parametros = args[1] if len(args) > 1 and metodo.__name__ == 'execute' else ()
+            ejecutar('sqlite', perfil_db.anotar_lenta, self._conn, self._funcion, args[0], parametros, segundos, pasos)
+
+    def cursor(self):
+        return _Cursor(self._conn.cursor(), self)
+
+    def execute(self, *args):
+        return _Cursor(self._medir(self._conn.execute, args), self)
+
+    def executemany(self, *args):
+        return _Cursor(self._medir(self._conn.executemany, args), self)
+
+    def executescript(self, *args):
+        return _Cursor(ejecutar('sqlite', self._conn.executescript, *args), self)
+
+    def commit(self):
+        ejecutar('sqlite', self._conn.commit)
+
+    def rollback(self):
+        ejecutar('sqlite', self._conn.rollback)
+
+    def close(self):
+        ejecutar('sqlite', self._conn.close)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+def _abrir_conexion(funcion):
+    conn = sqlite3.connect(DATABASE_NAME, timeout=10.0, check_same_thread=False)  # Aumentar timeout para evitar locks
     conn.row_factory = sqlite3.Row  # Permite acceso por nombre de columna
     conn.execute('PRAGMA journal_mode=WAL')  # Write-Ahead Logging para mejor concurrencia
-    conn.execute('BEGIN')  # Iniciar transacción explícita
+    perfil = perfil_db.instalar(conn) if perfil_db.activo() else None
+    conn.execute('BEGIN')  # Iniciar transacción explícita (diferida: el lock se pide al escribir)
+    return _Conexion(conn, funcion, perfil)
+
+@contextmanager
+def get_db_connection():
+    """Context manager para manejar conexiones a la base de datos
+
+    Los eventos publicados con core.events.publicar dentro del bloque solo
+    se despachan si la transacción se confirma. Bajo eventlet cada operación
+    se ejecuta en el pool de hilos de core.hilos (incluida la espera por el
+    lock de escritura), así una consulta lenta no congela los WebSockets.
+    """
+    # Función de servicio que abrió la conexión: el marco 1 es contextlib
+    funcion = sys._getframe(2).f_code.co_name
+    inicio = perf_counter()
+    conn = ejecutar('sqlite', _abrir_conexion, funcion)
+    metricas.observar('ttoca_db_conexion_segundos', perf_counter() - inicio)
+    outbox = abrir_outbox()
     try:
         yield conn
+        inicio_commit = perf_counter()
         conn.commit()  # Commit automático al salir exitosamente
+        commit = perf_counter() - inicio_commit
+        metricas.observar('ttoca_db_commit_segundos', commit, (funcion,))
+        if conn._perfil:
+            perfil_db.transaccion(funcion, conn._espera_escritura, commit, perf_counter() - inicio)
     except Exception:
         conn.rollback()  # Rollback en caso de error
         raise
     finally:
         conn.close()
+        eventos = cerrar_outbox(outbox)
+        metricas.observar('ttoca_db_transaccion_segundos', perf_counter() - inicio, (funcion,))
+
+    # Solo se llega aquí tras un commit exitoso
+    despachar(eventos)
 
 def init_database():
     """Inicializa la base de datos con todas las tablas necesarias"""
@@ -107,6 +240,49 @@ def init_database():
             )
         ''')
         
+        # Versión de cada cola para el long-polling, común a todos los workers
+        # (ver core/longpoll.py): se asigna en la misma transacción que el cambio
+        _agregar_columnas(cursor, 'cola_categorias', {'version': 'INTEGER DEFAULT 0'})
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS contadores (
+                nombre TEXT PRIMARY KEY,
+                valor INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO contadores (nombre, valor) VALUES ('version', 0)")
+        
+        # Columnas estructuradas del turno actual (antes solo existía turno_data en JSON)
+        _agregar_columnas(cursor, 'turnos_actuales', {
+            'nombre': 'TEXT',
+            'numero': 'INTEGER',
+            'codigo': 'TEXT',
+            'posicion': 'INTEGER',
+            'llamado_en': 'REAL'
+        })
+        cursor.execute('SELECT id, turno_data FROM turnos_actuales WHERE codigo IS NULL')
+        for row in cursor.fetchall():
+            turno = json.loads(row['turno_data'])
+            cursor.execute('''
+                UPDATE turnos_actuales SET nombre = ?, numero = ?, codigo = ?, posicion = ?
+                WHERE id = ?
+            ''', (turno.get('nombre'), turno.get('numero'), turno.get('codigo', ''), turno.get('posicion'), row['id']))
+        
+        # Historial de llamadas (alimenta las pantallas de sala de espera)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llamadas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                empresa_id TEXT NOT NULL,
+                categoria_id TEXT NOT NULL,
+                turno_id TEXT NOT NULL,
+                nombre TEXT NOT NULL,
+                numero INTEGER NOT NULL,
+                codigo TEXT NOT NULL,
+                llamado_en REAL NOT NULL,
+                FOREIGN KEY (empresa_id) REFERENCES empresas (id) ON DELETE CASCADE,
+                FOREIGN KEY (categoria_id) REFERENCES cola_categorias (id) ON DELETE CASCADE
+            )
+        ''')
+        
         # Índices para mejorar el rendimiento
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_empresas_user_email ON empresas (user_email)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_categorias_empresa ON cola_categorias (empresa_id)')
@@ -114,10 +290,19 @@ def init_database():
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_turnos_empresa ON turnos (empresa_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_turnos_estado ON turnos (estado)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_turnos_posicion ON turnos (posicion)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_llamadas_empresa ON llamadas (empresa_id, categoria_id, id)')
         
         # El commit se hace automáticamente al salir del context manager
         print("[OK] Base de datos inicializada correctamente")
 
+def _agregar_columnas(cursor, tabla, columnas):
+    """Agrega a una tabla existente las columnas que le falten"""
+    cursor.execute(f'PRAGMA table_info({tabla})')
+    existentes = {row['name'] for row in cursor.fetchall()}
+    for nombre, tipo in columnas.items():
+        if nombre not in existentes:
+            cursor.execute(f'ALTER TABLE {tabla} ADD COLUMN {nombre} {tipo}')
+
 def migrate_from_json():
     """Migra datos existentes de archivos JSON a SQLite"""
     print("[MIGRACION] Iniciando migración de datos JSON a SQLite...")
@@ -0,0 +1,100 @@
+"""
+Registro de deltas por cola para el protocolo incremental de WebSocket
+Cada mutación de una cola genera un delta con número de secuencia propio;
+los últimos deltas se guardan en un buffer circular para que los clientes
+que se reconectan puedan reanudar sin pedir la lista completa
+"""
+import uuid
+from collections import deque
+from config import get_config
+
+# Identifica la vida de este proceso: las secuencias de otro arranque no son reanudables
+EPOCA = uuid.uuid4().hex[:8]
+
+# Registro por cola: (empresa_id, cola_id) -> {'seq': int, 'buffer': deque}
+_registros = {}
+
+def _registro(empresa_id, cola_id):
+    clave = (empresa_id, cola_id)
+    registro = _registros.get(clave)
+    if registro is None:
+        registro = _registros[clave] = {
+            'seq': 0,
+            'buffer': deque(maxlen=get_config().WS_DELTA_BUFFER)
+        }
+    return registro
+
+def seq_actual(empresa_id, cola_id):
+    """Obtiene el último número de secuencia emitido para una cola"""
+    registro = _registros.get((empresa_id, cola_id))
+    return registro['seq'] if registro else 0
+
+def combinar_cambios(agregados, retirados):
+    """Combina los cambios acumulados de una cola antes de registrar su delta
+
+    Un turno agregado y llamado dentro de la misma ventana no viaja en el delta.
+    """
+    ids_agregados = {turno['id'] for turno in agregados}
+    ids_retirados = set(retirados)
+    return (
+        [t for t in agregados if t['id'] not in ids_retirados],
+        [i for i in retirados if i not in ids_agregados]
+    )
+
+def registrar_delta(empresa_id, cola_id, agregados=(), retirados=(), turno_actual=None):
+    """Crea el siguiente delta de una cola y lo guarda en el buffer circular"""
+    registro = _registro(empresa_id, cola_id)
+    registro['seq'] += 1
+
+    delta = {
+        'empresaId': empresa_id,
+        'colaId': cola_id,
+        'epoca': EPOCA,
+        'seq': registro['seq'],
+        'agregados': list(agregados),
+        'retirados': list(retirados)
+    }
+    # turnoActual solo viaja cuando cambia
+    if turno_actual is not None:
+        delta['turnoActual'] = turno_actual
+
+    registro['buffer'].append(delta)
+    return delta
+
+def _secuencia(seq):
+    """Secuencia enviada por el cliente como entero, o None si no es válida"""
+    if isinstance(seq, bool):
+        return None
+    try:
+        seq = int(seq)
+    except (TypeError, ValueError):
+        return None
+    return seq if seq >= 0 else None
+
+def deltas_desde(empresa_id, cola_id, epoca, seq):
+    """Obtiene los deltas posteriores a una secuencia, o None si hay un hueco
+
+    epoca y seq llegan tal como los envía el cliente: cualquier valor que no
+    se pueda interpretar se trata como un hueco (el cliente recibe un snapshot).
+    """
+    seq = _secuencia(seq)
+    if str(epoca) != EPOCA or seq is None:
+        return None
+
+    registro = _registros.get((empresa_id, cola_id))
+    ultimo = registro['seq'] if registro else 0
+    if seq > ultimo:
+        return None
+    if seq == ultimo:
+        return []
+
+    buffer = registro['buffer']
+    # El buffer debe contener el delta inmediatamente posterior al del cliente
+    if not buffer or buffer[0]['seq'] > seq + 1:
+        return None
+
+    return [delta for delta in buffer if delta['seq'] > seq]
+
+def descartar_cola(empresa_id, cola_id):
+    """Elimina el registro de deltas de una cola borrada"""
+    _registros.pop((empresa_id, cola_id), None)
@@ -0,0 +1,262 @@
+"""
+Difusión de los cambios de las colas a los clientes en tiempo real
+Los servicios publican eventos en core.events; aquí se reciben tras el commit
+y los cambios de una misma cola dentro de una ventana corta se agrupan en un
+único delta para no emitir una vez por cada turno durante una avalancha. De
+cada grupo salen el delta de la cola, los avisos de llamada, la posición de
+los turnos seguidos individualmente y el resumen compacto para la empresa.
+
+Todo esto es igual en los dos modos del servidor: core.websocket (eventlet)
+y core.websocket_asgi (asyncio) solo aportan un Transporte, que sabe emitir
+a las salas, cerrarlas y programar tareas en su modelo de concurrencia.
+"""
+import time
+from functools import partial
+from eventlet import patcher
+from core import connections, backpressure, snapshots, tickets, sse, serializacion, registro
+from core.deltas import registrar_delta, descartar_cola, combinar_cambios
+from core.events import suscribir
+from config import get_config
+
+# En el modo ASGI los eventos llegan desde los hilos del executor
+_threading = patcher.original('threading')
+
+class Transporte:
+    """Interfaz común de los servidores Socket.IO
+
+    Las subclases implementan el envío y la planificación de tareas; el
+    agrupado, los resúmenes y la contrapresión se hacen aquí y en
+    core.backpressure.
+    """
+
+    def emitir(self, evento, datos, to, omitir=None):
+        """Emite a una sala, una lista de salas o un sid, salvo a los sids de omitir"""
+        raise NotImplementedError('El transporte debe implementar emitir()')
+
+    def cerrar_sala(self, sala):
+        """Saca de la sala a todos sus miembros"""
+        raise NotImplementedError('El transporte debe implementar cerrar_sala()')
+
+    def participantes(self, salas):
+        """Pares (sid, eio_sid) de los miembros de las salas"""
+        raise NotImplementedError('El transporte debe implementar participantes()')
+
+    def cola_salida(self, eio_sid):
+        """Paquetes pendientes de envío de un cliente, o None si ya no está conectado"""
+        raise NotImplementedError('El transporte debe implementar cola_salida()')
+
+    def desconectar(self, sid):
+        raise NotImplementedError('El transporte debe implementar desconectar()')
+
+    def programar(self, segundos, funcion, *args):
+        """Ejecuta funcion(*args) en segundo plano pasados segundos"""
+        raise NotImplementedError('El transporte debe implementar programar()')
+
+    def iniciar_tarea(self, funcion, *args):
+        """Ejecuta funcion(*args) en segundo plano; puede llamar a dormir()"""
+        raise NotImplementedError('El transporte debe implementar iniciar_tarea()')
+
+    def dormir(self, segundos):
+        raise NotImplementedError('El transporte debe implementar dormir()')
+
+# Transporte del servidor en marcha (None sin servidor Socket.IO: scripts, tests)
+_transporte = None
+
+# Cambios pendientes por cola: (empresa_id, cola_id) -> {'agregados', 'retirados', 'llamados', 'estado'}
+_pendientes = {}
+_lock_pendientes = _threading.Lock()
+
+# Último resumen conocido por empresa: empresa_id -> {cola_id: resumen}
+_resumenes = {}
+
+def configurar(transporte):
+    """Registra el transporte del servidor que emitirá los cambios"""
+    global _transporte
+    _transporte = transporte
+
+def turno_compacto(turno):
+    """Reduce un turno a los campos que muestra un panel de empresa"""
+    return {'id': turno['id'], 'numero': turno['numero'], 'codigo': turno['codigo']}
+
+def construir_resumen_empresa(empresa_id):
+    """Construye el resumen compacto de todas las colas de una empresa"""
+    from services.cola_config_service import obtener_categorias_resumen
+    from services.cola_service import obtener_turnos_actuales_empresa
+
+    actuales = obtener_turnos_actuales_empresa(empresa_id)
+    colas = {}
+    for categoria in obtener_categorias_resumen(empresa_id):
+        actual = actuales.get(categoria['id'])
+        colas[categoria['id']] = {
+            'enEspera': categoria['turnos_en_espera'],
+            'etaMinutos': categoria['turnos_en_espera'] * categoria['tiempoEstimado'],
+            'turnoActual': turno_compacto(actual) if actual else None
+        }
+
+    # Se conserva para completar los resúmenes incrementales posteriores
+    _resumenes[empresa_id] = dict(colas)
+    return {'empresaId': empresa_id, 'colas': colas}
+
+def _salas(empresa_id, cola_id):
+    """Salas que reciben los eventos de una cola (la cola y su empresa)"""
+    return [f"queue_{empresa_id}_{cola_id}", f"empresa_{empresa_id}"]
+
+def _emitir(evento, datos, salas, reemplazo=None):
+    """Emite a una o varias salas registrando latencia y alcance
+
+    Los clientes lentos no reciben el evento directamente: se retiene en
+    core.backpressure. reemplazo es (clave, evento, datos) para los eventos
+    cuyo estado intermedio puede sustituirse; sin él el evento es crítico.
+    """
+    inicio = time.perf_counter()
+    # Una sola serialización para Socket.IO, SSE y los clientes lentos
+    datos = serializacion.Precodificado(datos)
+    lentos = backpressure.clientes_lentos(_transporte, salas)
+    _transporte.emitir(evento, datos, salas, omitir=list(lentos) or None)
+    # Las pantallas conectadas por SSE reciben el mismo flujo (solo en el modo eventlet hay)
+    sse.difundir(evento, datos, salas)
+
+    for sid, eio_sid in lentos.items():
+        if reemplazo is None:
+            backpressure.retener(_transporte, sid, eio_sid, evento, datos)
+        else:
+            clave, evento_retenido, datos_retenidos = reemplazo
+            backpressure.retener(_transporte, sid, eio_sid, evento_retenido, datos_retenidos, clave)
+
+    connections.registrar_emision(evento, connections.poblacion(salas), time.perf_counter() - inicio)
+
+def _cerrar_sala(sala):
+    _transporte.cerrar_sala(sala)
+    connections.cerrar_sala(sala)
+
+def _acumular(empresa_id, cola_id, turno, llamado, en_espera, tiempo_estimado):
+    """Añade un cambio a los pendientes de su cola, programando su envío si es el primero"""
+    clave = (empresa_id, cola_id)
+    with _lock_pendientes:
+        pendiente = _pendientes.get(clave)
+        if pendiente is None:
+            pendiente = _pendientes[clave] = {'agregados': [], 'retirados': [], 'llamados': [], 'estado': None}
+            _transporte.programar(get_config().WS_COALESCE_VENTANA_MS / 1000, vaciar, clave)
+
+        if llamado:
+            pendiente['retirados'].append(turno['id'])
+            pendiente['llamados'].append(turno)
+        else:
+            pendiente['agregados'].append(turno)
+        if en_espera is not None:
+            pendiente['estado'] = (en_espera, tiempo_estimado)
+
+def vaciar(clave):
+    """Emite en un único delta todos los cambios acumulados de una cola"""
+    with _lock_pendientes:
+        pendiente = _pendientes.pop(clave, None)
+    if pendiente is None or _transporte is None:
+        return
+
+    inicio = time.perf_counter()
+    empresa_id, cola_id = clave
+    llamados = pendiente['llamados']
+
+    agregados, retirados = combinar_cambios(pendiente['agregados'], pendiente['retirados'])
+
+    delta = registrar_delta(
+        empresa_id, cola_id,
+        agregados=agregados,
+        retirados=retirados,
+        turno_actual=llamados[-1] if llamados else None
+    )
+
+    # La sala de la cola recibe el delta; la de empresa solo el resumen compacto
+    salas = _salas(empresa_id, cola_id)
+    # A un cliente lento se le sustituyen los deltas por un snapshot al drenar
+    _emitir('queue_delta', delta, salas[0], reemplazo=(
+        ('cola', empresa_id, cola_id), 'queue_snapshot', partial(snapshots.snapshot_cola, empresa_id, cola_id)
+    ))
+
+    # Los avisos de llamada no se agrupan: cada pantalla debe anunciar cada turno.
+    # Una sola emisión con lista de salas: el paquete se codifica una vez
+    for turno in llamados:
+        _emitir('turno_llamado', {
+            'empresaId': empresa_id,
+            'colaId': cola_id,
+            'seq': delta['seq'],
+            'turno': turno
+        }, salas)
+
+    # Posición de cada turno seguido individualmente: una consulta para toda la cola
+    if llamados:
+        tiempo_estimado = pendiente['estado'][1] if pendiente['estado'] else None
+        for turno_id, mensaje, critico in tickets.recalcular(empresa_id, cola_id, tiempo_estimado):
+            sala = tickets.sala_ticket(turno_id)
+            if mensaje.get('llamado'):
+                # Último mensaje del turno: la sala ya no tiene uso
+                _emitir('posicion_turno', mensaje, sala)
+                _cerrar_sala(sala)
+            elif critico:
+                _emitir('posicion_turno', mensaje, sala)
+            else:
+                _emitir('posicion_turno', mensaje, sala, reemplazo=(('ticket', turno_id), 'posicion_turno', mensaje))
+
+    if pendiente['estado'] is not None:
+        resumen = _resumen_cola(empresa_id, cola_id, pendiente)
+        _emitir('resumen_cola', resumen, salas[1], reemplazo=(('resumen', cola_id), 'resumen_cola', resumen))
+
+    registro.info(
+        'ws', 'queue_delta', empresa_id=empresa_id, categoria_id=cola_id, seq=delta['seq'],
+        cambios=len(agregados) + len(retirados), latencia_ms=round((time.perf_counter() - inicio) * 1000, 3)
+    )
+
+def _resumen_cola(empresa_id, cola_id, pendiente):
+    """Construye el resumen compacto de una cola tras aplicar los cambios pendientes"""
+    en_espera, tiempo_estimado = pendiente['estado']
+    resumen = {'enEspera': en_espera, 'etaMinutos': en_espera * tiempo_estimado}
+
+    conocidos = _resumenes.get(empresa_id)
+    if pendiente['llamados']:
+        resumen['turnoActual'] = turno_compacto(pendiente['llamados'][-1])
+    elif conocidos and cola_id in conocidos:
+        resumen['turnoActual'] = conocidos[cola_id]['turnoActual']
+
+    if conocidos is not None and 'turnoActual' in resumen:
+        conocidos[cola_id] = resumen
+
+    return dict(resumen, empresaId=empresa_id, colaId=cola_id)
+
+def _on_turno_llamado(empresa_id, cola_id, turno, en_espera=None, tiempo_estimado=None, **_):
+    if _transporte is not None:
+        _acumular(empresa_id, cola_id, turno, True, en_espera, tiempo_estimado)
+
+def _on_turno_agregado(empresa_id, cola_id, turno, en_espera=None, tiempo_estimado=None, **_):
+    if _transporte is not None:
+        _acumular(empresa_id, cola_id, turno, False, en_espera, tiempo_estimado)
+
+def _on_cola_eliminada(empresa_id, cola_id, **_):
+    with _lock_pendientes:
+        _pendientes.pop((empresa_id, cola_id), None)
+    _resumenes.get(empresa_id, {}).pop(cola_id, None)
+    descartar_cola(empresa_id, cola_id)
+    snapshots.descartar_cola(empresa_id, cola_id)
+    if _transporte is None:
+        return
+
+    salas = _salas(empresa_id, cola_id)
+    _emitir('cola_eliminada', {
+        'empresaId': empresa_id,
+        'colaId': cola_id
+    }, salas)
+
+    # Los turnos seguidos individualmente también dejan de existir
+    for turno_id in tickets.descartar_cola(empresa_id, cola_id):
+        sala = tickets.sala_ticket(turno_id)
+        _emitir('cola_eliminada', {'empresaId': empresa_id, 'colaId': cola_id}, sala)
+        _cerrar_sala(sala)
+
+    # La sala de la cola borrada ya no recibirá eventos: liberarla
+    _cerrar_sala(salas[0])
+    sse.descartar_sala(salas[0])
+
+    registro.info('ws', 'cola_eliminada', empresa_id=empresa_id, categoria_id=cola_id)
+
+suscribir('turno_agregado', _on_turno_agregado)
+suscribir('turno_llamado', _on_turno_llamado)
+suscribir('cola_eliminada', _on_cola_eliminada)
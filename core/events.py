@@ -0,0 +1,66 @@
+"""
+Outbox de eventos de dominio
+Los servicios publican eventos dentro de una transacción y estos solo se
+entregan a los suscriptores (WebSocket, long-polling...) después del commit;
+si la transacción hace rollback los eventos se descartan
+"""
+from contextvars import ContextVar
+from core import registro
+
+# Eventos pendientes de la transacción en curso (una lista por greenlet)
+_pendientes = ContextVar('eventos_pendientes', default=None)
+
+# Suscriptores por nombre de evento: nombre -> [callback]
+_suscriptores = {}
+
+# Transmisores que reenvían los eventos confirmados a otros procesos (core.bus)
+_transmisores = []
+
+def suscribir(nombre, callback):
+    """Registra un callback que recibirá los datos del evento como kwargs"""
+    _suscriptores.setdefault(nombre, []).append(callback)
+
+def agregar_transmisor(callback):
+    """Registra un callback que recibirá la lista de eventos de cada transacción confirmada"""
+    _transmisores.append(callback)
+
+def publicar(nombre, **datos):
+    """Publica un evento; dentro de una transacción se retiene hasta el commit"""
+    pendientes = _pendientes.get()
+    if pendientes is None:
+        despachar([(nombre, datos)])
+    else:
+        pendientes.append((nombre, datos))
+
+def abrir_outbox():
+    """Abre el outbox de una transacción y devuelve su token"""
+    return _pendientes.set([])
+
+def cerrar_outbox(token):
+    """Cierra el outbox de una transacción y devuelve sus eventos retenidos"""
+    pendientes = _pendientes.get()
+    _pendientes.reset(token)
+    return pendientes
+
+def despachar(eventos):
+    """Entrega los eventos de una transacción confirmada a este y a los demás procesos"""
+    if not eventos:
+        return
+
+    for nombre, datos in eventos:
+        despachar_local(nombre, datos)
+
+    for transmisor in _transmisores:
+        try:
+            transmisor(eventos)
+        except Exception as e:
+            registro.error('eventos', 'transmision_fallida', error=repr(e))
+
+def despachar_local(nombre, datos):
+    """Entrega un evento solo a los suscriptores de este proceso"""
+    for callback in _suscriptores.get(nombre, []):
+        try:
+            callback(**datos)
+        except Exception as e:
+            # Un suscriptor fallido no debe afectar a la transacción ya confirmada
+            registro.error('eventos', 'suscriptor_fallido', evento_dominio=nombre, suscriptor=callback.__name__, error=repr(e))
@@ -0,0 +1,101 @@
+"""
+Ejecución de trabajo bloqueante fuera del hub de eventlet
+sqlite3 y bcrypt son extensiones en C que eventlet no puede volver
+cooperativas: mientras se ejecutan, el hub se detiene y con él todos los
+WebSockets del proceso. Con el proceso monkey-patcheado se envían a un pool
+acotado de hilos nativos (eventlet.tpool) y el greenlet que las pidió espera
+sin bloquear a los demás. Sin monkey-patching (scripts, tests) se ejecutan
+directamente.
+
+En el modo ASGI (asgi.py) no hay eventlet: ejecutar_async lleva los
+servicios completos a un ThreadPoolExecutor del mismo tamaño.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from eventlet import patcher, tpool
+from config import get_config
+
+# Llamadas al pool por tipo de trabajo: tipo -> métricas
+_metricas = {}
+
+# Llamadas enviadas al pool que aún no terminaron (en ejecución o esperando hilo)
+_en_curso = 0
+
+_hilos = None
+
+# Executor del modo ASGI (se crea en el primer uso)
+_ejecutor = None
+
+def activo():
+    """Indica si el proceso está monkey-patcheado y el trabajo va al pool"""
+    return patcher.is_monkey_patched('thread')
+
+def _configurar():
+    """Fija el tamaño del pool antes de su primer uso"""
+    global _hilos
+    _hilos = get_config().TPOOL_HILOS
+    tpool.set_num_threads(_hilos)
+
+@contextmanager
+def _medir(tipo):
+    global _en_curso
+    metricas = _metricas.get(tipo)
+    if metricas is None:
+        metricas = _metricas[tipo] = {'total': 0, 'ms_total': 0.0, 'ms_max': 0.0, 'en_cola_max': 0}
+
+    _en_curso += 1
+    metricas['en_cola_max'] = max(metricas['en_cola_max'], _en_curso - _hilos)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _en_curso -= 1
+        ms = (time.perf_counter() - inicio) * 1000
+        metricas['total'] += 1
+        metricas['ms_total'] += ms
+        metricas['ms_max'] = max(metricas['ms_max'], ms)
+
+def ejecutar(tipo, funcion, *args, **kwargs):
+    """Ejecuta funcion en el pool de hilos y devuelve su resultado
+
+    tipo agrupa las métricas ('sqlite', 'bcrypt', ...).
+    """
+    if not activo():
+        return funcion(*args, **kwargs)
+    if _hilos is None:
+        _configurar()
+
+    with _medir(tipo):
+        return tpool.execute(funcion, *args, **kwargs)
+
+async def ejecutar_async(tipo, funcion, *args, **kwargs):
+    """Ejecuta funcion en el executor del modo ASGI sin bloquear el event loop"""
+    global _ejecutor, _hilos
+    if _ejecutor is None:
+        _hilos = get_config().TPOOL_HILOS
+        _ejecutor = ThreadPoolExecutor(max_workers=_hilos, thread_name_prefix='ttoca')
+
+    with _medir(tipo):
+        return await asyncio.get_running_loop().run_in_executor(_ejecutor, partial(funcion, *args, **kwargs))
+
+def estadisticas():
+    """Ocupación del pool de hilos para el endpoint interno"""
+    return {
+        'activo': activo() or _ejecutor is not None,
+        'hilos': _hilos,
+        'en_curso': _en_curso,
+        # Llamadas esperando un hilo libre en este momento
+        'en_cola': max(0, _en_curso - (_hilos or 0)),
+        'por_tipo': {
+            tipo: dict(
+                m,
+                ms_total=round(m['ms_total'], 3),
+                ms_max=round(m['ms_max'], 3),
+                ms_promedio=round(m['ms_total'] / m['total'], 3) if m['total'] else 0.0
+            )
+            for tipo, m in _metricas.items()
+        }
+    }
@@ -0,0 +1,141 @@
+"""
+Límites de ritmo en memoria (token bucket)
+Cada clave ('login-email:ana@x.com', 'login-ip:1.2.3.4', ...) tiene su
+propio cubo que se rellena a un ritmo fijo hasta un máximo (la ráfaga).
+Los límites son por proceso: con varios workers el límite efectivo es la
+suma de todos.
+
+Las mutaciones de colas pasan además por un control de admisión por
+empresa: SQLite tiene un solo escritor, y un kiosco descontrolado no debe
+ocupar la cola de escritura de todos los demás clientes.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import jsonify
+from core.proxy import ip_cliente
+from config import get_config
+
+# Cubos por clave: clave -> [tokens, actualizado] (el usado más recientemente al final)
+_cubos = OrderedDict()
+
+# Peticiones rechazadas por tipo de límite
+_rechazos = {}
+
+# Mutaciones en curso por empresa: empresa_id -> n
+_en_curso = {}
+
+# En el modo ASGI las vistas corren en varios hilos a la vez
+_lock = threading.Lock()
+
+def _tokens(clave, por_segundo, rafaga, ahora):
+    """Tokens disponibles en el cubo de clave tras rellenarlo (con _lock tomado)"""
+    cubo = _cubos.get(clave)
+    if cubo is None:
+        # Un cubo olvidado vuelve lleno: solo se descartan los más antiguos
+        if len(_cubos) >= get_config().LIMITES_MAX_CLAVES:
+            _cubos.popitem(last=False)
+        return rafaga
+    _cubos.move_to_end(clave)
+    return min(rafaga, cubo[0] + (ahora - cubo[1]) * por_segundo)
+
+def consumir_todos(limites):
+    """Descuenta un intento de cada cubo, o de ninguno si alguno está agotado
+
+    limites es una lista de (tipo, clave, por_segundo, rafaga). Devuelve 0
+    si se permite o los segundos a esperar hasta que todos tengan cupo: una
+    petición rechazada por un límite no gasta el cupo de los demás.
+    """
+    with _lock:
+        ahora = time.monotonic()
+        cubos = []
+        espera = 0
+        for tipo, clave, por_segundo, rafaga in limites:
+            clave = f"{tipo}:{clave}"
+            tokens = _tokens(clave, por_segundo, rafaga, ahora)
+            if tokens < 1:
+                _rechazos[tipo] = _rechazos.get(tipo, 0) + 1
+                espera = max(espera, (1 - tokens) / por_segundo)
+            cubos.append((clave, tokens))
+
+        for clave, tokens in cubos:
+            _cubos[clave] = [tokens if espera else tokens - 1, ahora]
+        return espera
+
+def consumir(tipo, clave, por_segundo, rafaga):
+    """Descuenta un intento del cubo de clave
+
+    Devuelve 0 si se permite o los segundos a esperar hasta el siguiente cupo.
+    """
+    return consumir_todos([(tipo, clave, por_segundo, rafaga)])
+
+def respuesta_limitada(espera, mensaje='Demasiados intentos, espera un momento'):
+    """Respuesta 429 con la cabecera Retry-After en segundos enteros"""
+    respuesta = jsonify({'message': mensaje, 'retryAfter': round(espera, 3)})
+    respuesta.status_code = 429
+    respuesta.headers['Retry-After'] = str(max(1, int(espera + 0.999)))
+    return respuesta
+
+def admitir_mutacion(empresa_id, cola_id, ip=None):
+    """Aplica los límites de mutación por IP, empresa y cola
+
+    Devuelve 0 si se permite o los segundos a esperar. Se comprueban los
+    tres antes de descontar: un kiosco frenado por su cola no agota el cupo
+    de su empresa ni el de su IP.
+    """
+    config = get_config()
+    limites = [
+        ('mutacion-empresa', empresa_id, config.MUTACIONES_POR_SEGUNDO_EMPRESA, config.MUTACIONES_RAFAGA_EMPRESA),
+        ('mutacion-cola', f"{empresa_id}:{cola_id}", config.MUTACIONES_POR_SEGUNDO_COLA, config.MUTACIONES_RAFAGA_COLA)
+    ]
+    if ip is not None:
+        limites.insert(0, ('mutacion-ip', ip, config.MUTACIONES_POR_SEGUNDO_IP, config.MUTACIONES_RAFAGA_IP))
+    return consumir_todos(limites)
+
+def _ocupar(empresa_id):
+    """Reserva un hueco de escritura para la empresa (False si no quedan)"""
+    with _lock:
+        n = _en_curso.get(empresa_id, 0)
+        if n >= get_config().MUTACIONES_EN_CURSO_POR_EMPRESA:
+            _rechazos['mutacion-en-curso'] = _rechazos.get('mutacion-en-curso', 0) + 1
+            return False
+        _en_curso[empresa_id] = n + 1
+        return True
+
+def _liberar(empresa_id):
+    with _lock:
+        n = _en_curso.pop(empresa_id) - 1
+        if n:
+            _en_curso[empresa_id] = n
+
+def limitar_mutacion(empresa='id_empresa', cola='id_cola'):
+    """Protege una ruta que modifica una cola con los límites de mutación
+
+    empresa y cola son los nombres de los parámetros de la URL.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            empresa_id = kwargs.get(empresa)
+            espera = admitir_mutacion(empresa_id, kwargs.get(cola), ip_cliente())
+            if espera:
+                return respuesta_limitada(espera, 'Demasiadas solicitudes, espera un momento')
+
+            # Una empresa no acapara el escritor aunque respete el ritmo
+            if not _ocupar(empresa_id):
+                return respuesta_limitada(1, 'Demasiadas solicitudes en curso para esta empresa')
+            try:
+                return vista(*args, **kwargs)
+            finally:
+                _liberar(empresa_id)
+        return envoltura
+    return decorador
+
+def estadisticas():
+    """Cubos activos y rechazos para el endpoint interno"""
+    return {
+        'claves': len(_cubos),
+        'rechazos': dict(_rechazos),
+        'mutaciones_en_curso': sum(_en_curso.values())
+    }
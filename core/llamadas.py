@@ -0,0 +1,92 @@
+"""
+Llamadas recientes para las pantallas de sala de espera
+Cada cola guarda en memoria sus últimas LLAMADAS_RECIENTES llamadas y el
+feed de una empresa se obtiene mezclándolas, así una pantalla pide todo con
+una sola llamada en lugar de un /turno-actual por cola. El historial se
+persiste en la tabla llamadas y se carga de la BD la primera vez que se pide
+el feed de una empresa (p. ej. tras un reinicio).
+"""
+import heapq
+from collections import deque
+from itertools import islice
+from core.events import suscribir
+from config import get_config
+
+# Últimas llamadas por cola: empresa_id -> {cola_id: deque de entradas (más antigua primero)}
+_recientes = {}
+
+# Empresas cuyo historial ya se cargó de la BD
+_cargadas = set()
+
+def _entrada(cola_id, turno_id, nombre, numero, codigo, llamada_id, llamado_en):
+    return {
+        'id': llamada_id,
+        'colaId': cola_id,
+        'turnoId': turno_id,
+        'nombre': nombre,
+        'numero': numero,
+        'codigo': codigo,
+        'llamadoEn': llamado_en
+    }
+
+def _buffer(empresa_id, cola_id):
+    colas = _recientes.setdefault(empresa_id, {})
+    buffer = colas.get(cola_id)
+    if buffer is None:
+        buffer = colas[cola_id] = deque(maxlen=get_config().LLAMADAS_RECIENTES)
+    return buffer
+
+def _cargar(empresa_id):
+    """Completa los buffers de una empresa con el historial de la BD"""
+    from services.cola_service import obtener_llamadas_recientes
+
+    # Se marca antes de leer: las llamadas que lleguen mientras tanto se
+    # agregan al buffer y se combinan con lo leído sin duplicarse
+    _cargadas.add(empresa_id)
+    filas = obtener_llamadas_recientes(empresa_id, get_config().LLAMADAS_RECIENTES)
+    if filas is None:
+        _cargadas.discard(empresa_id)
+        return
+
+    por_cola = {}
+    for fila in filas:
+        por_cola.setdefault(fila['categoria_id'], []).append(_entrada(
+            fila['categoria_id'], fila['turno_id'], fila['nombre'], fila['numero'],
+            fila['codigo'], fila['id'], fila['llamado_en']
+        ))
+
+    for cola_id, entradas in por_cola.items():
+        buffer = _buffer(empresa_id, cola_id)
+        conocidas = {entrada['id'] for entrada in buffer}
+        combinadas = sorted(
+            list(buffer) + [e for e in entradas if e['id'] not in conocidas],
+            key=lambda e: e['id']
+        )
+        buffer.clear()
+        buffer.extend(combinadas)
+
+def recientes_empresa(empresa_id, limite=None):
+    """Últimas llamadas de todas las colas de una empresa, la más reciente primero"""
+    maximo = get_config().LLAMADAS_RECIENTES
+    limite = maximo if limite is None else max(0, min(limite, maximo))
+    if empresa_id not in _cargadas:
+        _cargar(empresa_id)
+
+    # Cada buffer ya está ordenado: basta con mezclarlos (el id de la BD es global)
+    buffers = [reversed(buffer) for buffer in _recientes.get(empresa_id, {}).values()]
+    return list(islice(heapq.merge(*buffers, key=lambda e: e['id'], reverse=True), limite))
+
+def _on_turno_llamado(empresa_id, cola_id, turno, llamada=None, **_):
+    # Sin historial cargado no hace falta guardar nada: se leerá de la BD
+    if llamada is None or empresa_id not in _cargadas:
+        return
+    _buffer(empresa_id, cola_id).append(_entrada(
+        cola_id, turno['id'], turno['nombre'], turno['numero'], turno['codigo'],
+        llamada['id'], llamada['llamado_en']
+    ))
+
+def _on_cola_eliminada(empresa_id, cola_id, **_):
+    _recientes.get(empresa_id, {}).pop(cola_id, None)
+
+suscribir('turno_llamado', _on_turno_llamado)
+suscribir('cola_eliminada', _on_cola_eliminada)
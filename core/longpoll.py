@@ -0,0 +1,190 @@
+"""
+Long-polling para clientes que no pueden mantener una conexión WebSocket
+Cada cambio en una cola incrementa su versión y despierta de una sola vez
+a todas las peticiones que estaban esperando esa cola o su empresa
+
+Las versiones las asigna la BD en la transacción del cambio (contador
+global, ver services.cola_service) y viajan en el evento, también por el
+bus: todos los workers dan la misma versión para el mismo estado y un
+cliente balanceado entre ellos no ve cambios que no existen. Un worker que
+no recibió los eventos anteriores (recién arrancado) lee las versiones de
+la BD la primera vez que se le pregunta por una empresa.
+"""
+from eventlet import patcher
+from eventlet.event import Event
+from core.events import suscribir
+from core import hilos
+from config import get_config
+
+# En el modo ASGI las peticiones de Flask se atienden en hilos del executor
+# (core.hilos): ahí se espera con Events nativos
+_threading = patcher.original('threading')
+
+# Versión actual de cada cola: (empresa_id, cola_id) -> versión
+_versiones_cola = {}
+
+# Versiones por cola agrupadas por empresa: empresa_id -> {cola_id: versión}
+_versiones_empresa = {}
+
+# Empresas cuyas versiones ya se leyeron de la BD
+_cargadas = set()
+
+# Eventos pendientes: clave -> [evento, clientes esperando]. Solo existen
+# mientras haya clientes esperando: el último en irse retira la entrada
+_eventos = {}
+
+# Lo mismo en el modo ASGI; el lock evita perder un cambio entre comprobar
+# la versión y registrar el evento
+_eventos_hilos = {}
+_lock_hilos = _threading.Lock()
+_esperas_hilos = 0
+
+def _clave_cola(empresa_id, cola_id):
+    return ('cola', empresa_id, cola_id)
+
+def _clave_empresa(empresa_id):
+    return ('empresa', empresa_id)
+
+def _guardar(empresa_id, cola_id, version):
+    """Guarda la versión de una cola si es más reciente que la conocida"""
+    if version <= _versiones_cola.get((empresa_id, cola_id), 0):
+        return False
+    _versiones_cola[(empresa_id, cola_id)] = version
+    _versiones_empresa.setdefault(empresa_id, {})[cola_id] = version
+    return True
+
+def _cargar(empresa_id):
+    """Lee de la BD las versiones de una empresa la primera vez que se consultan
+
+    Una empresa que no existe (o un error de la BD) no se marca como cargada:
+    el conjunto no crece con los IDs que inventen los clientes.
+    """
+    if empresa_id in _cargadas:
+        return
+    from services.cola_service import obtener_versiones_colas
+
+    versiones = obtener_versiones_colas(empresa_id)
+    if versiones is None:
+        return
+    _cargadas.add(empresa_id)
+    for cola_id, version in versiones.items():
+        _guardar(empresa_id, cola_id, version)
+
+def version_cola(empresa_id, cola_id):
+    """Obtiene la versión actual de una cola (0 si nunca ha cambiado)"""
+    _cargar(empresa_id)
+    return _versiones_cola.get((empresa_id, cola_id), 0)
+
+def version_empresa(empresa_id):
+    """Obtiene la versión actual de una empresa (la mayor de sus colas)"""
+    _cargar(empresa_id)
+    return max(_versiones_empresa.get(empresa_id, {}).values(), default=0)
+
+def colas_cambiadas(empresa_id, desde):
+    """Obtiene los IDs de las colas de una empresa con cambios posteriores a una versión"""
+    _cargar(empresa_id)
+    return [
+        cola_id
+        for cola_id, version in _versiones_empresa.get(empresa_id, {}).items()
+        if version > desde
+    ]
+
+def notificar_cambio(empresa_id, cola_id, version):
+    """Registra la versión de un cambio en una cola y despierta a los clientes que la esperan
+
+    Un evento repetido o que llega tarde (versión no mayor que la conocida)
+    no despierta a nadie.
+    """
+    if not _guardar(empresa_id, cola_id, version):
+        return _versiones_cola[(empresa_id, cola_id)]
+
+    # Un único send despierta a todos los clientes aparcados en el evento
+    for clave in (_clave_cola(empresa_id, cola_id), _clave_empresa(empresa_id)):
+        entrada = _eventos.pop(clave, None)
+        if entrada is not None:
+            entrada[0].send(version)
+        with _lock_hilos:
+            entrada = _eventos_hilos.pop(clave, None)
+        if entrada is not None:
+            entrada[0].set()
+
+    return version
+
+def _esperar(clave, version_actual, version, timeout):
+    """Aparca la petición hasta que cambie la versión o venza el timeout"""
+    # Versión más reciente que la del cliente: responder ya. Una mayor que la
+    # conocida es un cambio que este worker aún no ha recibido por el bus: se
+    # espera como si fuera la actual
+    if version is None or version < version_actual():
+        return version_actual()
+
+    if not hilos.activo():
+        return _esperar_en_hilo(clave, version_actual, version, timeout)
+
+    entrada = _eventos.get(clave)
+    if entrada is None:
+        entrada = _eventos[clave] = [Event(), 0]
+    entrada[1] += 1
+    try:
+        entrada[0].wait(timeout)
+    finally:
+        _soltar(_eventos, clave, entrada)
+
+    return version_actual()
+
+def _soltar(eventos, clave, entrada):
+    """Descuenta un cliente de la entrada; el último la retira si sigue registrada"""
+    entrada[1] -= 1
+    if not entrada[1] and eventos.get(clave) is entrada:
+        del eventos[clave]
+
+def _esperar_en_hilo(clave, version_actual, version, timeout):
+    """Espera del modo ASGI: bloquea el hilo del executor que atiende la petición
+
+    Como mucho LONGPOLL_ESPERAS_HILOS peticiones esperan a la vez para que
+    el resto de rutas siga teniendo hilos; las demás responden sin cambios.
+    """
+    global _esperas_hilos
+    with _lock_hilos:
+        if version < version_actual():
+            return version_actual()
+        if _esperas_hilos >= get_config().LONGPOLL_ESPERAS_HILOS:
+            return version
+        entrada = _eventos_hilos.get(clave)
+        if entrada is None:
+            entrada = _eventos_hilos[clave] = [_threading.Event(), 0]
+        entrada[1] += 1
+        _esperas_hilos += 1
+
+    try:
+        entrada[0].wait(timeout)
+    finally:
+        with _lock_hilos:
+            _esperas_hilos -= 1
+            _soltar(_eventos_hilos, clave, entrada)
+
+    return version_actual()
+
+def esperar_cambio_cola(empresa_id, cola_id, version, timeout):
+    """Espera a que una cola cambie respecto a la versión indicada"""
+    return _esperar(
+        _clave_cola(empresa_id, cola_id),
+        lambda: version_cola(empresa_id, cola_id),
+        version,
+        timeout
+    )
+
+def esperar_cambio_empresa(empresa_id, version, timeout):
+    """Espera a que alguna cola de una empresa cambie respecto a la versión indicada"""
+    return _esperar(
+        _clave_empresa(empresa_id),
+        lambda: version_empresa(empresa_id),
+        version,
+        timeout
+    )
+
+def _on_cambio_cola(empresa_id, cola_id, version, **_):
+    notificar_cambio(empresa_id, cola_id, version)
+
+for _evento in ('turno_agregado', 'turno_llamado', 'cola_eliminada'):
+    suscribir(_evento, _on_cambio_cola)
@@ -0,0 +1,178 @@
+"""
+Diagnóstico de memoria con tracemalloc
+Un worker con miles de sesiones de Socket.IO crece en RSS durante días y
+hay que saber si es el registro de salas, las listas de turnos o una fuga.
+tracemalloc registra dónde se reservó cada bloque vivo; con dos instantáneas
+con nombre ('antes', 'despues') se ve qué módulos crecieron entre ambas
+(core/websocket.py, services/cola_service.py...).
+
+tracemalloc no está activo por defecto (cuesta memoria y CPU en cada
+reserva): se arranca y se detiene desde /api/internal/memoria, o al lanzar
+el proceso con PYTHONTRACEMALLOC=1. El conteo de objetos por tipo no lo
+necesita.
+
+Las instantáneas y el conteo recorren todo el heap: se hacen en el pool de
+hilos para que el hub siga atendiendo mientras tanto.
+"""
+import gc
+import os
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from core import hilos
+from core.perfilador import nombre_modulo
+from config import get_config
+
+# Instantáneas por nombre (la más antigua primero)
+_instantaneas = OrderedDict()
+
+# Último conteo de objetos por tipo, para informar de la diferencia
+_ultimo_conteo = {}
+
+# Reservas del propio tracemalloc y de la importación de módulos
+_FILTROS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+class MemoriaError(Exception):
+    """Operación no disponible en el estado actual (tracemalloc parado, instantánea inexistente)"""
+
+def _rss():
+    """Memoria residente actual del proceso en bytes (None fuera de Linux)"""
+    try:
+        with open('/proc/self/statm') as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+def iniciar(marcos=None):
+    """Arranca tracemalloc guardando marcos niveles de pila por reserva"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(marcos or get_config().MEMORIA_MARCOS)
+    return estado()
+
+def detener():
+    """Detiene tracemalloc; las instantáneas guardadas se conservan"""
+    tracemalloc.stop()
+    return estado()
+
+def _tomar():
+    return tracemalloc.take_snapshot().filter_traces(_FILTROS)
+
+def instantanea(nombre):
+    """Toma y guarda una instantánea con nombre (reemplaza la anterior con ese nombre)"""
+    if not tracemalloc.is_tracing():
+        raise MemoriaError('tracemalloc no está activo')
+    foto = hilos.ejecutar('memoria', _tomar)
+    _instantaneas.pop(nombre, None)
+    _instantaneas[nombre] = (time.time(), foto)
+    while len(_instantaneas) > get_config().MEMORIA_INSTANTANEAS_MAX:
+        _instantaneas.popitem(last=False)
+    return {'nombre': nombre, 'bytes': sum(stat.size for stat in foto.statistics('filename'))}
+
+def _obtener(nombre):
+    try:
+        return _instantaneas[nombre][1]
+    except KeyError:
+        raise MemoriaError(f"No existe la instantánea '{nombre}'") from None
+
+def _agrupar(estadisticas, linea):
+    """Suma las estadísticas de tracemalloc por módulo (o por módulo:línea)"""
+    grupos = {}
+    for stat in estadisticas:
+        marco = stat.traceback[0]
+        clave = nombre_modulo(marco.filename)
+        if linea:
+            clave = f"{clave}:{marco.lineno}"
+        grupo = grupos.get(clave)
+        if grupo is None:
+            grupo = grupos[clave] = {'bytes': 0, 'bloques': 0}
+            # compare_to devuelve StatisticDiff; statistics, Statistic
+            if hasattr(stat, 'size_diff'):
+                grupo.update(diferencia_bytes=0, diferencia_bloques=0)
+        grupo['bytes'] += stat.size
+        grupo['bloques'] += stat.count
+        if 'diferencia_bytes' in grupo:
+            grupo['diferencia_bytes'] += stat.size_diff
+            grupo['diferencia_bloques'] += stat.count_diff
+    return grupos
+
+def _ordenar(grupos, campo, limite):
+    filas = sorted(grupos.items(), key=lambda par: abs(par[1][campo]), reverse=True)[:limite]
+    return [{'modulo': clave, **valores} for clave, valores in filas]
+
+def comparar(desde, hasta=None, por_linea=False, limite=20):
+    """Crecimiento entre dos instantáneas agrupado por módulo
+
+    Sin hasta se compara con el estado actual (sin guardarlo).
+    """
+    anterior = _obtener(desde)
+    if hasta is not None:
+        posterior = _obtener(hasta)
+    elif tracemalloc.is_tracing():
+        posterior = hilos.ejecutar('memoria', _tomar)
+    else:
+        raise MemoriaError('tracemalloc no está activo: indica la instantánea hasta')
+
+    clave = 'lineno' if por_linea else 'filename'
+    diferencias = hilos.ejecutar('memoria', posterior.compare_to, anterior, clave)
+    grupos = _agrupar(diferencias, por_linea)
+    return {
+        'desde': desde,
+        'hasta': hasta or 'actual',
+        'diferencia_bytes': sum(grupo['diferencia_bytes'] for grupo in grupos.values()),
+        'modulos': _ordenar(grupos, 'diferencia_bytes', limite)
+    }
+
+def resumen(nombre, por_linea=False, limite=20):
+    """Memoria viva de una instantánea agrupada por módulo"""
+    foto = _obtener(nombre)
+    estadisticas = hilos.ejecutar('memoria', foto.statistics, 'lineno' if por_linea else 'filename')
+    grupos = _agrupar(estadisticas, por_linea)
+    return {
+        'nombre': nombre,
+        'bytes': sum(grupo['bytes'] for grupo in grupos.values()),
+        'modulos': _ordenar(grupos, 'bytes', limite)
+    }
+
+def _contar_objetos():
+    conteo = Counter()
+    for objeto in gc.get_objects():
+        tipo = type(objeto)
+        conteo[tipo.__name__ if tipo.__module__ == 'builtins' else f"{tipo.__module__}.{tipo.__qualname__}"] += 1
+    return conteo
+
+def objetos(limite=30):
+    """Objetos vivos seguidos por el recolector, por tipo, y su cambio desde la consulta anterior
+
+    Solo cuenta contenedores (dict, list, instancias...): los str o int no
+    los sigue el recolector de ciclos.
+    """
+    global _ultimo_conteo
+    conteo = hilos.ejecutar('memoria', _contar_objetos)
+    anterior, _ultimo_conteo = _ultimo_conteo, dict(conteo)
+    return {
+        'total': sum(conteo.values()),
+        'tipos': [
+            {'tipo': tipo, 'n': n, 'diferencia': n - anterior.get(tipo, 0) if anterior else None}
+            for tipo, n in conteo.most_common(limite)
+        ]
+    }
+
+def estado():
+    activo = tracemalloc.is_tracing()
+    actual, pico = tracemalloc.get_traced_memory() if activo else (0, 0)
+    return {
+        'tracemalloc': activo,
+        'marcos': tracemalloc.get_traceback_limit() if activo else None,
+        'seguido_bytes': actual,
+        'seguido_pico_bytes': pico,
+        'sobrecoste_bytes': tracemalloc.get_tracemalloc_memory() if activo else 0,
+        'rss_bytes': _rss(),
+        'instantaneas': [
+            {'nombre': nombre, 'tomada': tomada} for nombre, (tomada, _foto) in _instantaneas.items()
+        ]
+    }
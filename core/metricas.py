@@ -0,0 +1,141 @@
+"""
+Métricas en formato de exposición de Prometheus
+Contadores, histogramas y medidores en memoria, por proceso, que se
+publican en texto plano en GET /metrics. No se usa prometheus_client: el
+formato es simple y así no hay dependencia nueva.
+
+Registrar una observación es un acceso a diccionario, un bisect y unas
+sumas, sin locks: bajo eventlet todo corre en un solo hilo, y en el modo
+ASGI una carrera entre hilos como mucho pierde una observación.
+
+Los medidores (gauges) se calculan al exponer, con funciones registradas
+por cada módulo (colas en espera, conexiones, ocupación del pool...).
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from flask import g, request
+from core import registro
+
+# Límites de los buckets (segundos) para latencias
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Límites de los buckets para tamaños (destinatarios de una emisión)
+BUCKETS_TAMANO = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Definición de cada métrica: nombre -> (tipo, ayuda, etiquetas, buckets)
+_definiciones = {}
+
+# Valores: nombre -> {valores de etiquetas (tupla): valor}
+# Para histogramas el valor es [conteos por bucket..., suma, total]
+_valores = {}
+
+# Medidores calculados al exponer: nombre -> (tipo, ayuda, etiquetas, funcion)
+_medidores = {}
+
+def contador(nombre, ayuda, etiquetas=()):
+    _definiciones[nombre] = ('counter', ayuda, etiquetas, None)
+    _valores.setdefault(nombre, {})
+
+def histograma(nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+    _definiciones[nombre] = ('histogram', ayuda, etiquetas, buckets)
+    _valores.setdefault(nombre, {})
+
+def medidor(nombre, ayuda, funcion, etiquetas=(), tipo='gauge'):
+    """Registra una métrica calculada al exponer
+
+    funcion() devuelve {tupla de etiquetas: valor} o un número. Con
+    tipo='counter' sirve para publicar contadores que ya lleva otro módulo.
+    """
+    _medidores[nombre] = (tipo, ayuda, etiquetas, funcion)
+
+def incrementar(nombre, etiquetas=(), n=1):
+    valores = _valores[nombre]
+    valores[etiquetas] = valores.get(etiquetas, 0) + n
+
+def observar(nombre, valor, etiquetas=()):
+    valores = _valores[nombre]
+    serie = valores.get(etiquetas)
+    if serie is None:
+        buckets = _definiciones[nombre][3]
+        serie = valores[etiquetas] = [0] * (len(buckets) + 3)
+    # Conteo no acumulado por bucket; se acumula al exponer
+    serie[bisect_left(_definiciones[nombre][3], valor)] += 1
+    serie[-2] += valor
+    serie[-1] += 1
+
+@contextmanager
+def cronometro(nombre, etiquetas=()):
+    """Observa en el histograma nombre la duración del bloque with"""
+    inicio = perf_counter()
+    try:
+        yield
+    finally:
+        observar(nombre, perf_counter() - inicio, etiquetas)
+
+def instrumentar(app):
+    """Registra la latencia de cada petición HTTP por endpoint"""
+    histograma('ttoca_http_peticion_segundos', 'Duración de las peticiones HTTP', ('endpoint', 'metodo'))
+    contador('ttoca_http_peticiones_total', 'Peticiones HTTP atendidas', ('endpoint', 'metodo', 'estado'))
+
+    @app.before_request
+    def _iniciar_cronometro():
+        g.metricas_inicio = perf_counter()
+
+    @app.after_request
+    def _registrar_peticion(respuesta):
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is not None:
+            # Las rutas desconocidas se agrupan para no crear una serie por URL
+            endpoint = request.endpoint or 'desconocido'
+            observar('ttoca_http_peticion_segundos', perf_counter() - inicio, (endpoint, request.method))
+            incrementar('ttoca_http_peticiones_total', (endpoint, request.method, str(respuesta.status_code)))
+        return respuesta
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _etiquetas(nombres, valores, extra=''):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+def exponer():
+    """Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)"""
+    lineas = []
+    for nombre, (tipo, ayuda, etiquetas, buckets) in _definiciones.items():
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        # Copia: otro greenlet o hilo puede añadir series mientras tanto
+        for valores, serie in list(_valores[nombre].items()):
+            if tipo == 'histogram':
+                acumulado = 0
+                for limite, conteo in zip(buckets + (float('inf'),), serie):
+                    acumulado += conteo
+                    le = f'le="{_numero(limite)}"'
+                    lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas, valores, le)} {acumulado}")
+                lineas.append(f"{nombre}_sum{_etiquetas(etiquetas, valores)} {_numero(serie[-2])}")
+                lineas.append(f"{nombre}_count{_etiquetas(etiquetas, valores)} {serie[-1]}")
+            else:
+                lineas.append(f"{nombre}{_etiquetas(etiquetas, valores)} {_numero(serie)}")
+
+    for nombre, (tipo, ayuda, etiquetas, funcion) in _medidores.items():
+        try:
+            resultado = funcion()
+        except Exception as e:
+            registro.error('metricas', 'medidor_fallido', metrica=nombre, error=repr(e))
+            continue
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        if not isinstance(resultado, dict):
+            resultado = {(): resultado}
+        for valores, valor in resultado.items():
+            lineas.append(f"{nombre}{_etiquetas(etiquetas, valores)} {_numero(valor)}")
+
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,196 @@
+"""
+Perfilado de SQLite: consultas lentas y esperas por el lock
+Las métricas de core.database dicen cuánto tarda cada función de servicio,
+pero no por qué. Con DB_PERFIL=1 cada conexión instala un progress handler
+de sqlite3 que cuenta los pasos de la máquina virtual de cada sentencia:
+una sentencia lenta con muchos pasos es un mal plan (recorre la tabla), una
+lenta con pocos pasos estuvo esperando el lock de escritura o el fsync.
+
+De cada sentencia que supera DB_LENTA_MS se guarda su plan (EXPLAIN QUERY
+PLAN) en un archivo rotativo y en memoria. Por función de servicio se
+acumula el tiempo en sentencias, la espera de la primera escritura (el
+BEGIN es diferido: el lock se pide ahí) y el COMMIT. resumen() lo publica
+en GET /api/internal/db-perfil.
+
+El tiempo de una SELECT es el de execute(), que en SQLite produce la
+primera fila: ORDER BY y agregados ya hicieron ahí todo el trabajo.
+"""
+import os
+import re
+import time
+from collections import deque
+from eventlet import patcher
+from core import registro
+from config import get_config
+
+# Locks nativos: los acumulados y el archivo se actualizan desde los hilos del pool
+_threading = patcher.original('threading')
+_lock_archivo = _threading.Lock()
+_lock = _threading.Lock()
+
+# Acumulados por función de servicio
+_funciones = {}
+
+# Acumulados por sentencia (texto normalizado)
+_sentencias = {}
+
+# Últimas consultas lentas con su plan
+_lentas = deque(maxlen=get_config().DB_LENTAS_RECIENTES)
+
+_ESPACIOS = re.compile(r'\s+')
+
+def activo():
+    return get_config().DB_PERFIL
+
+def instalar(conn):
+    """Instala el progress handler en una conexión sqlite3 recién abierta
+
+    Devuelve el estado que actualiza el handler ({'pasos': n}); cada paso
+    son DB_PERFIL_PASOS instrucciones de la máquina virtual.
+    """
+    estado = {'pasos': 0}
+
+    def progreso():
+        estado['pasos'] += 1
+        return 0  # Distinto de 0 interrumpiría la sentencia
+
+    conn.set_progress_handler(progreso, get_config().DB_PERFIL_PASOS)
+    return estado
+
+def _normalizar(sql):
+    return _ESPACIOS.sub(' ', sql).strip()[:300]
+
+def _funcion(funcion):
+    """Acumulados de una función de servicio (con _lock tomado)"""
+    acumulado = _funciones.get(funcion)
+    if acumulado is None:
+        acumulado = _funciones[funcion] = {
+            'transacciones': 0, 'sentencias': 0, 'lentas': 0,
+            'sentencias_ms': 0.0, 'espera_escritura_ms': 0.0, 'espera_escritura_max_ms': 0.0,
+            'commit_ms': 0.0, 'commit_max_ms': 0.0, 'transaccion_ms': 0.0
+        }
+    return acumulado
+
+def sentencia(funcion, sql, segundos, pasos):
+    """Acumula una sentencia; devuelve True si supera el umbral de lenta"""
+    ms = segundos * 1000
+    config = get_config()
+    lenta = ms >= config.DB_LENTA_MS
+    clave = _normalizar(sql)
+    with _lock:
+        acumulado = _funcion(funcion)
+        acumulado['sentencias'] += 1
+        acumulado['sentencias_ms'] += ms
+        if lenta:
+            acumulado['lentas'] += 1
+
+        datos = _sentencias.get(clave)
+        if datos is None:
+            if len(_sentencias) >= config.DB_PERFIL_MAX_SENTENCIAS:
+                return lenta
+            datos = _sentencias[clave] = {'n': 0, 'ms_total': 0.0, 'ms_max': 0.0, 'pasos': 0, 'funciones': set()}
+        datos['n'] += 1
+        datos['ms_total'] += ms
+        datos['ms_max'] = max(datos['ms_max'], ms)
+        datos['pasos'] += pasos
+        datos['funciones'].add(funcion)
+    return lenta
+
+def transaccion(funcion, espera_escritura, commit, total):
+    """Acumula los tiempos de bloqueo de una transacción confirmada (segundos)"""
+    with _lock:
+        acumulado = _funcion(funcion)
+        acumulado['transacciones'] += 1
+        acumulado['transaccion_ms'] += total * 1000
+        if espera_escritura is not None:
+            acumulado['espera_escritura_ms'] += espera_escritura * 1000
+            acumulado['espera_escritura_max_ms'] = max(acumulado['espera_escritura_max_ms'], espera_escritura * 1000)
+        acumulado['commit_ms'] += commit * 1000
+        acumulado['commit_max_ms'] = max(acumulado['commit_max_ms'], commit * 1000)
+
+def anotar_lenta(conn, funcion, sql, parametros, segundos, pasos):
+    """Obtiene el plan de una consulta lenta y la escribe en el archivo rotativo
+
+    Se ejecuta en el pool de hilos, con la misma conexión (EXPLAIN QUERY
+    PLAN no ejecuta la sentencia).
+    """
+    try:
+        plan = [fila[-1] for fila in conn.execute(f'EXPLAIN QUERY PLAN {sql}', parametros).fetchall()]
+    except Exception as e:
+        plan = [f'sin plan: {e}']
+
+    entrada = {
+        'ts': time.time(),
+        'funcion': funcion,
+        'sql': _normalizar(sql),
+        'ms': round(segundos * 1000, 3),
+        'pasos': pasos,
+        'plan': plan
+    }
+    with _lock:
+        _lentas.append(entrada)
+
+    try:
+        _escribir(entrada)
+    except OSError as e:
+        registro.error('db', 'archivo_lentas', error=repr(e))
+
+    registro.aviso('db', 'consulta_lenta', funcion=funcion, ms=entrada['ms'], pasos=pasos)
+
+def _escribir(entrada):
+    config = get_config()
+    linea = (f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entrada['ts']))} "
+             f"{entrada['funcion']} {entrada['ms']}ms pasos={entrada['pasos']} "
+             f"sql={entrada['sql']} plan={' | '.join(entrada['plan'])}\n")
+    ruta = config.DB_LENTAS_ARCHIVO
+    with _lock_archivo:
+        try:
+            tamano = os.path.getsize(ruta)
+        except OSError:
+            tamano = 0
+        if tamano + len(linea) > config.DB_LENTAS_MAX_BYTES:
+            # ruta.1 es la más reciente; la más antigua se pierde
+            for i in range(config.DB_LENTAS_ARCHIVOS - 1, 0, -1):
+                if os.path.exists(f'{ruta}.{i}'):
+                    os.replace(f'{ruta}.{i}', f'{ruta}.{i + 1}')
+            if os.path.exists(ruta):
+                os.replace(ruta, f'{ruta}.1')
+        with open(ruta, 'a', encoding='utf-8') as archivo:
+            archivo.write(linea)
+
+def resumen(limite=20):
+    """Funciones, sentencias más costosas y últimas consultas lentas"""
+    # Copia bajo el lock: los hilos del pool siguen acumulando mientras se ordena
+    with _lock:
+        funciones = {nombre: dict(datos) for nombre, datos in _funciones.items()}
+        sentencias = [
+            (sql, dict(datos, funciones=set(datos['funciones']))) for sql, datos in _sentencias.items()
+        ]
+        lentas = list(_lentas)
+
+    funciones = {
+        nombre: {clave: round(valor, 3) if isinstance(valor, float) else valor for clave, valor in datos.items()}
+        for nombre, datos in funciones.items()
+    }
+    sentencias = sorted(sentencias, key=lambda par: par[1]['ms_total'], reverse=True)[:limite]
+    return {
+        'activo': activo(),
+        'umbral_ms': get_config().DB_LENTA_MS,
+        'funciones': funciones,
+        'sentencias': [{
+            'sql': sql,
+            'n': datos['n'],
+            'ms_total': round(datos['ms_total'], 3),
+            'ms_medio': round(datos['ms_total'] / datos['n'], 3),
+            'ms_max': round(datos['ms_max'], 3),
+            'pasos_medio': round(datos['pasos'] / datos['n'], 1),
+            'funciones': sorted(datos['funciones'])
+        } for sql, datos in sentencias],
+        'lentas': lentas[::-1]
+    }
+
+def reiniciar():
+    with _lock:
+        _funciones.clear()
+        _sentencias.clear()
+        _lentas.clear()
@@ -0,0 +1,256 @@
+"""
+Perfilado bajo demanda en producción
+Dos herramientas, ambas desactivadas hasta que se piden:
+
+- cProfile por petición: se activa con la cabecera X-Perfil (un token
+  firmado que emite POST /api/internal/perfil/token) o armando desde
+  /api/internal/perfil las próximas N peticiones de una ruta. Cada perfil
+  se guarda como .pstats (snakeviz, pstats). Solo hay uno a la vez y como
+  mucho PERFIL_POR_MINUTO; bajo eventlet el perfil incluye también lo que
+  otros greenlets ejecutaron en el hub mientras tanto.
+
+- Muestreador de pilas: un hilo nativo lee sys._current_frames() cada
+  PERFIL_MUESTREO_INTERVALO_MS y cuenta las pilas de todos los hilos. Cada
+  ventana se escribe en formato collapsed (flamegraph.pl, speedscope). Si
+  tomar una muestra cuesta más de PERFIL_MUESTREO_COSTE_MAX del intervalo,
+  el intervalo se duplica: el coste queda acotado aunque esté siempre
+  activo (PERFIL_MUESTREO=1).
+"""
+import cProfile
+import hashlib
+import hmac
+import os
+import sys
+import time
+from eventlet import patcher
+from flask import g, request
+from core import hilos, limites, registro
+from config import get_config
+
+# Hilo, Event y reloj nativos: el muestreador no debe depender del hub
+_threading = patcher.original('threading')
+_time = patcher.original('time')
+
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+# Funciones en las que un hilo está esperando, no trabajando
+_INACTIVAS = frozenset({'wait', 'select', 'poll', 'do_poll', 'sleep'})
+
+# Peticiones armadas desde /api/internal/perfil
+_armado = {'peticiones': 0, 'ruta': ''}
+
+# Un solo cProfile activo a la vez
+_lock_peticion = _threading.Lock()
+
+# parar: Event del muestreador en marcha (None si no hay ninguno)
+_muestreo = {'parar': None, 'hasta': None, 'intervalo_ms': None, 'muestras': 0, 'ajustes': 0}
+
+_contadores = {'perfiles': 0, 'omitidos': 0, 'ventanas': 0}
+
+# Nombre legible de cada archivo de código (se calcula una vez)
+_modulos = {}
+
+def _firmar(expira):
+    clave = get_config().SECRET_KEY.encode('utf-8')
+    return hmac.new(clave, f"perfil.{expira}".encode('ascii'), hashlib.sha256).hexdigest()
+
+def emitir_token():
+    """Token para la cabecera X-Perfil, válido PERFIL_TOKEN_SEGUNDOS"""
+    expira = int(time.time()) + get_config().PERFIL_TOKEN_SEGUNDOS
+    return f"{expira}.{_firmar(expira)}", expira
+
+def _token_valido(token):
+    try:
+        expira, firma = token.split('.')
+        expira = int(expira)
+    except ValueError:
+        return False
+    return expira > time.time() and hmac.compare_digest(firma, _firmar(expira))
+
+def armar(peticiones, ruta=''):
+    """Perfila las próximas peticiones cuya ruta empiece por ruta"""
+    _armado['peticiones'] = max(0, min(peticiones, get_config().PERFIL_PETICIONES_MAX))
+    _armado['ruta'] = ruta
+
+def _solicitado():
+    token = request.headers.get('X-Perfil')
+    if token:
+        return _token_valido(token)
+    if _armado['peticiones'] > 0 and request.path.startswith(_armado['ruta']):
+        _armado['peticiones'] -= 1
+        return True
+    return False
+
+def instrumentar(app):
+    """Registra los hooks que perfilan las peticiones solicitadas"""
+
+    @app.before_request
+    def _iniciar_perfil():
+        if not _solicitado():
+            return
+        config = get_config()
+        if limites.consumir('perfil', 'proceso', config.PERFIL_POR_MINUTO / 60, config.PERFIL_POR_MINUTO) \
+                or not _lock_peticion.acquire(blocking=False):
+            _contadores['omitidos'] += 1
+            return
+        g.perfil = cProfile.Profile()
+        g.perfil.enable()
+
+    @app.after_request
+    def _guardar_perfil(respuesta):
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            perfil.disable()
+            _lock_peticion.release()
+            nombre = _nombre_archivo('peticion', request.endpoint or 'desconocido', 'pstats')
+            hilos.ejecutar('perfil', _volcar, perfil, nombre)
+            respuesta.headers['X-Perfil-Archivo'] = nombre
+        return respuesta
+
+    @app.teardown_request
+    def _descartar_perfil(_error=None):
+        # Una excepción no llega a after_request: el perfil no se guarda
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            perfil.disable()
+            _lock_peticion.release()
+
+def _nombre_archivo(tipo, etiqueta, extension):
+    ahora = time.time()
+    instante = time.strftime('%Y%m%d-%H%M%S', time.localtime(ahora))
+    return f"{tipo}-{instante}-{int(ahora * 1000) % 1000:03d}-{etiqueta}.{extension}"
+
+def _ruta(nombre):
+    directorio = get_config().PERFIL_DIR
+    os.makedirs(directorio, exist_ok=True)
+    return os.path.join(directorio, nombre)
+
+def _podar(tipo):
+    """Conserva solo los PERFIL_MAX_ARCHIVOS más recientes de cada tipo"""
+    directorio = get_config().PERFIL_DIR
+    nombres = sorted(n for n in os.listdir(directorio) if n.startswith(f"{tipo}-"))
+    for nombre in nombres[:-get_config().PERFIL_MAX_ARCHIVOS]:
+        os.remove(os.path.join(directorio, nombre))
+
+def _volcar(perfil, nombre):
+    try:
+        perfil.dump_stats(_ruta(nombre))
+        _podar('peticion')
+        _contadores['perfiles'] += 1
+    except OSError as e:
+        registro.error('perfil', 'volcar', archivo=nombre, error=repr(e))
+
+def nombre_modulo(archivo):
+    """Ruta corta de un archivo de código: relativa al proyecto o a site-packages"""
+    nombre = _modulos.get(archivo)
+    if nombre is None:
+        if archivo.startswith(_RAIZ):
+            nombre = archivo[len(_RAIZ):]
+        elif 'site-packages' + os.sep in archivo:
+            nombre = archivo.split('site-packages' + os.sep, 1)[1]
+        else:
+            nombre = os.path.basename(archivo)
+        nombre = _modulos[archivo] = nombre.replace(';', '_').replace(' ', '_')
+    return nombre
+
+def _pila(frame, profundidad):
+    """Pila de frame en formato collapsed (de la raíz a la función actual)"""
+    if frame.f_code.co_name in _INACTIVAS:
+        return None
+    marcos = []
+    while frame is not None and len(marcos) < profundidad:
+        codigo = frame.f_code
+        marcos.append(f"{nombre_modulo(codigo.co_filename)}:{codigo.co_name}")
+        frame = frame.f_back
+    marcos.reverse()
+    return ';'.join(marcos)
+
+def _muestrear(parar):
+    config = get_config()
+    propio = _threading.get_ident()
+    intervalo = config.PERFIL_MUESTREO_INTERVALO_MS / 1000
+    pilas = {}
+    # Coste medio de una muestra (media móvil: un pico aislado no cuenta)
+    coste = 0.0
+    fin_ventana = _time.monotonic() + config.PERFIL_MUESTREO_VENTANA_SEGUNDOS
+
+    while not parar.wait(intervalo):
+        inicio = _time.perf_counter()
+        nombres = {hilo.ident: hilo.name for hilo in _threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == propio:
+                continue
+            pila = _pila(frame, config.PERFIL_PROFUNDIDAD_MAX)
+            if pila:
+                pila = f"{nombres.get(ident, ident)};{pila}"
+                pilas[pila] = pilas.get(pila, 0) + 1
+        _muestreo['muestras'] += 1
+
+        coste = 0.8 * coste + 0.2 * (_time.perf_counter() - inicio)
+        if coste > intervalo * config.PERFIL_MUESTREO_COSTE_MAX and intervalo < 1:
+            intervalo *= 2
+            _muestreo['ajustes'] += 1
+        _muestreo['intervalo_ms'] = intervalo * 1000
+
+        ahora = _time.monotonic()
+        terminado = _muestreo['hasta'] is not None and ahora >= _muestreo['hasta']
+        if ahora >= fin_ventana or terminado:
+            _escribir_ventana(pilas)
+            pilas = {}
+            fin_ventana = ahora + config.PERFIL_MUESTREO_VENTANA_SEGUNDOS
+        if terminado:
+            parar.set()
+
+def _escribir_ventana(pilas):
+    if not pilas:
+        return
+    nombre = _nombre_archivo('muestreo', os.getpid(), 'collapsed')
+    try:
+        with open(_ruta(nombre), 'w', encoding='utf-8') as archivo:
+            for pila, n in sorted(pilas.items()):
+                archivo.write(f"{pila} {n}\n")
+        _podar('muestreo')
+        _contadores['ventanas'] += 1
+    except OSError as e:
+        registro.error('perfil', 'ventana', archivo=nombre, error=repr(e))
+
+def iniciar_muestreo(segundos=None):
+    """Arranca el muestreador; sin segundos queda activo indefinidamente
+
+    Devuelve False si ya estaba en marcha.
+    """
+    if _muestreo['parar'] is not None and not _muestreo['parar'].is_set():
+        return False
+    if segundos is not None:
+        segundos = min(segundos, get_config().PERFIL_MUESTREO_MAX_SEGUNDOS)
+        _muestreo['hasta'] = _time.monotonic() + segundos
+    else:
+        _muestreo['hasta'] = None
+    parar = _muestreo['parar'] = _threading.Event()
+    _threading.Thread(target=_muestrear, args=(parar,), name='ttoca-muestreo', daemon=True).start()
+    registro.info('perfil', 'muestreo_iniciado', segundos=segundos)
+    return True
+
+def detener_muestreo():
+    """Detiene el muestreador; la ventana en curso se descarta"""
+    if _muestreo['parar'] is not None:
+        _muestreo['parar'].set()
+
+def archivos():
+    directorio = get_config().PERFIL_DIR
+    if not os.path.isdir(directorio):
+        return []
+    return sorted(os.listdir(directorio), reverse=True)
+
+def estado():
+    return {
+        'armado': dict(_armado),
+        'muestreo': {
+            'activo': _muestreo['parar'] is not None and not _muestreo['parar'].is_set(),
+            'intervalo_ms': _muestreo['intervalo_ms'],
+            'muestras': _muestreo['muestras'],
+            'ajustes': _muestreo['ajustes']
+        },
+        **_contadores,
+        'archivos': archivos()
+    }
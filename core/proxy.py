@@ -0,0 +1,39 @@
+"""
+IP del cliente detrás de proxies
+En producción nginx está delante: sin más, todas las peticiones llegan
+desde 127.0.0.1 y los límites por IP (conexiones WebSocket, login,
+mutaciones) se vuelven límites de todo el sitio. ProxyFix toma la IP de
+X-Forwarded-For, pero solo de los PROXY_SALTOS proxies de confianza: un
+cliente que envíe su propia cabecera no puede hacerse pasar por otro.
+"""
+from flask import request
+from werkzeug.middleware.proxy_fix import ProxyFix
+from config import get_config
+
+def configurar(app):
+    """Envuelve la aplicación con ProxyFix si hay proxies de confianza
+
+    Debe llamarse después de init_socketio: así ProxyFix queda por fuera y
+    las conexiones de Socket.IO también ven la IP real.
+    """
+    saltos = get_config().PROXY_SALTOS
+    if saltos:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=saltos, x_proto=saltos)
+
+def ip_cliente(environ=None):
+    """IP del cliente para los límites y los registros
+
+    Sin environ usa la petición de Flask, a la que ProxyFix ya corrigió
+    REMOTE_ADDR. Con environ (conexiones de Socket.IO en el modo ASGI, que
+    no pasan por ProxyFix) aplica la misma regla sobre X-Forwarded-For.
+    """
+    if environ is None:
+        return request.remote_addr
+
+    remota = environ.get('REMOTE_ADDR') or (environ.get('asgi.scope', {}).get('client') or ('',))[0]
+    saltos = get_config().PROXY_SALTOS
+    if saltos:
+        reenviadas = [ip.strip() for ip in environ.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(reenviadas) >= saltos:
+            return reenviadas[-saltos]
+    return remota
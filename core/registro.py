@@ -0,0 +1,139 @@
+"""
+Registro estructurado que no bloquea el hub
+print() escribe en stdout de forma síncrona: bajo eventlet, cada emisión o
+conexión que se anotaba así detenía el hub mientras el terminal o el
+recolector de logs consumía la línea. Aquí registrar un evento solo añade
+una tupla a una deque; un hilo nativo (fuera del hub aunque el proceso esté
+monkey-patcheado) serializa y escribe en lotes.
+
+Cada registro tiene subsistema ('ws', 'cola', 'auth', ...), evento y
+campos (empresa_id, categoria_id, latencia_ms...). El nivel mínimo se fija
+por subsistema (REGISTRO_NIVELES) y los eventos muy frecuentes se pueden
+muestrear (REGISTRO_MUESTREO: se escribe 1 de cada N).
+
+Si el escritor no da abasto se descartan registros (cuenta 'descartados')
+en lugar de acumular memoria o frenar a quien registra.
+"""
+import atexit
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+from eventlet import patcher
+from core.serializacion import dumps
+from config import get_config
+
+# Hilo y Event nativos: siguen siendo hilos reales con monkey-patching
+_threading = patcher.original('threading')
+
+NIVELES = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+_NOMBRES = {valor: nombre for nombre, valor in NIVELES.items()}
+
+# Registros pendientes de escribir: (ts, nivel, subsistema, evento, campos)
+_pendientes = deque()
+
+# Nivel mínimo por subsistema (se calcula en el primer uso de cada uno)
+_umbrales = {}
+
+# Eventos vistos por (subsistema, evento) para el muestreo
+_vistos = {}
+
+_contadores = {'escritos': 0, 'descartados': 0, 'muestreados': 0}
+
+_despertar = _threading.Event()
+_escritor = None
+
+def _umbral(subsistema):
+    umbral = _umbrales.get(subsistema)
+    if umbral is None:
+        config = get_config()
+        nombre = config.REGISTRO_NIVELES.get(subsistema, config.REGISTRO_NIVEL)
+        umbral = _umbrales[subsistema] = NIVELES.get(nombre.upper(), NIVELES['INFO'])
+    return umbral
+
+def registrar(nivel, subsistema, evento, **campos):
+    """Encola un registro; nunca bloquea ni escribe en el hilo que llama"""
+    if nivel < _umbral(subsistema):
+        return
+
+    muestreo = get_config().REGISTRO_MUESTREO.get(evento)
+    if muestreo and muestreo > 1:
+        clave = (subsistema, evento)
+        visto = _vistos.get(clave, 0)
+        _vistos[clave] = visto + 1
+        if visto % muestreo:
+            _contadores['muestreados'] += 1
+            return
+        campos['muestreo'] = muestreo
+
+    if len(_pendientes) >= get_config().REGISTRO_COLA_MAX:
+        _contadores['descartados'] += 1
+        return
+
+    _pendientes.append((time.time(), nivel, subsistema, evento, campos))
+    if _escritor is None:
+        _iniciar()
+    _despertar.set()
+
+def debug(subsistema, evento, **campos):
+    registrar(NIVELES['DEBUG'], subsistema, evento, **campos)
+
+def info(subsistema, evento, **campos):
+    registrar(NIVELES['INFO'], subsistema, evento, **campos)
+
+def aviso(subsistema, evento, **campos):
+    registrar(NIVELES['WARNING'], subsistema, evento, **campos)
+
+def error(subsistema, evento, **campos):
+    registrar(NIVELES['ERROR'], subsistema, evento, **campos)
+
+def _formatear(ts, nivel, subsistema, evento, campos, formato):
+    instante = datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec='milliseconds')
+    if formato == 'json':
+        cabecera = {'ts': instante, 'nivel': _NOMBRES[nivel], 'subsistema': subsistema, 'evento': evento}
+        try:
+            return dumps({**cabecera, **campos})
+        except TypeError:
+            # Un valor no serializable no debe perder el registro
+            return dumps({**cabecera, **{clave: str(valor) for clave, valor in campos.items()}})
+
+    pares = ' '.join(f"{clave}={valor}" for clave, valor in campos.items())
+    return f"{instante} {_NOMBRES[nivel]:<7} [{subsistema}] {evento} {pares}".rstrip()
+
+def _vaciar():
+    """Escribe todos los registros pendientes en un solo write"""
+    formato = get_config().REGISTRO_FORMATO
+    lineas = []
+    while _pendientes:
+        lineas.append(_formatear(*_pendientes.popleft(), formato))
+    if lineas:
+        salida = sys.stdout
+        salida.write('\n'.join(lineas) + '\n')
+        salida.flush()
+        _contadores['escritos'] += len(lineas)
+
+def _escribir():
+    while True:
+        _despertar.wait()
+        _despertar.clear()
+        try:
+            _vaciar()
+        except Exception as e:
+            sys.stderr.write(f"Error escribiendo registros: {e}\n")
+
+def _iniciar():
+    global _escritor
+    _escritor = _threading.Thread(target=_escribir, name='ttoca-registro', daemon=True)
+    _escritor.start()
+
+@atexit.register
+def _al_salir():
+    # Lo que quede pendiente se escribe antes de terminar el proceso
+    try:
+        _vaciar()
+    except Exception:
+        pass
+
+def estadisticas():
+    """Estado del escritor para el endpoint interno"""
+    return dict(_contadores, pendientes=len(_pendientes))
@@ -0,0 +1,152 @@
+"""
+Estado del proceso para los probes de liveness y readiness
+Liveness solo comprueba que el proceso atiende peticiones. Readiness mide
+lo que hace que una instancia no deba recibir tráfico: latencia de SQLite,
+tamaño del WAL frente al umbral del checkpoint automático, saturación del pool
+de hilos y retraso del hub de eventlet.
+
+El informe se guarda SALUD_CACHE_SEGUNDOS: un balanceador que consulta cada
+segundo desde varias máquinas no añade carga, y mientras se calcula un
+informe los demás probes reciben el anterior.
+"""
+import os
+import time
+from core import connections, hilos, sse
+from core.database import get_db_connection, DATABASE_NAME
+from config import get_config
+
+_INICIO = time.time()
+
+# Último informe de readiness y cuándo se generó
+_informe = None
+_generado = 0.0
+_calculando = False
+
+# Retraso del hub de eventlet: último y máximo desde el informe anterior (segundos)
+_hub = {'ultimo': None, 'maximo': 0.0}
+_monitor_activo = False
+
+def iniciar_monitor_hub():
+    """Arranca el greenlet que mide cuánto tarda el hub en volver a atenderlo
+
+    Si el hub está ocupado (trabajo de CPU en un greenlet, un bloqueo sin
+    monkey-patching) el greenlet despierta tarde: ese retraso es el tiempo
+    que cualquier WebSocket espera para recibir su siguiente evento.
+    """
+    global _monitor_activo
+    if _monitor_activo or not hilos.activo():
+        return
+    _monitor_activo = True
+
+    import eventlet
+    intervalo = get_config().SALUD_INTERVALO_HUB_SEGUNDOS
+
+    def medir():
+        while True:
+            inicio = time.monotonic()
+            eventlet.sleep(intervalo)
+            retraso = max(0.0, time.monotonic() - inicio - intervalo)
+            _hub['ultimo'] = retraso
+            _hub['maximo'] = max(_hub['maximo'], retraso)
+
+    eventlet.spawn(medir)
+
+def vivo():
+    """Liveness: el proceso responde (no toca la base de datos)"""
+    return {'status': 'alive', 'uptime_segundos': int(time.time() - _INICIO)}
+
+# Cabecera del archivo WAL y de cada frame (formato de SQLite)
+_WAL_CABECERA = 32
+_WAL_CABECERA_FRAME = 24
+
+def _medir_base_datos():
+    inicio = time.perf_counter()
+    with get_db_connection() as conn:
+        conn.execute('SELECT 1').fetchone()
+        # Solo lecturas de configuración: el probe no pide ningún lock ni
+        # compite con el checkpoint automático de los escritores
+        pagina = conn.execute('PRAGMA page_size').fetchone()[0]
+        autocheckpoint = conn.execute('PRAGMA wal_autocheckpoint').fetchone()[0]
+    latencia_ms = (time.perf_counter() - inicio) * 1000
+
+    try:
+        wal_bytes = os.path.getsize(f"{DATABASE_NAME}-wal")
+    except OSError:
+        wal_bytes = 0
+
+    # El WAL se reutiliza tras cada checkpoint sin encogerse: su tamaño es el
+    # máximo de frames acumulados. Con el checkpoint automático al día no pasa
+    # mucho de wal_autocheckpoint páginas; si crece más, hay lectores que lo impiden
+    frames = max(0, wal_bytes - _WAL_CABECERA) // (pagina + _WAL_CABECERA_FRAME)
+    return {
+        'latencia_ms': round(latencia_ms, 3),
+        'wal_bytes': wal_bytes,
+        'wal_frames': frames,
+        'wal_autocheckpoint': autocheckpoint,
+        'checkpoint_atrasado': autocheckpoint > 0 and frames > 2 * autocheckpoint
+    }
+
+def _generar():
+    config = get_config()
+    problemas = []
+    avisos = []
+
+    try:
+        base_datos = _medir_base_datos()
+        if base_datos['latencia_ms'] > config.SALUD_LATENCIA_DB_MAX_MS:
+            problemas.append('base de datos lenta')
+        if base_datos['wal_bytes'] > config.SALUD_WAL_MAX_BYTES or base_datos['checkpoint_atrasado']:
+            avisos.append('WAL grande: hay lectores que impiden el checkpoint')
+    except Exception as e:
+        base_datos = {'error': str(e)}
+        problemas.append('base de datos no disponible')
+
+    pool = hilos.estadisticas()
+    saturacion = pool['en_curso'] / pool['hilos'] if pool['hilos'] else 0.0
+    if pool['en_cola'] > config.SALUD_POOL_EN_COLA_MAX:
+        problemas.append('pool de hilos saturado')
+    elif saturacion >= 1:
+        avisos.append('pool de hilos al límite')
+
+    hub = {
+        'retraso_ms': round(_hub['ultimo'] * 1000, 3) if _hub['ultimo'] is not None else None,
+        'retraso_max_ms': round(_hub['maximo'] * 1000, 3)
+    }
+    _hub['maximo'] = 0.0
+    if hub['retraso_ms'] is not None and hub['retraso_ms'] > config.SALUD_RETRASO_HUB_MAX_MS:
+        problemas.append('hub de eventlet atascado')
+
+    return {
+        'status': 'fallo' if problemas else ('degradado' if avisos else 'ok'),
+        'preparado': not problemas,
+        'problemas': problemas,
+        'avisos': avisos,
+        'base_datos': base_datos,
+        'pool': {
+            'hilos': pool['hilos'],
+            'en_curso': pool['en_curso'],
+            'en_cola': pool['en_cola'],
+            'saturacion': round(saturacion, 3)
+        },
+        'hub': hub,
+        'sockets': {
+            'conexiones': connections.estadisticas()['conexiones'],
+            'sse': sse.estadisticas()['suscriptores']
+        },
+        'uptime_segundos': int(time.time() - _INICIO),
+        'generado': time.time()
+    }
+
+def preparado():
+    """Readiness: informe completo, recalculado como mucho cada SALUD_CACHE_SEGUNDOS"""
+    global _informe, _generado, _calculando
+    if _informe is not None and (_calculando or time.monotonic() - _generado < get_config().SALUD_CACHE_SEGUNDOS):
+        return _informe
+
+    _calculando = True
+    try:
+        _informe = _generar()
+        _generado = time.monotonic()
+    finally:
+        _calculando = False
+    return _informe
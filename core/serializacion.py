@@ -0,0 +1,100 @@
+"""
+Serialización JSON compartida por Flask, Socket.IO, SSE y el bus
+Usa orjson si está instalado (entre 5 y 10 veces más rápido que json con
+listas de turnos grandes) y json de la biblioteca estándar si no. Las dos
+dan la misma salida: compacta y con los caracteres no ASCII en UTF-8 sin
+escapar (orjson no sabe escaparlos, así que json usa ensure_ascii=False; el
+proveedor por defecto de Flask los escapa como \\uXXXX). Fechas, Decimal y
+UUID se convierten igual que en Flask.
+
+Precodificado permite serializar una sola vez los datos de un evento que
+se envía a varios destinos (salas de Socket.IO, suscriptores SSE, clientes
+lentos que lo reciben más tarde).
+"""
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MOTOR = 'orjson' if orjson is not None else 'json'
+
+# Conversión de Flask para los tipos que JSON no tiene (fechas con http_date, Decimal...)
+_convertir = DefaultJSONProvider.default
+
+def _codificar_json(obj, ordenar=False, indentar=False):
+    texto = json.dumps(
+        obj, default=_convertir, sort_keys=ordenar, ensure_ascii=False,
+        indent=2 if indentar else None, separators=None if indentar else (',', ':')
+    )
+    return texto.encode('utf-8')
+
+if orjson is not None:
+    # Las fechas pasan por _convertir para conservar el formato de Flask (http_date)
+    _OPCIONES = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _codificar_orjson(obj, ordenar=False, indentar=False):
+        opciones = _OPCIONES
+        if ordenar:
+            opciones |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opciones |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_convertir, option=opciones)
+
+    _codificar = _codificar_orjson
+    _decodificar = orjson.loads
+else:
+    _codificar = _codificar_json
+    _decodificar = json.loads
+
+class Precodificado:
+    """Datos de un evento que se serializan una vez y se reutilizan"""
+    __slots__ = ('datos', '_texto')
+
+    def __init__(self, datos):
+        self.datos = datos
+        self._texto = None
+
+    @property
+    def texto(self):
+        if self._texto is None:
+            self._texto = _codificar(self.datos).decode('utf-8')
+        return self._texto
+
+def dumps(obj, **_):
+    """json.dumps compacto (Socket.IO pasa separators, que se ignora)
+
+    Socket.IO serializa cada paquete como [evento, datos]: si datos es
+    Precodificado se inserta su texto ya generado.
+    """
+    if isinstance(obj, Precodificado):
+        return obj.texto
+    if isinstance(obj, list) and any(isinstance(e, Precodificado) for e in obj):
+        return '[' + ','.join(dumps(e) for e in obj) + ']'
+    return _codificar(obj).decode('utf-8')
+
+def loads(texto, **_):
+    return _decodificar(texto)
+
+class ProveedorJSON(DefaultJSONProvider):
+    """Proveedor JSON de Flask sobre el serializador rápido
+
+    Respeta sort_keys y compact como DefaultJSONProvider, pero no
+    ensure_ascii: el texto no ASCII sale siempre en UTF-8.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return _codificar(obj, kwargs.get('sort_keys', self.sort_keys), 'indent' in kwargs).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return _decodificar(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = (self.compact is None and self._app.debug) or self.compact is False
+        # Sin pasar por str: el cuerpo se genera directamente en bytes
+        return self._app.response_class(
+            _codificar(obj, self.sort_keys, indentar) + b"\n", mimetype=self.mimetype
+        )
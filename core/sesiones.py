@@ -0,0 +1,149 @@
+"""
+Tokens de sesión firmados
+El login (bcrypt) se hace una sola vez; después el cliente envía un token
+compacto firmado con HMAC-SHA256 que se verifica en memoria sin tocar la
+tabla users:
+
+    <kid>.<claims en base64url>.<firma en base64url>
+
+kid identifica la clave con la que se firmó: se firma siempre con
+SECRET_KEY y se aceptan también las de SECRET_KEYS_ANTERIORES, así la clave
+se puede rotar sin cerrar las sesiones abiertas. Los claims ya verificados
+se guardan en un LRU para no repetir base64 + HMAC + JSON en cada petición.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, jsonify, g
+from config import get_config
+
+# Claims verificados: token -> claims (el más usado al final)
+_cache = OrderedDict()
+
+# Propietario de cada empresa: empresa_id -> email (nunca cambia)
+_propietarios = {}
+
+_contadores = {'emitidos': 0, 'aciertos': 0, 'verificados': 0, 'rechazados': 0}
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).rstrip(b'=').decode('ascii')
+
+def _desde_b64(texto):
+    return base64.urlsafe_b64decode(texto + '=' * (-len(texto) % 4))
+
+def _kid(clave):
+    return hashlib.sha256(clave.encode('utf-8')).hexdigest()[:8]
+
+def _claves():
+    """Claves aceptadas por kid: la actual y las anteriores"""
+    config = get_config()
+    return {_kid(clave): clave for clave in [config.SECRET_KEY, *config.SECRET_KEYS_ANTERIORES] if clave}
+
+def _firmar(clave, kid, cuerpo):
+    return _b64(hmac.new(clave.encode('utf-8'), f"{kid}.{cuerpo}".encode('ascii'), hashlib.sha256).digest())
+
+def emitir_token(email):
+    """Firma un token de sesión para un usuario ya autenticado"""
+    config = get_config()
+    ahora = int(time.time())
+    claims = {'sub': email, 'iat': ahora, 'exp': ahora + config.SESION_DURACION_SEGUNDOS}
+    kid = _kid(config.SECRET_KEY)
+    cuerpo = _b64(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    _contadores['emitidos'] += 1
+    return f"{kid}.{cuerpo}.{_firmar(config.SECRET_KEY, kid, cuerpo)}", claims['exp']
+
+def verificar_token(token):
+    """Devuelve los claims de un token válido y vigente, o None"""
+    claims = _cache.get(token)
+    if claims is not None:
+        _cache.move_to_end(token)
+        _contadores['aciertos'] += 1
+    else:
+        claims = _decodificar(token)
+        if claims is None:
+            _contadores['rechazados'] += 1
+            return None
+        _contadores['verificados'] += 1
+        _cache[token] = claims
+        if len(_cache) > get_config().SESION_CACHE_MAX:
+            _cache.popitem(last=False)
+
+    if claims['exp'] <= time.time():
+        _cache.pop(token, None)
+        _contadores['rechazados'] += 1
+        return None
+    return claims
+
+def _decodificar(token):
+    try:
+        kid, cuerpo, firma = token.split('.')
+    except (AttributeError, ValueError):
+        return None
+
+    # Una clave retirada de la configuración invalida sus tokens
+    clave = _claves().get(kid)
+    if clave is None or not hmac.compare_digest(firma, _firmar(clave, kid, cuerpo)):
+        return None
+
+    try:
+        claims = json.loads(_desde_b64(cuerpo))
+    except ValueError:
+        return None
+    if not isinstance(claims, dict) or 'sub' not in claims or 'exp' not in claims:
+        return None
+    return claims
+
+def token_de_peticion():
+    """Token enviado en la cabecera Authorization: Bearer <token>"""
+    cabecera = request.headers.get('Authorization', '')
+    if cabecera.startswith('Bearer '):
+        return cabecera[7:].strip()
+    return None
+
+def propietario_empresa(empresa_id):
+    """Email del dueño de una empresa (consultado una vez por empresa)"""
+    propietario = _propietarios.get(empresa_id)
+    if propietario is None:
+        from services.auth_service import obtener_propietario_empresa
+        propietario = obtener_propietario_empresa(empresa_id)
+        if propietario is not None:
+            _propietarios[empresa_id] = propietario
+    return propietario
+
+def puede_gestionar(claims, empresa_id):
+    """Indica si la sesión pertenece al dueño de la empresa"""
+    return claims is not None and propietario_empresa(empresa_id) == claims['sub']
+
+def requiere_sesion(usuario=None, empresa=None):
+    """Protege una ruta con el token de sesión
+
+    usuario y empresa son los nombres de los parámetros de la URL que deben
+    corresponder a la sesión (el email del usuario o una empresa suya).
+    Los claims quedan en g.sesion.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            if not get_config().AUTH_REQUERIDA:
+                return vista(*args, **kwargs)
+
+            claims = verificar_token(token_de_peticion())
+            if claims is None:
+                return jsonify({'message': 'Sesión inválida o expirada'}), 401
+            if usuario is not None and kwargs.get(usuario) != claims['sub']:
+                return jsonify({'message': 'No autorizado'}), 403
+            if empresa is not None and not puede_gestionar(claims, kwargs.get(empresa)):
+                return jsonify({'message': 'No autorizado'}), 403
+
+            g.sesion = claims
+            return vista(*args, **kwargs)
+        return envoltura
+    return decorador
+
+def estadisticas():
+    """Uso de la caché de sesiones para el endpoint interno"""
+    return dict(_contadores, en_cache=len(_cache), propietarios=len(_propietarios))
@@ -0,0 +1,126 @@
+"""
+Caché compartida de snapshots de colas y resúmenes de empresa
+Tras un reinicio miles de pantallas se reconectan a la vez; el primer cliente
+de cada sala carga el snapshot de la BD y el resto espera y reutiliza el
+mismo resultado. Una entrada es válida mientras no cambie la versión de su
+cola o empresa (core.longpoll y core.deltas) y no supere su tiempo de vida.
+La caché guarda como mucho WS_SNAPSHOT_MAX_ENTRADAS salas (se descartan las
+usadas hace más tiempo).
+"""
+import time
+from collections import OrderedDict
+from eventlet import patcher
+from eventlet.event import Event
+from core import deltas, longpoll, hilos
+from config import get_config
+
+# En el modo ASGI los snapshots se piden desde los hilos del executor: ahí
+# se espera con Events nativos, como en core.longpoll
+_threading = patcher.original('threading')
+
+# Entradas en caché: clave -> {'version', 'cargado', 'datos'} (la usada más recientemente al final)
+_cache = OrderedDict()
+
+# Cargas en curso: clave -> (verde, Event) que se dispara al terminar
+_cargando = {}
+
+# Protege _cache y _cargando entre los hilos del executor
+_lock = _threading.Lock()
+
+_contadores = {'aciertos': 0, 'cargas': 0, 'esperas': 0}
+
+def _obtener(clave, version_actual, cargar, existe):
+    """Devuelve la entrada vigente o la carga una sola vez aunque la pidan muchos
+
+    existe() indica si la sala sigue existiendo; las claves llegan de los
+    clientes y solo se guardan las de colas y empresas reales.
+    """
+    verde = hilos.activo()
+    while True:
+        version = version_actual()
+        ttl = get_config().WS_SNAPSHOT_TTL_SEGUNDOS
+        with _lock:
+            entrada = _cache.get(clave)
+            if entrada and entrada['version'] == version and time.monotonic() - entrada['cargado'] < ttl:
+                _cache.move_to_end(clave)
+                _contadores['aciertos'] += 1
+                return entrada['datos']
+
+            en_curso = _cargando.get(clave)
+            if en_curso is None:
+                evento = Event() if verde else _threading.Event()
+                _cargando[clave] = (verde, evento)
+                break
+            _contadores['esperas'] += 1
+        # Otro cliente ya está leyendo la BD: esperar su resultado y revalidar
+        en_curso[1].wait()
+
+    try:
+        datos = cargar()
+        guardar = existe()
+        with _lock:
+            _contadores['cargas'] += 1
+            if guardar:
+                _cache[clave] = {'version': version, 'cargado': time.monotonic(), 'datos': datos}
+                _cache.move_to_end(clave)
+                while len(_cache) > get_config().WS_SNAPSHOT_MAX_ENTRADAS:
+                    _cache.popitem(last=False)
+        return datos
+    finally:
+        with _lock:
+            _cargando.pop(clave, None)
+        if verde:
+            evento.send()
+        else:
+            evento.set()
+
+def snapshot_cola(empresa_id, cola_id):
+    """Estado completo de una cola con su época y secuencia de deltas"""
+    def cargar():
+        from services.cola_service import obtener_turnos, obtener_turno_actual
+
+        # La secuencia se lee antes que la BD: un delta concurrente puede llegar
+        # repetido, y el cliente aplica los deltas de forma idempotente por id
+        seq = deltas.seq_actual(empresa_id, cola_id)
+        return {
+            'empresaId': empresa_id,
+            'colaId': cola_id,
+            'epoca': deltas.EPOCA,
+            'seq': seq,
+            'version': longpoll.version_cola(empresa_id, cola_id),
+            'turnos': obtener_turnos(empresa_id, cola_id),
+            'turnoActual': obtener_turno_actual(empresa_id, cola_id)
+        }
+
+    def existe():
+        from services.cola_config_service import obtener_categoria
+        return obtener_categoria(empresa_id, cola_id) is not None
+
+    return _obtener(
+        ('cola', empresa_id, cola_id),
+        lambda: (longpoll.version_cola(empresa_id, cola_id), deltas.seq_actual(empresa_id, cola_id)),
+        cargar,
+        existe
+    )
+
+def resumen_empresa(empresa_id, construir):
+    """Resumen compacto de una empresa; construir(empresa_id) lo lee de la BD"""
+    def existe():
+        from services.auth_service import obtener_propietario_empresa
+        return obtener_propietario_empresa(empresa_id) is not None
+
+    return _obtener(
+        ('empresa', empresa_id),
+        lambda: longpoll.version_empresa(empresa_id),
+        lambda: dict(construir(empresa_id), version=longpoll.version_empresa(empresa_id)),
+        existe
+    )
+
+def descartar_cola(empresa_id, cola_id):
+    """Elimina de la caché una cola borrada"""
+    with _lock:
+        _cache.pop(('cola', empresa_id, cola_id), None)
+
+def estadisticas():
+    """Aciertos, cargas y esperas de la caché para el endpoint interno"""
+    return dict(_contadores, entradas=len(_cache))
@@ -0,0 +1,160 @@
+"""
+Difusión de eventos por Server-Sent Events
+Alternativa ligera a Socket.IO para pantallas pasivas (smart TVs, cartelería)
+cuyo navegador no carga bien el cliente de Socket.IO. Recibe los mismos
+eventos que emite core.websocket, los serializa una sola vez por sala y los
+reparte entre colas ligeras por suscriptor.
+
+Cada sala guarda sus últimos SSE_BUFFER eventos para que un cliente que se
+reconecta con Last-Event-ID reciba solo lo que se perdió. Un suscriptor que
+no consume a tiempo se desconecta y al reconectarse se pone al día igual.
+"""
+import itertools
+from collections import deque
+from eventlet.queue import LightQueue, Empty, Full
+from core.deltas import EPOCA
+from core.serializacion import dumps
+from config import get_config
+
+_contador = itertools.count(1)
+
+# Último número de evento asignado en este proceso
+_ultimo = 0
+
+# Eventos recientes por sala: sala -> {'desde': n, 'eventos': deque de (n, trama)}
+# Una sala que tuvo suscriptores sigue acumulando eventos para las reconexiones;
+# 'desde' es el último evento que ya no está en el buffer
+_buffers = {}
+
+# Suscriptores por sala: sala -> set(LightQueue)
+_suscriptores = {}
+
+_contadores = {'eventos': 0, 'tramas': 0, 'desbordados': 0, 'reanudados': 0, 'snapshots': 0}
+
+def trama(evento, datos, n=None):
+    """Serializa un evento en formato text/event-stream"""
+    cabecera = f"id: {EPOCA}:{n}\n" if n is not None else ''
+    return f"{cabecera}event: {evento}\ndata: {dumps(datos)}\n\n"
+
+def difundir(evento, datos, salas):
+    """Entrega un evento a los suscriptores SSE de las salas indicadas"""
+    global _ultimo
+    if isinstance(salas, str):
+        salas = [salas]
+
+    texto = None
+    for sala in salas:
+        buffer = _buffers.get(sala)
+        if buffer is None:
+            continue
+
+        # Se codifica una sola vez aunque haya miles de pantallas en la sala
+        if texto is None:
+            _ultimo = n = next(_contador)
+            texto = trama(evento, datos, n)
+            _contadores['eventos'] += 1
+
+        eventos = buffer['eventos']
+        if len(eventos) == eventos.maxlen:
+            buffer['desde'] = eventos[0][0]
+        eventos.append((n, texto))
+
+        suscriptores = _suscriptores.get(sala, ())
+        for cola in list(suscriptores):
+            try:
+                cola.put_nowait((n, texto))
+                _contadores['tramas'] += 1
+            except Full:
+                # Cliente lento: se corta la conexión y se reanuda con Last-Event-ID
+                _contadores['desbordados'] += 1
+                suscriptores.discard(cola)
+                cola.queue.clear()
+                cola.put_nowait(None)
+
+def _perdidos(sala, ultimo_id):
+    """Eventos de la sala posteriores a Last-Event-ID, o None si no se pueden reconstruir"""
+    if not ultimo_id:
+        return None
+    epoca, _, n = ultimo_id.partition(':')
+    if epoca != EPOCA or not n.isdigit():
+        return None
+
+    n = int(n)
+    buffer = _buffers.get(sala)
+    if buffer is None or n < buffer['desde'] or n > _ultimo:
+        return None
+    return [(m, texto) for m, texto in buffer['eventos'] if m > n]
+
+def suscribir(sala, ultimo_id=None, snapshot=None):
+    """Generador de tramas SSE para una sala
+
+    snapshot() devuelve (evento, datos) con el estado completo; se envía al
+    inicio si no se puede reanudar desde Last-Event-ID. La sala debe existir:
+    su historial se conserva mientras no se descarte con descartar_sala().
+    """
+    config = get_config()
+    cola = LightQueue(config.SSE_COLA_MAX)
+
+    def generar():
+        # El registro se hace al empezar a consumir el flujo, dentro del try:
+        # una respuesta que nunca llega a enviarse no deja la cola suscrita
+        try:
+            # Suscribirse antes de leer el estado para no perder eventos intermedios
+            _suscriptores.setdefault(sala, set()).add(cola)
+            base = _ultimo
+            if sala not in _buffers:
+                _buffers[sala] = {'desde': _ultimo, 'eventos': deque(maxlen=config.SSE_BUFFER)}
+
+            yield f"retry: {config.SSE_RETRY_MS}\n\n"
+
+            enviado = 0
+            perdidos = _perdidos(sala, ultimo_id)
+            if perdidos is None:
+                if snapshot is not None:
+                    # Lleva el id del último evento anterior a la suscripción:
+                    # una reconexión posterior se reanuda desde aquí
+                    _contadores['snapshots'] += 1
+                    yield trama(*snapshot(), base)
+            else:
+                _contadores['reanudados'] += 1
+                for n, texto in perdidos:
+                    enviado = n
+                    yield texto
+
+            while True:
+                try:
+                    item = cola.get(timeout=config.SSE_KEEPALIVE_SEGUNDOS)
+                except Empty:
+                    # Comentario para que proxies y navegadores no cierren la conexión
+                    yield ": keepalive\n\n"
+                    continue
+
+                if item is None:
+                    return
+                n, texto = item
+                if n > enviado:
+                    yield texto
+        finally:
+            _desuscribir(sala, cola)
+
+    return generar()
+
+def descartar_sala(sala):
+    """Olvida el historial de una sala que ya no existe"""
+    _buffers.pop(sala, None)
+
+def _desuscribir(sala, cola):
+    suscriptores = _suscriptores.get(sala)
+    if suscriptores is None:
+        return
+    suscriptores.discard(cola)
+    if not suscriptores:
+        del _suscriptores[sala]
+
+def estadisticas():
+    """Suscriptores y tramas SSE para el endpoint interno"""
+    return dict(
+        _contadores,
+        suscriptores=sum(len(s) for s in _suscriptores.values()),
+        salas=len(_suscriptores)
+    )
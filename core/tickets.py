@@ -0,0 +1,154 @@
+"""
+Suscripciones por turno para clientes que solo siguen su propio ticket
+En lugar de unirse a la sala de la cola (y recibir los nombres de todos) el
+cliente se une a la sala ticket_<turno_id> y recibe solo su posición y ETA.
+Tras cada llamada se recalculan en una sola consulta las posiciones de todos
+los turnos suscritos de la cola.
+"""
+from config import get_config
+
+# Turnos suscritos por cola: (empresa_id, cola_id) -> {turno_id: suscripcion}
+# suscripcion = {'codigo', 'posicion', 'tiempo_estimado', 'sids': set, 'avisos': set, 'avisados': set}
+_suscripciones = {}
+
+# Turnos seguidos por cada conexión: sid -> set((empresa_id, cola_id, turno_id))
+_por_sid = {}
+
+def sala_ticket(turno_id):
+    return f"ticket_{turno_id}"
+
+def _mensaje(turno_id, suscripcion, **extra):
+    posicion = suscripcion['posicion']
+    return dict({
+        'turnoId': turno_id,
+        'codigo': suscripcion['codigo'],
+        'posicion': posicion,
+        'etaMinutos': posicion * suscripcion['tiempo_estimado']
+    }, **extra)
+
+def leer_avisos(avisos):
+    """Valida las posiciones de aviso que envía el cliente
+
+    Devuelve una tupla de enteros positivos (vacía si no se enviaron) o None
+    si no es una lista corta de posiciones.
+    """
+    if avisos is None:
+        return ()
+    if not isinstance(avisos, (list, tuple)) or len(avisos) > get_config().TICKET_AVISOS_MAX:
+        return None
+    if not all(isinstance(a, int) and not isinstance(a, bool) and a > 0 for a in avisos):
+        return None
+    return tuple(avisos)
+
+def suscribir(sid, turno, avisos=()):
+    """Suscribe una conexión a un turno y devuelve el mensaje con su posición actual
+
+    turno es el resultado de obtener_turno_por_codigo; avisos son posiciones
+    (validadas con leer_avisos) que, al alcanzarse, se notifican una sola vez
+    como aviso.
+    """
+    clave = (turno['empresa_id'], turno['categoria_id'])
+    turnos = _suscripciones.setdefault(clave, {})
+    suscripcion = turnos.get(turno['id'])
+    if suscripcion is None:
+        suscripcion = turnos[turno['id']] = {
+            'codigo': turno['codigo'],
+            'posicion': turno['posicion'],
+            'tiempo_estimado': turno['tiempo_estimado'],
+            'sids': set(),
+            'avisos': set(),
+            'avisados': set()
+        }
+
+    # La lectura recién hecha de la BD es la referencia más fiable
+    suscripcion['posicion'] = turno['posicion']
+    suscripcion['sids'].add(sid)
+    suscripcion['avisos'].update(avisos)
+    _por_sid.setdefault(sid, set()).add(clave + (turno['id'],))
+    return _mensaje(turno['id'], suscripcion)
+
+def cancelar(sid, turno_id=None):
+    """Cancela las suscripciones de una conexión (todas si no se indica turno)"""
+    for empresa_id, cola_id, suscrito in list(_por_sid.get(sid, ())):
+        if turno_id is not None and suscrito != turno_id:
+            continue
+        _por_sid[sid].discard((empresa_id, cola_id, suscrito))
+        turnos = _suscripciones.get((empresa_id, cola_id), {})
+        suscripcion = turnos.get(suscrito)
+        if suscripcion is not None:
+            suscripcion['sids'].discard(sid)
+            if not suscripcion['sids']:
+                del turnos[suscrito]
+        if not turnos:
+            _suscripciones.pop((empresa_id, cola_id), None)
+
+    if not _por_sid.get(sid):
+        _por_sid.pop(sid, None)
+
+def recalcular(empresa_id, cola_id, tiempo_estimado=None):
+    """Actualiza las posiciones suscritas de una cola tras una o varias llamadas
+
+    Devuelve una lista de (turno_id, mensaje, critico). Los mensajes críticos
+    (turno llamado o umbral alcanzado) no deben descartarse nunca.
+    """
+    from services.cola_service import obtener_posiciones_turnos
+
+    turnos = _suscripciones.get((empresa_id, cola_id))
+    if not turnos:
+        return []
+
+    posiciones = obtener_posiciones_turnos(empresa_id, cola_id, list(turnos))
+    if posiciones is None:
+        return []
+
+    mensajes = []
+    for turno_id, suscripcion in list(turnos.items()):
+        if tiempo_estimado is not None:
+            suscripcion['tiempo_estimado'] = tiempo_estimado
+
+        posicion = posiciones.get(turno_id)
+        if posicion is None:
+            # Ya no está en espera: fue llamado. Es el último mensaje del turno
+            mensajes.append((turno_id, dict(_mensaje(turno_id, suscripcion), posicion=0, etaMinutos=0, llamado=True), True))
+            del turnos[turno_id]
+            _desvincular(suscripcion['sids'], (empresa_id, cola_id, turno_id))
+            continue
+
+        if posicion == suscripcion['posicion']:
+            continue
+        suscripcion['posicion'] = posicion
+
+        alcanzados = {a for a in suscripcion['avisos'] - suscripcion['avisados'] if posicion <= a}
+        if alcanzados:
+            suscripcion['avisados'] |= alcanzados
+            mensajes.append((turno_id, _mensaje(turno_id, suscripcion, aviso=min(alcanzados)), True))
+        else:
+            mensajes.append((turno_id, _mensaje(turno_id, suscripcion), False))
+
+    if not turnos:
+        _suscripciones.pop((empresa_id, cola_id), None)
+    return mensajes
+
+def descartar_cola(empresa_id, cola_id):
+    """Elimina las suscripciones de una cola borrada y devuelve sus turnos"""
+    turnos = _suscripciones.pop((empresa_id, cola_id), {})
+    for turno_id, suscripcion in turnos.items():
+        _desvincular(suscripcion['sids'], (empresa_id, cola_id, turno_id))
+    return list(turnos)
+
+def _desvincular(sids, suscrito):
+    for sid in sids:
+        seguidos = _por_sid.get(sid)
+        if seguidos is None:
+            continue
+        seguidos.discard(suscrito)
+        if not seguidos:
+            del _por_sid[sid]
+
+def estadisticas():
+    """Suscripciones activas para el endpoint interno"""
+    return {
+        'colas': len(_suscripciones),
+        'turnos': sum(len(turnos) for turnos in _suscripciones.values()),
+        'conexiones': len(_por_sid)
+    }
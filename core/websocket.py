@@ -2,8 +2,14 @@
 WebSocket manager para eventos en tiempo real
 Maneja emisiones de eventos para actualizaciones de cola
 """
+from flask import request
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from functools import wraps
+from core import connections, backpressure, snapshots, tickets, llamadas, sesiones, limites, serializacion, registro
+from core.deltas import deltas_desde
+from core.difusion import Transporte, configurar, construir_resumen_empresa
+from core.proxy import ip_cliente
+from config import get_config
 
 # Instancia global de SocketIO (se inicializa en app.py)
 socketio = None
@@ -19,6 +25,7 @@ def init_socketio(app):
             "https://www.ttoca.online",
         ],
         async_mode='eventlet',
+        json=serializacion,
         logger=False,
         engineio_logger=False
     )
@@ -26,30 +33,76 @@ def init_socketio(app):
     # Registrar event handlers
     register_handlers()
 
+    # Los cambios de las colas se emiten a través de core.difusion
+    configurar(_TransporteEventlet())
+
     return socketio
 
+def _rpc(handler):
+    """Evento que modifica datos y responde por ack, con límite por conexión"""
+    @wraps(handler)
+    def envoltura(data=None):
+        espera = connections.consumir_rpc(request.sid)
+        if espera:
+            return {'ok': False, 'error': 'Demasiadas solicitudes', 'retryAfterMs': int(espera * 1000) + 1}
+        if not isinstance(data, dict):
+            return {'ok': False, 'error': 'Datos inválidos'}
+        return handler(data)
+    return envoltura
+
+def _admitir(empresa_id, cola_id):
+    """Límites por empresa y cola compartidos con las rutas HTTP"""
+    espera = limites.admitir_mutacion(empresa_id, cola_id)
+    if espera:
+        return {'ok': False, 'error': 'Demasiadas solicitudes', 'retryAfterMs': int(espera * 1000) + 1}
+    return None
+
 def register_handlers():
     """Registra todos los event handlers de WebSocket"""
 
     @socketio.on('connect')
-    def handle_connect():
-        print(f"Cliente conectado")
+    def handle_connect(auth=None):
+        # Las consolas del personal envían su token de sesión en auth
+        token = auth.get('token') if isinstance(auth, dict) else None
+        # Devolver False rechaza la conexión
+        ip = ip_cliente()
+        if not connections.registrar_conexion(request.sid, ip, token):
+            registro.aviso('ws', 'conexion_rechazada', motivo='limite_ip', ip=ip)
+            return False
+        registro.debug('ws', 'conectado', sid=request.sid)
 
     @socketio.on('disconnect')
     def handle_disconnect():
-        print(f"Cliente desconectado")
+        connections.registrar_desconexion(request.sid)
+        backpressure.olvidar(request.sid)
+        tickets.cancelar(request.sid)
+        registro.debug('ws', 'desconectado', sid=request.sid)
 
     @socketio.on('join_queue')
     def handle_join_queue(data):
-        """Cliente se une a una sala de cola específica"""
+        """Cliente se une a una sala de cola específica
+
+        Si envía la época y la última secuencia que recibió, se reanuda con
+        los deltas pendientes; si no (o si hay un hueco) recibe un snapshot
+        servido desde la caché compartida de core.snapshots.
+        """
         empresa_id = data.get('empresaId')
         cola_id = data.get('colaId')
 
         if empresa_id and cola_id:
             room = f"queue_{empresa_id}_{cola_id}"
+            if not connections.unir_sala(request.sid, room, empresa_id):
+                emit('error', {'message': 'Límite de conexiones de la empresa alcanzado'})
+                return
             join_room(room)
-            print(f"Cliente unido a sala: {room}")
+            registro.debug('ws', 'join_queue', empresa_id=empresa_id, categoria_id=cola_id)
             emit('joined_queue', {'room': room, 'empresaId': empresa_id, 'colaId': cola_id})
+
+            pendientes = deltas_desde(empresa_id, cola_id, data.get('epoca'), data.get('seq'))
+            if pendientes is None:
+                emit('queue_snapshot', snapshots.snapshot_cola(empresa_id, cola_id))
+            elif pendientes:
+                emit('queue_resume', {'empresaId': empresa_id, 'colaId': cola_id, 'deltas': pendientes})
         else:
             emit('error', {'message': 'empresaId y colaId son requeridos'})
 
@@ -62,7 +115,8 @@ def register_handlers():
         if empresa_id and cola_id:
             room = f"queue_{empresa_id}_{cola_id}"
             leave_room(room)
-            print(f"Cliente salió de sala: {room}")
+            connections.salir_sala(request.sid, room)
+            registro.debug('ws', 'leave_queue', empresa_id=empresa_id, categoria_id=cola_id)
 
     @socketio.on('join_empresa')
     def handle_join_empresa(data):
@@ -71,9 +125,13 @@ def register_handlers():
 
         if empresa_id:
             room = f"empresa_{empresa_id}"
+            if not connections.unir_sala(request.sid, room, empresa_id):
+                emit('error', {'message': 'Límite de conexiones de la empresa alcanzado'})
+                return
             join_room(room)
-            print(f"Cliente unido a empresa: {room}")
+            registro.debug('ws', 'join_empresa', empresa_id=empresa_id)
             emit('joined_empresa', {'room': room, 'empresaId': empresa_id})
+            emit('resumen_empresa', snapshots.resumen_empresa(empresa_id, construir_resumen_empresa))
         else:
             emit('error', {'message': 'empresaId es requerido'})
 
@@ -85,92 +143,147 @@ def register_handlers():
         if empresa_id:
             room = f"empresa_{empresa_id}"
             leave_room(room)
-            print(f"Cliente salió de empresa: {room}")
-
-# Funciones de emisión para usar desde servicios
-
-def emit_queue_update(empresa_id, cola_id, turnos):
-    """Emite actualización de turnos en espera de una cola"""
-    if not socketio:
-        return
-
-    room = f"queue_{empresa_id}_{cola_id}"
-    socketio.emit('queue_updated', {
-        'empresaId': empresa_id,
-        'colaId': cola_id,
-        'turnos': turnos
-    }, room=room)
-
-    # También emitir a nivel de empresa
-    empresa_room = f"empresa_{empresa_id}"
-    socketio.emit('queue_updated', {
-        'empresaId': empresa_id,
-        'colaId': cola_id,
-        'turnos': turnos
-    }, room=empresa_room)
-
-    print(f"[WS] Emitido queue_updated a {room}")
-
-def emit_turno_llamado(empresa_id, cola_id, turno):
-    """Emite cuando se llama al siguiente turno"""
-    if not socketio:
-        return
-
-    room = f"queue_{empresa_id}_{cola_id}"
-    socketio.emit('turno_llamado', {
-        'empresaId': empresa_id,
-        'colaId': cola_id,
-        'turno': turno
-    }, room=room)
-
-    # También emitir a nivel de empresa
-    empresa_room = f"empresa_{empresa_id}"
-    socketio.emit('turno_llamado', {
-        'empresaId': empresa_id,
-        'colaId': cola_id,
-        'turno': turno
-    }, room=empresa_room)
-
-    print(f"[WS] Emitido turno_llamado a {room}: {turno.get('numero')}")
-
-def emit_turno_agregado(empresa_id, cola_id, turno):
-    """Emite cuando se agrega un nuevo turno"""
-    if not socketio:
-        return
-
-    room = f"queue_{empresa_id}_{cola_id}"
-    socketio.emit('turno_agregado', {
-        'empresaId': empresa_id,
-        'colaId': cola_id,
-        'turno': turno
-    }, room=room)
-
-    # También emitir a nivel de empresa
-    empresa_room = f"empresa_{empresa_id}"
-    socketio.emit('turno_agregado', {
-        'empresaId': empresa_id,
-        'colaId': cola_id,
-        'turno': turno
-    }, room=empresa_room)
-
-    print(f"[WS] Emitido turno_agregado a {room}: {turno.get('numero')}")
-
-def emit_cola_eliminada(empresa_id, cola_id):
-    """Emite cuando se elimina una cola"""
-    if not socketio:
-        return
-
-    room = f"queue_{empresa_id}_{cola_id}"
-    socketio.emit('cola_eliminada', {
-        'empresaId': empresa_id,
-        'colaId': cola_id
-    }, room=room)
-
-    # También emitir a nivel de empresa
-    empresa_room = f"empresa_{empresa_id}"
-    socketio.emit('cola_eliminada', {
-        'empresaId': empresa_id,
-        'colaId': cola_id
-    }, room=empresa_room)
-
-    print(f"[WS] Emitido cola_eliminada a {room}")
+            connections.salir_sala(request.sid, room)
+            registro.debug('ws', 'leave_empresa', empresa_id=empresa_id)
+
+    @socketio.on('join_ticket')
+    def handle_join_ticket(data):
+        """Cliente sigue solo su propio turno (por código)
+
+        Recibe posicion_turno con su posición y ETA cada vez que cambian, y
+        opcionalmente un aviso al alcanzar alguna de las posiciones de 'avisos'.
+        """
+        from services.cola_service import obtener_turno_por_codigo
+
+        if not isinstance(data, dict):
+            emit('error', {'message': 'Datos inválidos'})
+            return
+        codigo = data.get('codigo')
+        codigo = codigo.strip().upper() if isinstance(codigo, str) else ''
+        if not codigo:
+            emit('error', {'message': 'codigo es requerido'})
+            return
+        avisos = tickets.leer_avisos(data.get('avisos'))
+        if avisos is None:
+            emit('error', {'message': f'avisos debe ser una lista de hasta {get_config().TICKET_AVISOS_MAX} posiciones'})
+            return
+
+        turno = obtener_turno_por_codigo(codigo)
+        if not turno:
+            emit('error', {'message': 'Turno no encontrado'})
+            return
+
+        room = tickets.sala_ticket(turno['id'])
+        if not connections.unir_sala(request.sid, room, turno['empresa_id']):
+            emit('error', {'message': 'Límite de conexiones de la empresa alcanzado'})
+            return
+        join_room(room)
+        emit('posicion_turno', tickets.suscribir(request.sid, turno, avisos))
+
+    @socketio.on('leave_ticket')
+    def handle_leave_ticket(data):
+        """Cliente deja de seguir un turno"""
+        turno_id = data.get('turnoId')
+
+        if turno_id:
+            room = tickets.sala_ticket(turno_id)
+            leave_room(room)
+            connections.salir_sala(request.sid, room)
+            tickets.cancelar(request.sid, turno_id)
+
+    @socketio.on('llamadas_recientes')
+    def handle_llamadas_recientes(data):
+        """Pantalla de sala de espera pide las últimas llamadas de la empresa
+
+        Después se mantiene al día con los turno_llamado de la sala de empresa.
+        """
+        empresa_id = data.get('empresaId')
+        if not empresa_id:
+            emit('error', {'message': 'empresaId es requerido'})
+            return
+
+        limite = data.get('limite')
+        emit('llamadas_recientes', {
+            'empresaId': empresa_id,
+            'llamadas': llamadas.recientes_empresa(empresa_id, limite if isinstance(limite, int) else None)
+        })
+
+    @socketio.on('issue_ticket')
+    @_rpc
+    def handle_issue_ticket(data):
+        """Kiosco emite un turno sin pasar por HTTP; el resultado llega en el ack"""
+        from services.cola_service import agregar_turno
+
+        empresa_id = data.get('empresaId')
+        cola_id = data.get('colaId')
+        if not empresa_id or not cola_id:
+            return {'ok': False, 'error': 'empresaId y colaId son requeridos'}
+        rechazo = _admitir(empresa_id, cola_id)
+        if rechazo:
+            return rechazo
+
+        turno = agregar_turno(empresa_id, cola_id, {
+            "nombre": data.get("nombre"),
+            "tipo": data.get("tipo", "General")
+        })
+        if turno:
+            return {'ok': True, 'turno': turno}
+        return {'ok': False, 'error': 'No se pudo agregar el turno'}
+
+    @socketio.on('call_next')
+    @_rpc
+    def handle_call_next(data):
+        """Consola del personal llama al siguiente turno; el resultado llega en el ack"""
+        from services.cola_service import siguiente_turno
+
+        empresa_id = data.get('empresaId')
+        cola_id = data.get('colaId')
+        if not empresa_id or not cola_id:
+            return {'ok': False, 'error': 'empresaId y colaId son requeridos'}
+
+        if get_config().AUTH_REQUERIDA and not sesiones.puede_gestionar(
+                sesiones.verificar_token(connections.token_sesion(request.sid)), empresa_id):
+            return {'ok': False, 'error': 'No autorizado'}
+        rechazo = _admitir(empresa_id, cola_id)
+        if rechazo:
+            return rechazo
+
+        turno = siguiente_turno(empresa_id, cola_id)
+        if turno:
+            return {'ok': True, 'turno': turno}
+        return {'ok': False, 'error': 'No hay turnos'}
+
+class _TransporteEventlet(Transporte):
+    """Emisión sobre Flask-SocketIO; se usa desde el hub o un greenlet"""
+
+    def emitir(self, evento, datos, to, omitir=None):
+        socketio.emit(evento, datos, to=to, skip_sid=omitir)
+
+    def cerrar_sala(self, sala):
+        socketio.close_room(sala)
+
+    def participantes(self, salas):
+        return socketio.server.manager.get_participants('/', salas)
+
+    def cola_salida(self, eio_sid):
+        socket = socketio.server.eio.sockets.get(eio_sid)
+        if socket is None:
+            return None
+        return socket.queue.qsize()
+
+    def desconectar(self, sid):
+        socketio.server.disconnect(sid)
+
+    def programar(self, segundos, funcion, *args):
+        socketio.start_background_task(self._tras, segundos, funcion, *args)
+
+    def _tras(self, segundos, funcion, *args):
+        if segundos > 0:
+            socketio.sleep(segundos)
+        funcion(*args)
+
+    def iniciar_tarea(self, funcion, *args):
+        socketio.start_background_task(funcion, *args)
+
+    def dormir(self, segundos):
+        socketio.sleep(segundos)
@@ -0,0 +1,292 @@
+"""
+WebSocket en modo ASGI (python-socketio AsyncServer)
+Mismo protocolo que core.websocket para el punto de entrada asgi.py: las
+mismas salas, eventos y deltas, pero sobre asyncio. Los servicios siguen
+siendo síncronos y se ejecutan en el executor de core.hilos; los eventos
+de dominio que publican llegan desde esos hilos y se pasan al event loop.
+
+El agrupado de cambios, los resúmenes, las posiciones de los turnos y la
+contrapresión son los de core.difusion; aquí solo está su transporte. No
+incluye el bus entre workers.
+"""
+import asyncio
+import threading
+import time
+import socketio
+from core import connections, backpressure, snapshots, tickets, llamadas, sesiones, limites, serializacion, registro
+from core.deltas import deltas_desde
+from core.difusion import Transporte, configurar, construir_resumen_empresa
+from core.hilos import ejecutar_async
+from core.proxy import ip_cliente
+from config import get_config
+
+# Instancia global de AsyncServer (se inicializa en asgi.py)
+sio = None
+
+# Event loop que atiende a sio; los eventos de dominio se le entregan desde los hilos
+_loop = None
+
+# Lecturas en curso compartidas entre clientes: clave -> Future
+_cargando = {}
+
+def init_socketio_asgi(cors_allowed_origins):
+    """Crea el AsyncServer y registra los handlers"""
+    global sio
+    sio = socketio.AsyncServer(
+        async_mode='asgi',
+        cors_allowed_origins=cors_allowed_origins,
+        json=serializacion,
+        logger=False,
+        engineio_logger=False
+    )
+    register_handlers()
+    return sio
+
+def iniciar():
+    """Registra el event loop que recibe los eventos de dominio (arranque ASGI)"""
+    global _loop
+    _loop = asyncio.get_running_loop()
+    configurar(_TransporteASGI())
+
+async def _una_vez(clave, funcion, *args):
+    """Ejecuta funcion en el executor una sola vez aunque la pidan muchos clientes"""
+    futuro = _cargando.get(clave)
+    if futuro is None:
+        futuro = _cargando[clave] = asyncio.ensure_future(ejecutar_async('sqlite', funcion, *args))
+        futuro.add_done_callback(lambda _: _cargando.pop(clave, None))
+    return await asyncio.shield(futuro)
+
+def _rpc_permitido(sid):
+    espera = connections.consumir_rpc(sid)
+    if espera:
+        return {'ok': False, 'error': 'Demasiadas solicitudes', 'retryAfterMs': int(espera * 1000) + 1}
+    return None
+
+def _admitir(empresa_id, cola_id):
+    espera = limites.admitir_mutacion(empresa_id, cola_id)
+    if espera:
+        return {'ok': False, 'error': 'Demasiadas solicitudes', 'retryAfterMs': int(espera * 1000) + 1}
+    return None
+
+def register_handlers():
+    """Registra los event handlers (mismos nombres que core.websocket)"""
+
+    @sio.event
+    async def connect(sid, environ, auth=None):
+        # Servidores sin eventos lifespan: el loop se conoce con la primera conexión
+        if _loop is None:
+            iniciar()
+        ip = ip_cliente(environ)
+        token = auth.get('token') if isinstance(auth, dict) else None
+        if not connections.registrar_conexion(sid, ip, token):
+            registro.aviso('ws', 'conexion_rechazada', motivo='limite_ip', ip=ip)
+            return False
+        registro.debug('ws', 'conectado', sid=sid)
+
+    @sio.event
+    async def disconnect(sid):
+        connections.registrar_desconexion(sid)
+        backpressure.olvidar(sid)
+        tickets.cancelar(sid)
+        registro.debug('ws', 'desconectado', sid=sid)
+
+    @sio.event
+    async def join_queue(sid, data):
+        """Cliente se une a una sala de cola (snapshot o reanudación por deltas)"""
+        empresa_id = data.get('empresaId')
+        cola_id = data.get('colaId')
+        if not empresa_id or not cola_id:
+            await sio.emit('error', {'message': 'empresaId y colaId son requeridos'}, to=sid)
+            return
+
+        room = f"queue_{empresa_id}_{cola_id}"
+        if not connections.unir_sala(sid, room, empresa_id):
+            await sio.emit('error', {'message': 'Límite de conexiones de la empresa alcanzado'}, to=sid)
+            return
+        await sio.enter_room(sid, room)
+        await sio.emit('joined_queue', {'room': room, 'empresaId': empresa_id, 'colaId': cola_id}, to=sid)
+
+        pendientes = deltas_desde(empresa_id, cola_id, data.get('epoca'), data.get('seq'))
+        if pendientes is None:
+            snapshot = await _una_vez(('cola', empresa_id, cola_id), snapshots.snapshot_cola, empresa_id, cola_id)
+            await sio.emit('queue_snapshot', snapshot, to=sid)
+        elif pendientes:
+            await sio.emit('queue_resume', {'empresaId': empresa_id, 'colaId': cola_id, 'deltas': pendientes}, to=sid)
+
+    @sio.event
+    async def leave_queue(sid, data):
+        empresa_id = data.get('empresaId')
+        cola_id = data.get('colaId')
+        if empresa_id and cola_id:
+            room = f"queue_{empresa_id}_{cola_id}"
+            await sio.leave_room(sid, room)
+            connections.salir_sala(sid, room)
+
+    @sio.event
+    async def join_empresa(sid, data):
+        """Cliente se une a la sala de empresa y recibe su resumen compacto"""
+        empresa_id = data.get('empresaId')
+        if not empresa_id:
+            await sio.emit('error', {'message': 'empresaId es requerido'}, to=sid)
+            return
+
+        room = f"empresa_{empresa_id}"
+        if not connections.unir_sala(sid, room, empresa_id):
+            await sio.emit('error', {'message': 'Límite de conexiones de la empresa alcanzado'}, to=sid)
+            return
+        await sio.enter_room(sid, room)
+        await sio.emit('joined_empresa', {'room': room, 'empresaId': empresa_id}, to=sid)
+        resumen = await _una_vez(('empresa', empresa_id), snapshots.resumen_empresa, empresa_id, construir_resumen_empresa)
+        await sio.emit('resumen_empresa', resumen, to=sid)
+
+    @sio.event
+    async def leave_empresa(sid, data):
+        empresa_id = data.get('empresaId')
+        if empresa_id:
+            room = f"empresa_{empresa_id}"
+            await sio.leave_room(sid, room)
+            connections.salir_sala(sid, room)
+
+    @sio.event
+    async def join_ticket(sid, data):
+        """Cliente sigue solo su propio turno (por código)"""
+        from services.cola_service import obtener_turno_por_codigo
+
+        if not isinstance(data, dict):
+            await sio.emit('error', {'message': 'Datos inválidos'}, to=sid)
+            return
+        codigo = data.get('codigo')
+        codigo = codigo.strip().upper() if isinstance(codigo, str) else ''
+        if not codigo:
+            await sio.emit('error', {'message': 'codigo es requerido'}, to=sid)
+            return
+        avisos = tickets.leer_avisos(data.get('avisos'))
+        if avisos is None:
+            await sio.emit('error', {'message': f'avisos debe ser una lista de hasta {get_config().TICKET_AVISOS_MAX} posiciones'}, to=sid)
+            return
+
+        turno = await ejecutar_async('sqlite', obtener_turno_por_codigo, codigo)
+        if not turno:
+            await sio.emit('error', {'message': 'Turno no encontrado'}, to=sid)
+            return
+
+        room = tickets.sala_ticket(turno['id'])
+        if not connections.unir_sala(sid, room, turno['empresa_id']):
+            await sio.emit('error', {'message': 'Límite de conexiones de la empresa alcanzado'}, to=sid)
+            return
+        await sio.enter_room(sid, room)
+        await sio.emit('posicion_turno', tickets.suscribir(sid, turno, avisos), to=sid)
+
+    @sio.event
+    async def leave_ticket(sid, data):
+        turno_id = data.get('turnoId')
+        if turno_id:
+            room = tickets.sala_ticket(turno_id)
+            await sio.leave_room(sid, room)
+            connections.salir_sala(sid, room)
+            tickets.cancelar(sid, turno_id)
+
+    @sio.event
+    async def llamadas_recientes(sid, data):
+        empresa_id = data.get('empresaId')
+        if not empresa_id:
+            await sio.emit('error', {'message': 'empresaId es requerido'}, to=sid)
+            return
+
+        limite = data.get('limite')
+        recientes = await ejecutar_async(
+            'sqlite', llamadas.recientes_empresa, empresa_id, limite if isinstance(limite, int) else None
+        )
+        await sio.emit('llamadas_recientes', {'empresaId': empresa_id, 'llamadas': recientes}, to=sid)
+
+    @sio.event
+    async def issue_ticket(sid, data=None):
+        """Kiosco emite un turno; el resultado llega en el ack"""
+        from services.cola_service import agregar_turno
+
+        rechazo = _rpc_permitido(sid)
+        if rechazo:
+            return rechazo
+        if not isinstance(data, dict) or not data.get('empresaId') or not data.get('colaId'):
+            return {'ok': False, 'error': 'empresaId y colaId son requeridos'}
+        rechazo = _admitir(data['empresaId'], data['colaId'])
+        if rechazo:
+            return rechazo
+
+        turno = await ejecutar_async('sqlite', agregar_turno, data['empresaId'], data['colaId'], {
+            "nombre": data.get("nombre"),
+            "tipo": data.get("tipo", "General")
+        })
+        if turno:
+            return {'ok': True, 'turno': turno}
+        return {'ok': False, 'error': 'No se pudo agregar el turno'}
+
+    @sio.event
+    async def call_next(sid, data=None):
+        """Consola del personal llama al siguiente turno; el resultado llega en el ack"""
+        from services.cola_service import siguiente_turno
+
+        rechazo = _rpc_permitido(sid)
+        if rechazo:
+            return rechazo
+        if not isinstance(data, dict) or not data.get('empresaId') or not data.get('colaId'):
+            return {'ok': False, 'error': 'empresaId y colaId son requeridos'}
+
+        if get_config().AUTH_REQUERIDA:
+            claims = sesiones.verificar_token(connections.token_sesion(sid))
+            if not await ejecutar_async('sqlite', sesiones.puede_gestionar, claims, data['empresaId']):
+                return {'ok': False, 'error': 'No autorizado'}
+        rechazo = _admitir(data['empresaId'], data['colaId'])
+        if rechazo:
+            return rechazo
+
+        turno = await ejecutar_async('sqlite', siguiente_turno, data['empresaId'], data['colaId'])
+        if turno:
+            return {'ok': True, 'turno': turno}
+        return {'ok': False, 'error': 'No hay turnos'}
+
+# Emisión de eventos de dominio
+# Los suscriptores de core.difusion se llaman en el hilo que hizo el commit
+# (un hilo del executor); el transporte lleva cada operación de Socket.IO al
+# event loop y espera a que termine, así el orden de los eventos se conserva
+
+def _en_loop(corrutina):
+    """Ejecuta una corrutina en el event loop desde un hilo y devuelve su resultado"""
+    return asyncio.run_coroutine_threadsafe(corrutina, _loop).result()
+
+async def _participantes(salas):
+    return list(sio.manager.get_participants('/', salas))
+
+class _TransporteASGI(Transporte):
+    """Emisión sobre AsyncServer desde los hilos del executor"""
+
+    def emitir(self, evento, datos, to, omitir=None):
+        _en_loop(sio.emit(evento, datos, to=to, skip_sid=omitir))
+
+    def cerrar_sala(self, sala):
+        _en_loop(sio.close_room(sala))
+
+    def participantes(self, salas):
+        return _en_loop(_participantes(salas))
+
+    def cola_salida(self, eio_sid):
+        socket = sio.eio.sockets.get(eio_sid)
+        if socket is None:
+            return None
+        return socket.queue.qsize()
+
+    def desconectar(self, sid):
+        _en_loop(sio.disconnect(sid))
+
+    def programar(self, segundos, funcion, *args):
+        # La tarea consulta la BD (posiciones de los turnos): va al executor
+        def lanzar():
+            asyncio.ensure_future(ejecutar_async('ws', funcion, *args))
+        _loop.call_soon_threadsafe(_loop.call_later, segundos, lanzar)
+
+    def iniciar_tarea(self, funcion, *args):
+        # Drenaje de un cliente lento: espera durante segundos sin ocupar el executor
+        threading.Thread(target=funcion, args=args, name='ttoca-drenaje', daemon=True).start()
+
+    def dormir(self, segundos):
+        time.sleep(segundos)
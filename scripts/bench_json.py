@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de serialización JSON
+
+Compara el proveedor JSON por defecto de Flask con core.serializacion
+(orjson si está instalado) sobre listas de turnos como las que devuelve
+GET /api/proyectos/<empresa>/cola/<cola>, y mide el ahorro de codificar
+una sola vez un evento que va a Socket.IO y a SSE.
+
+Uso:
+    python scripts/bench_json.py [turnos] [repeticiones]
+"""
+
+import os
+import sys
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import uuid
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from core import serializacion
+
+def generar_turnos(n):
+    """Lista de turnos con la forma de services.cola_service.obtener_turnos"""
+    return [{
+        'id': str(uuid.uuid4()),
+        'categoria_id': 'cat-general',
+        'empresa_id': 'a1b2c3d4',
+        'nombre': f'Cliente {i} Muñoz',
+        'numero': i,
+        'codigo': f'G{i:03d}',
+        'posicion': i,
+        'created_at': '2025-01-15 10:23:45'
+    } for i in range(1, n + 1)]
+
+def medir(funcion, repeticiones):
+    """Microsegundos por llamada (mejor de 3 rondas)"""
+    mejor = float('inf')
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor / repeticiones * 1e6
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    datos = {'turnos': generar_turnos(n)}
+
+    app_base = Flask('base')
+    app_base.json = DefaultJSONProvider(app_base)
+    app_rapida = Flask('rapida')
+    app_rapida.json = serializacion.ProveedorJSON(app_rapida)
+
+    print(f"📊 {n} turnos, {repeticiones} repeticiones (motor: {serializacion.MOTOR})")
+
+    with app_base.app_context():
+        base = medir(lambda: app_base.json.response(datos), repeticiones)
+    with app_rapida.app_context():
+        rapida = medir(lambda: app_rapida.json.response(datos), repeticiones)
+    print(f"   jsonify por defecto:   {base:9.1f} µs/respuesta")
+    print(f"   ProveedorJSON:         {rapida:9.1f} µs/respuesta  ({base / rapida:.1f}x)")
+
+    # Un evento emitido por Socket.IO y por SSE: dos codificaciones frente a una
+    def dos_veces():
+        serializacion.dumps(['queue_delta', datos])
+        serializacion.dumps(datos)
+
+    def una_vez():
+        precodificado = serializacion.Precodificado(datos)
+        serializacion.dumps(['queue_delta', precodificado])
+        serializacion.dumps(precodificado)
+
+    doble = medir(dos_veces, repeticiones)
+    unica = medir(una_vez, repeticiones)
+    print(f"   evento, 2 codificaciones: {doble:7.1f} µs")
+    print(f"   evento, Precodificado:    {unica:7.1f} µs  ({doble / unica:.1f}x)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
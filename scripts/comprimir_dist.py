@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Genera las variantes precomprimidas del frontend compilado
+
+Crea junto a cada archivo de texto de dist/ (js, css, html, svg, json) un
+.gz con gzip -9 y, si está instalado el paquete brotli, un .br. El backend
+(api/frontend.py) las envía según Accept-Encoding sin comprimir en cada
+petición. Las imágenes PNG/JPG ya están comprimidas y se omiten.
+
+Uso:
+    python scripts/comprimir_dist.py [directorio]   (por defecto dist/)
+
+Ejecutar después de cada build del frontend.
+"""
+
+import os
+import sys
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+EXTENSIONES = ('.js', '.css', '.html', '.svg', '.json', '.txt', '.map')
+
+def comprimir_archivo(ruta):
+    """Escribe ruta.gz (y ruta.br) si reducen el tamaño; devuelve los bytes ahorrados"""
+    with open(ruta, 'rb') as f:
+        datos = f.read()
+
+    variantes = [('.gz', gzip.compress(datos, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.append(('.br', brotli.compress(datos, quality=11)))
+
+    ahorro = 0
+    for extension, comprimido in variantes:
+        destino = ruta + extension
+        if len(comprimido) >= len(datos):
+            # No compensa: que se sirva el original
+            if os.path.exists(destino):
+                os.remove(destino)
+            continue
+        with open(destino, 'wb') as f:
+            f.write(comprimido)
+        ahorro = max(ahorro, len(datos) - len(comprimido))
+    return ahorro
+
+def main():
+    directorio = sys.argv[1] if len(sys.argv) > 1 else 'dist'
+    if not os.path.isdir(directorio):
+        print(f"❌ No existe el directorio {directorio}")
+        return 1
+
+    if brotli is None:
+        print("⚠️  Paquete brotli no instalado: solo se generan variantes .gz")
+
+    total = 0
+    archivos = 0
+    for raiz, _, nombres in os.walk(directorio):
+        for nombre in nombres:
+            if not nombre.endswith(EXTENSIONES):
+                continue
+            ruta = os.path.join(raiz, nombre)
+            ahorro = comprimir_archivo(ruta)
+            archivos += 1
+            total += ahorro
+            print(f"   {ruta}: -{ahorro / 1024:.1f} KB")
+
+    print(f"✅ {archivos} archivos procesados, {total / 1024:.1f} KB ahorrados por descarga completa")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
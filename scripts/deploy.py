@@ -71,6 +71,8 @@ def setup_produccion():
     env_content = """# Variables de entorno para TTOCA Backend Producción
 FLASK_ENV=production
 SECRET_KEY=tu-clave-secreta-super-segura-aqui
+# Token de /api/internal y /metrics (cabecera X-Internal-Token)
+INTERNAL_TOKEN=otro-token-secreto-aqui
 """
     
     if not os.path.exists('.env'):
@@ -120,9 +122,9 @@ def iniciar_servidor():
             print("⚠️  Continuando con servidor Flask integrado...")
             comando_servidor = "python app.py"
         else:
-            comando_servidor = "gunicorn -w 4 -b 0.0.0.0:5000 app:app"
+            comando_servidor = "gunicorn -k eventlet -w 4 -b 0.0.0.0:5000 app:app"
     else:
-        comando_servidor = "gunicorn -w 4 -b 0.0.0.0:5000 app:app"
+        comando_servidor = "gunicorn -k eventlet -w 4 -b 0.0.0.0:5000 app:app"
     
     print(f"▶️  Ejecutando: {comando_servidor}")
     print("   Presiona Ctrl+C para detener")
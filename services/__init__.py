@@ -9,7 +9,8 @@ from .auth_service import (
     get_user_project_by_id,
     add_user_project,
     update_user_project,
-    delete_user_project
+    delete_user_project,
+    obtener_propietario_empresa
 )
 
 from .cola_service import (
@@ -18,9 +19,15 @@ from .cola_service import (
     obtener_turnos,
     eliminar_cola,
     obtener_turno_actual,
+    obtener_turnos_actuales_empresa,
     obtener_posicion_turno,
+    obtener_turno_por_codigo,
+    obtener_posiciones_turnos,
+    obtener_llamadas_recientes,
+    obtener_versiones_colas,
     buscar_turno_global,
     obtener_estadisticas_cola,
+    contar_turnos_en_espera,
     limpiar_turnos_antiguos
 )
 
@@ -39,11 +46,13 @@ __all__ = [
     # Auth
     'add_user', 'validate_user', 'get_user_projects', 
     'get_user_project_by_id', 'add_user_project',
-    'update_user_project', 'delete_user_project',
+    'update_user_project', 'delete_user_project', 'obtener_propietario_empresa',
     # Cola
     'agregar_turno', 'siguiente_turno', 'obtener_turnos',
-    'eliminar_cola', 'obtener_turno_actual', 'obtener_posicion_turno',
-    'buscar_turno_global', 'obtener_estadisticas_cola', 'limpiar_turnos_antiguos',
+    'eliminar_cola', 'obtener_turno_actual', 'obtener_turnos_actuales_empresa',
+    'obtener_posicion_turno', 'obtener_turno_por_codigo', 'obtener_posiciones_turnos',
+    'obtener_llamadas_recientes', 'obtener_versiones_colas', 'buscar_turno_global', 'obtener_estadisticas_cola',
+    'contar_turnos_en_espera', 'limpiar_turnos_antiguos',
     # Cola Config
     'obtener_configuracion', 'guardar_configuracion_empresa',
     'agregar_categoria', 'actualizar_categoria', 'eliminar_categoria',
@@ -1,55 +1,111 @@
-import bcrypt
 import uuid
 import json
 from core.database import get_db_connection
+from core import registro
+from core.contrasenas import hashear, verificar, necesita_rehash, PoolSaturado
 from datetime import datetime
 
 def add_user(username, email, password):
-    """Agrega un nuevo usuario a la base de datos"""
+    """Agrega un nuevo usuario a la base de datos
+
+    Devuelve True si se creó, False si el email ya estaba registrado y None
+    si no se pudo guardar (BD ocupada o con error). Lanza PoolSaturado si no
+    hay capacidad para calcular el hash ahora.
+    """
     try:
+        # Comprobación previa para no gastar bcrypt en un email ya registrado
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            
-            # Verificar si el usuario ya existe
             cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
             if cursor.fetchone():
                 return False  # Usuario ya existe
+        
+        # Hash de la contraseña fuera de la transacción (costoso a propósito:
+        # pool acotado de bcrypt); con la lectura abierta, un commit ajeno
+        # durante la espera haría fallar el INSERT con "database is locked"
+        hashed_password = hashear(password)
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
             
-            # Hash de la contraseña
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-            
-            # Insertar usuario
+            # Insertar usuario; otro registro del mismo email pudo llegar mientras tanto
             cursor.execute('''
-                INSERT INTO users (email, password)
+                INSERT OR IGNORE INTO users (email, password)
                 VALUES (?, ?)
-            ''', (email, hashed_password.decode('utf-8')))
+            ''', (email, hashed_password))
             
             # El commit se hace automáticamente al salir del context manager
-            return True
+            return cursor.rowcount == 1
             
+    except PoolSaturado:
+        raise
     except Exception as e:
-        print(f"Error al agregar usuario: {e}")
-        return False
+        registro.error('auth', 'add_user', email=email, error=repr(e))
+        return None
 
 def validate_user(email, password):
-    """Valida las credenciales de un usuario"""
+    """Valida las credenciales de un usuario
+
+    Si el hash se generó con otro coste de bcrypt se actualiza al vuelo.
+    Lanza PoolSaturado si no hay capacidad para verificar ahora.
+    """
     try:
+        # La conexión se cierra antes de bcrypt: no se retiene durante el cálculo
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute('SELECT password FROM users WHERE email = ?', (email,))
             result = cursor.fetchone()
             
-            if not result:
-                return False
-            
-            hashed_password = result['password']
-            return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        if not result:
+            return False
+        
+        hashed_password = result['password']
+        if not verificar(password, hashed_password):
+            return False
+        
+        if necesita_rehash(hashed_password):
+            _actualizar_hash(email, password, hashed_password)
+        
+        return True
             
+    except PoolSaturado:
+        raise
     except Exception as e:
-        print(f"Error al validar usuario: {e}")
+        registro.error('auth', 'validate_user', email=email, error=repr(e))
         return False
 
+def _actualizar_hash(email, password, hashed_password):
+    """Regenera el hash de un usuario con el coste de bcrypt actual"""
+    try:
+        nuevo_hash = hashear(password)
+    except PoolSaturado:
+        return  # Se reintenta en el próximo login
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Solo si nadie cambió la contraseña mientras tanto
+        cursor.execute('''
+            UPDATE users SET password = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE email = ? AND password = ?
+        ''', (nuevo_hash, email, hashed_password))
+    registro.info('auth', 'hash_actualizado', email=email)
+
+def obtener_propietario_empresa(empresa_id):
+    """Obtiene el email del dueño de una empresa"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT user_email FROM empresas WHERE id = ?', (empresa_id,))
+            result = cursor.fetchone()
+            return result['user_email'] if result else None
+            
+    except Exception as e:
+        registro.error('auth', 'obtener_propietario_empresa', empresa_id=empresa_id, error=repr(e))
+        return None
+
 def get_user_projects(email):
     """Obtiene todas las empresas de un usuario"""
     try:
@@ -76,7 +132,7 @@ def get_user_projects(email):
             return empresas
             
     except Exception as e:
-        print(f"Error al obtener proyectos del usuario: {e}")
+        registro.error('auth', 'get_user_projects', email=email, error=repr(e))
         return []
 
 def get_user_project_by_id(email, proyecto_id):
@@ -104,7 +160,7 @@ def get_user_project_by_id(email, proyecto_id):
             return None
             
     except Exception as e:
-        print(f"Error al obtener proyecto por ID: {e}")
+        registro.error('auth', 'get_user_project_by_id', email=email, proyecto_id=proyecto_id, error=repr(e))
         return None
 
 def add_user_project(email, proyecto_data):
@@ -153,7 +209,7 @@ def add_user_project(email, proyecto_data):
             return True, nueva_empresa
             
     except Exception as e:
-        print(f"Error al agregar proyecto de usuario: {e}")
+        registro.error('auth', 'add_user_project', email=email, error=repr(e))
         return False, f"Error interno: {str(e)}"
 
 def update_user_project(email, proyecto_id, proyecto_data):
@@ -190,7 +246,7 @@ def update_user_project(email, proyecto_id, proyecto_data):
             return True, "Empresa actualizada correctamente"
             
     except Exception as e:
-        print(f"Error al actualizar proyecto: {e}")
+        registro.error('auth', 'update_user_project', email=email, proyecto_id=proyecto_id, error=repr(e))
         return False, f"Error interno: {str(e)}"
 
 def delete_user_project(email, proyecto_id):
@@ -211,5 +267,5 @@ def delete_user_project(email, proyecto_id):
             return True, "Empresa eliminada correctamente"
             
     except Exception as e:
-        print(f"Error al eliminar proyecto: {e}")
+        registro.error('auth', 'delete_user_project', email=email, proyecto_id=proyecto_id, error=repr(e))
         return False, f"Error interno: {str(e)}"
\ No newline at end of file
@@ -1,6 +1,7 @@
 import uuid
 import json
 from core.database import get_db_connection
+from core import registro
 
 def obtener_configuracion(empresa_id):
     """Obtiene la configuración completa de las colas de una empresa"""
@@ -30,7 +31,7 @@ def obtener_configuracion(empresa_id):
             }
             
     except Exception as e:
-        print(f"Error al obtener configuración: {e}")
+        registro.error('cola_config', 'obtener_configuracion', empresa_id=empresa_id, error=repr(e))
         return {"categorias": []}
 
 def guardar_configuracion_empresa(empresa_id, config):
@@ -89,7 +90,7 @@ def guardar_configuracion_empresa(empresa_id, config):
             return True, "Configuración guardada correctamente"
             
     except Exception as e:
-        print(f"Error al guardar configuración: {e}")
+        registro.error('cola_config', 'guardar_configuracion_empresa', empresa_id=empresa_id, error=repr(e))
         return False, f"Error interno: {str(e)}"
 
 def agregar_categoria(empresa_id, categoria_data):
@@ -136,7 +137,7 @@ def agregar_categoria(empresa_id, categoria_data):
             return nueva_categoria, "Categoría creada correctamente"
             
     except Exception as e:
-        print(f"Error al agregar categoría: {e}")
+        registro.error('cola_config', 'agregar_categoria', empresa_id=empresa_id, error=repr(e))
         return None, f"Error interno: {str(e)}"
 
 def actualizar_categoria(empresa_id, categoria_id, categoria_data):
@@ -172,7 +173,7 @@ def actualizar_categoria(empresa_id, categoria_id, categoria_data):
             return True, "Categoría actualizada correctamente"
             
     except Exception as e:
-        print(f"Error al actualizar categoría: {e}")
+        registro.error('cola_config', 'actualizar_categoria', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return False, f"Error interno: {str(e)}"
 
 def eliminar_categoria(empresa_id, categoria_id):
@@ -200,7 +201,7 @@ def eliminar_categoria(empresa_id, categoria_id):
             return True, "Categoría eliminada correctamente"
             
     except Exception as e:
-        print(f"Error al eliminar categoría: {e}")
+        registro.error('cola_config', 'eliminar_categoria', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return False, f"Error interno: {str(e)}"
 
 def obtener_categoria(empresa_id, categoria_id):
@@ -228,7 +229,7 @@ def obtener_categoria(empresa_id, categoria_id):
             return None
             
     except Exception as e:
-        print(f"Error al obtener categoría: {e}")
+        registro.error('cola_config', 'obtener_categoria', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return None
 
 def obtener_categorias_resumen(empresa_id):
@@ -266,7 +267,7 @@ def obtener_categorias_resumen(empresa_id):
             return categorias
             
     except Exception as e:
-        print(f"Error al obtener categorías resumen: {e}")
+        registro.error('cola_config', 'obtener_categorias_resumen', empresa_id=empresa_id, error=repr(e))
         return []
 
 def resetear_contador_categoria(empresa_id, categoria_id):
@@ -295,5 +296,5 @@ def resetear_contador_categoria(empresa_id, categoria_id):
             return True, "Contador reseteado correctamente"
             
     except Exception as e:
-        print(f"Error al resetear contador: {e}")
+        registro.error('cola_config', 'resetear_contador_categoria', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return False, f"Error interno: {str(e)}"
\ No newline at end of file
@@ -2,13 +2,45 @@ import uuid
 import random
 import string
 import json
+import time
 from core.database import get_db_connection
-from core.websocket import emit_turno_agregado, emit_turno_llamado, emit_queue_update, emit_cola_eliminada
+from core import registro
+from core.events import publicar
+
+# Columnas estructuradas de turnos_actuales que forman el turno llamado
+_COLUMNAS_TURNO_ACTUAL = 'turno_id, categoria_id, empresa_id, nombre, numero, codigo, posicion'
+
+def _turno_actual_desde_fila(row):
+    """Construye el turno actual a partir de sus columnas (sin re-parsear JSON)"""
+    return {
+        'id': row['turno_id'],
+        'categoria_id': row['categoria_id'],
+        'empresa_id': row['empresa_id'],
+        'nombre': row['nombre'],
+        'numero': row['numero'],
+        'codigo': row['codigo'],
+        'posicion': row['posicion']
+    }
 
 def generar_codigo_corto():
     """Genera un código corto alfanumérico para los turnos"""
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
 
+def _nueva_version(cursor, empresa_id, categoria_id):
+    """Asigna a una cola la siguiente versión global dentro de la transacción en curso
+
+    SQLite tiene un solo escritor: el contador da a cada cambio una versión
+    única y ordenada aunque lo hagan workers distintos.
+    """
+    cursor.execute("UPDATE contadores SET valor = valor + 1 WHERE nombre = 'version'")
+    cursor.execute("SELECT valor FROM contadores WHERE nombre = 'version'")
+    version = cursor.fetchone()['valor']
+    cursor.execute('''
+        UPDATE cola_categorias SET version = ?
+        WHERE id = ? AND empresa_id = ?
+    ''', (version, categoria_id, empresa_id))
+    return version
+
 def iniciar_cola(empresa_id, categoria_id):
     """Inicializa una cola (categoría) si no existe"""
     try:
@@ -28,7 +60,7 @@ def iniciar_cola(empresa_id, categoria_id):
             return True
             
     except Exception as e:
-        print(f"Error al inicializar cola: {e}")
+        registro.error('cola', 'iniciar_cola', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return False
 
 def agregar_turno(empresa_id, categoria_id, turno_obj):
@@ -39,7 +71,7 @@ def agregar_turno(empresa_id, categoria_id, turno_obj):
             
             # Obtener y actualizar el contador de la categoría
             cursor.execute('''
-                SELECT contador FROM cola_categorias 
+                SELECT contador, tiempo_estimado FROM cola_categorias 
                 WHERE id = ? AND empresa_id = ?
             ''', (categoria_id, empresa_id))
             
@@ -88,17 +120,17 @@ def agregar_turno(empresa_id, categoria_id, turno_obj):
             
             # El commit se hace automáticamente al salir del context manager
 
-            # Emitir evento WebSocket de turno agregado
-            emit_turno_agregado(empresa_id, categoria_id, turno_obj)
-
-            # Obtener y emitir lista actualizada de turnos
-            turnos_actualizados = obtener_turnos(empresa_id, categoria_id)
-            emit_queue_update(empresa_id, categoria_id, turnos_actualizados)
+            # Publicar evento de dominio (se entrega tras el commit)
+            # Las posiciones son consecutivas, así que la nueva es también el total en espera
+            publicar('turno_agregado', empresa_id=empresa_id, cola_id=categoria_id,
+                     turno=dict(turno_obj, posicion=next_position),
+                     en_espera=next_position, tiempo_estimado=result['tiempo_estimado'],
+                     version=_nueva_version(cursor, empresa_id, categoria_id))
 
             return turno_obj
 
     except Exception as e:
-        print(f"Error al agregar turno: {e}")
+        registro.error('cola', 'agregar_turno', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return None
 
 def siguiente_turno(empresa_id, categoria_id):
@@ -137,25 +169,44 @@ def siguiente_turno(empresa_id, categoria_id):
             ''', (categoria_id, empresa_id, turno['posicion']))
             
             # Guardar como turno actual dentro de la misma transacción
+            # (turno_data se sigue escribiendo por compatibilidad, pero ya no se lee)
+            llamado_en = time.time()
             cursor.execute('''
                 INSERT OR REPLACE INTO turnos_actuales
-                (empresa_id, categoria_id, turno_id, turno_data)
-                VALUES (?, ?, ?, ?)
-            ''', (empresa_id, categoria_id, turno['id'], json.dumps(turno)))
+                (empresa_id, categoria_id, turno_id, turno_data, nombre, numero, codigo, posicion, llamado_en)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (empresa_id, categoria_id, turno['id'], json.dumps(turno),
+                  turno['nombre'], turno['numero'], turno['codigo'], turno['posicion'], llamado_en))
+            
+            # Registrar la llamada en el historial de las pantallas
+            cursor.execute('''
+                INSERT INTO llamadas
+                (empresa_id, categoria_id, turno_id, nombre, numero, codigo, llamado_en)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (empresa_id, categoria_id, turno['id'], turno['nombre'], turno['numero'], turno['codigo'], llamado_en))
+            llamada = {'id': cursor.lastrowid, 'llamado_en': llamado_en}
 
             # El commit se hace automáticamente al salir del context manager
 
-            # Emitir evento WebSocket de turno llamado
-            emit_turno_llamado(empresa_id, categoria_id, turno)
+            # Estado resultante de la cola para el resumen de la empresa
+            cursor.execute('''
+                SELECT tiempo_estimado,
+                       (SELECT COUNT(*) FROM turnos
+                        WHERE categoria_id = ? AND empresa_id = ? AND estado = 'en_espera') as en_espera
+                FROM cola_categorias
+                WHERE id = ? AND empresa_id = ?
+            ''', (categoria_id, empresa_id, categoria_id, empresa_id))
+            estado_cola = cursor.fetchone()
 
-            # Obtener y emitir lista actualizada de turnos
-            turnos_actualizados = obtener_turnos(empresa_id, categoria_id)
-            emit_queue_update(empresa_id, categoria_id, turnos_actualizados)
+            # Publicar evento de dominio (se entrega tras el commit)
+            publicar('turno_llamado', empresa_id=empresa_id, cola_id=categoria_id, turno=turno,
+                     en_espera=estado_cola['en_espera'], tiempo_estimado=estado_cola['tiempo_estimado'],
+                     llamada=llamada, version=_nueva_version(cursor, empresa_id, categoria_id))
 
             return turno
 
     except Exception as e:
-        print(f"Error al obtener siguiente turno: {e}")
+        registro.error('cola', 'siguiente_turno', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return None
 
 def obtener_turnos(empresa_id, categoria_id):
@@ -178,7 +229,7 @@ def obtener_turnos(empresa_id, categoria_id):
             return turnos
             
     except Exception as e:
-        print(f"Error al obtener turnos: {e}")
+        registro.error('cola', 'obtener_turnos', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return []
 
 def eliminar_cola(empresa_id, categoria_id):
@@ -187,22 +238,31 @@ def eliminar_cola(empresa_id, categoria_id):
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
+            # La versión se asigna antes de borrar la fila
+            version = _nueva_version(cursor, empresa_id, categoria_id)
+            
             # Eliminar la categoría (esto también eliminará automáticamente todos los turnos asociados)
             cursor.execute('''
                 DELETE FROM cola_categorias
                 WHERE id = ? AND empresa_id = ?
             ''', (categoria_id, empresa_id))
+            eliminada = cursor.rowcount > 0
+            
+            cursor.execute('''
+                DELETE FROM llamadas
+                WHERE categoria_id = ? AND empresa_id = ?
+            ''', (categoria_id, empresa_id))
 
             # El commit se hace automáticamente al salir del context manager
-            if cursor.rowcount > 0:
-                # Emitir evento WebSocket de cola eliminada
-                emit_cola_eliminada(empresa_id, categoria_id)
+            if eliminada:
+                # Publicar evento de dominio (se entrega tras el commit)
+                publicar('cola_eliminada', empresa_id=empresa_id, cola_id=categoria_id, version=version)
                 return True
 
             return False
 
     except Exception as e:
-        print(f"Error al eliminar cola: {e}")
+        registro.error('cola', 'eliminar_cola', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return False
 
 def guardar_turno_actual(empresa_id, categoria_id, turno_id, turno_data):
@@ -213,14 +273,16 @@ def guardar_turno_actual(empresa_id, categoria_id, turno_id, turno_data):
             
             cursor.execute('''
                 INSERT OR REPLACE INTO turnos_actuales 
-                (empresa_id, categoria_id, turno_id, turno_data)
-                VALUES (?, ?, ?, ?)
-            ''', (empresa_id, categoria_id, turno_id, json.dumps(turno_data)))
+                (empresa_id, categoria_id, turno_id, turno_data, nombre, numero, codigo, posicion, llamado_en)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (empresa_id, categoria_id, turno_id, json.dumps(turno_data),
+                  turno_data.get('nombre'), turno_data.get('numero'), turno_data.get('codigo', ''),
+                  turno_data.get('posicion'), time.time()))
             
             # El commit se hace automáticamente al salir del context manager
             
     except Exception as e:
-        print(f"Error al guardar turno actual: {e}")
+        registro.error('cola', 'guardar_turno_actual', empresa_id=empresa_id, categoria_id=categoria_id, turno_id=turno_id, error=repr(e))
 
 def obtener_turno_actual(empresa_id, categoria_id):
     """Obtiene el turno que está siendo atendido actualmente"""
@@ -228,22 +290,43 @@ def obtener_turno_actual(empresa_id, categoria_id):
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT turno_data 
+            cursor.execute(f'''
+                SELECT {_COLUMNAS_TURNO_ACTUAL}
                 FROM turnos_actuales 
                 WHERE empresa_id = ? AND categoria_id = ?
             ''', (empresa_id, categoria_id))
             
             result = cursor.fetchone()
             if result:
-                return json.loads(result['turno_data'])
+                return _turno_actual_desde_fila(result)
             
             return None
             
     except Exception as e:
-        print(f"Error al obtener turno actual: {e}")
+        registro.error('cola', 'obtener_turno_actual', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return None
 
+def obtener_turnos_actuales_empresa(empresa_id):
+    """Obtiene el turno actual de cada cola de una empresa"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(f'''
+                SELECT {_COLUMNAS_TURNO_ACTUAL}
+                FROM turnos_actuales 
+                WHERE empresa_id = ?
+            ''', (empresa_id,))
+            
+            return {
+                row['categoria_id']: _turno_actual_desde_fila(row)
+                for row in cursor.fetchall()
+            }
+            
+    except Exception as e:
+        registro.error('cola', 'obtener_turnos_actuales_empresa', empresa_id=empresa_id, error=repr(e))
+        return {}
+
 def obtener_posicion_turno(empresa_id, categoria_id, identificador):
     """Obtiene la posición de un turno específico en la cola"""
     try:
@@ -269,7 +352,50 @@ def obtener_posicion_turno(empresa_id, categoria_id, identificador):
             return None
             
     except Exception as e:
-        print(f"Error al obtener posición del turno: {e}")
+        registro.error('cola', 'obtener_posicion_turno', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
+        return None
+
+def obtener_turno_por_codigo(codigo):
+    """Obtiene un turno en espera por su código junto al tiempo estimado de su cola"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT t.id, t.categoria_id, t.empresa_id, t.numero, t.codigo, t.posicion,
+                       cc.tiempo_estimado
+                FROM turnos t
+                JOIN cola_categorias cc ON cc.id = t.categoria_id AND cc.empresa_id = t.empresa_id
+                WHERE t.codigo = ? AND t.estado = 'en_espera'
+                LIMIT 1
+            ''', (codigo,))
+            
+            result = cursor.fetchone()
+            return dict(result) if result else None
+            
+    except Exception as e:
+        registro.error('cola', 'obtener_turno_por_codigo', codigo=codigo, error=repr(e))
+        return None
+
+def obtener_posiciones_turnos(empresa_id, categoria_id, turno_ids):
+    """Obtiene la posición actual de varios turnos; los que ya no esperan no aparecen"""
+    if not turno_ids:
+        return {}
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            marcadores = ', '.join('?' * len(turno_ids))
+            cursor.execute(f'''
+                SELECT id, posicion FROM turnos
+                WHERE categoria_id = ? AND empresa_id = ? AND estado = 'en_espera'
+                AND id IN ({marcadores})
+            ''', (categoria_id, empresa_id, *turno_ids))
+            
+            return {row['id']: row['posicion'] for row in cursor.fetchall()}
+            
+    except Exception as e:
+        registro.error('cola', 'obtener_posiciones_turnos', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return None
 
 def buscar_turno_global(codigo):
@@ -279,23 +405,22 @@ def buscar_turno_global(codigo):
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT t.*, ta.turno_data as turno_actual_data
-                FROM turnos t
-                LEFT JOIN turnos_actuales ta ON t.categoria_id = ta.categoria_id AND t.empresa_id = ta.empresa_id
-                WHERE t.estado = 'en_espera' AND (t.id = ? OR t.nombre = ? OR t.codigo = ?)
+                SELECT * FROM turnos
+                WHERE estado = 'en_espera' AND (id = ? OR nombre = ? OR codigo = ?)
                 LIMIT 1
             ''', (codigo, codigo, codigo))
             
             result = cursor.fetchone()
             if result:
                 turno = dict(result)
-                turno_actual = None
                 
-                if turno['turno_actual_data']:
-                    turno_actual = json.loads(turno['turno_actual_data'])
-                
-                # Remover el campo turno_actual_data del resultado principal
-                del turno['turno_actual_data']
+                cursor.execute(f'''
+                    SELECT {_COLUMNAS_TURNO_ACTUAL}
+                    FROM turnos_actuales
+                    WHERE empresa_id = ? AND categoria_id = ?
+                ''', (turno['empresa_id'], turno['categoria_id']))
+                actual = cursor.fetchone()
+                turno_actual = _turno_actual_desde_fila(actual) if actual else None
                 
                 return {
                     "empresa_id": turno["empresa_id"],
@@ -308,7 +433,7 @@ def buscar_turno_global(codigo):
             return None
             
     except Exception as e:
-        print(f"Error al buscar turno global: {e}")
+        registro.error('cola', 'buscar_turno_global', codigo=codigo, error=repr(e))
         return None
 
 def obtener_estadisticas_cola(empresa_id, categoria_id):
@@ -348,13 +473,81 @@ def obtener_estadisticas_cola(empresa_id, categoria_id):
             }
             
     except Exception as e:
-        print(f"Error al obtener estadísticas: {e}")
+        registro.error('cola', 'obtener_estadisticas_cola', empresa_id=empresa_id, categoria_id=categoria_id, error=repr(e))
         return {
             "turnos_en_espera": 0,
             "turnos_atendidos_hoy": 0,
             "tiempo_estimado_minutos": 0
         }
 
+def contar_turnos_en_espera():
+    """Cuenta los turnos en espera de cada cola: {(empresa_id, categoria_id): n}
+
+    Incluye las colas vacías con 0: una serie que desaparece al vaciarse la
+    cola deja el último valor en Prometheus en lugar de bajar a 0.
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT c.empresa_id, c.id as categoria_id, COUNT(t.id) as en_espera
+                FROM cola_categorias c
+                LEFT JOIN turnos t ON t.empresa_id = c.empresa_id AND t.categoria_id = c.id AND t.estado = 'en_espera'
+                GROUP BY c.empresa_id, c.id
+            ''')
+            return {(row['empresa_id'], row['categoria_id']): row['en_espera'] for row in cursor.fetchall()}
+            
+    except Exception as e:
+        registro.error('cola', 'contar_turnos_en_espera', error=repr(e))
+        return {}
+
+def obtener_versiones_colas(empresa_id):
+    """Obtiene la versión de long-polling de cada cola de una empresa: {categoria_id: versión}
+
+    Devuelve None si la empresa no existe.
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT c.id, c.version FROM empresas e
+                LEFT JOIN cola_categorias c ON c.empresa_id = e.id AND c.version > 0
+                WHERE e.id = ?
+            ''', (empresa_id,))
+            filas = cursor.fetchall()
+            if not filas:
+                return None
+            return {row['id']: row['version'] for row in filas if row['id'] is not None}
+            
+    except Exception as e:
+        registro.error('cola', 'obtener_versiones_colas', empresa_id=empresa_id, error=repr(e))
+        return None
+
+def obtener_llamadas_recientes(empresa_id, limite):
+    """Obtiene las últimas llamadas de cada cola de una empresa, de la más antigua a la más reciente"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT id, categoria_id, turno_id, nombre, numero, codigo, llamado_en
+                FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY categoria_id ORDER BY id DESC) as orden
+                    FROM llamadas
+                    WHERE empresa_id = ?
+                )
+                WHERE orden <= ?
+                ORDER BY id ASC
+            ''', (empresa_id, limite))
+            
+            return [dict(row) for row in cursor.fetchall()]
+            
+    except Exception as e:
+        registro.error('cola', 'obtener_llamadas_recientes', empresa_id=empresa_id, error=repr(e))
+        return None
+
 def limpiar_turnos_antiguos():
     """Limpia turnos llamados de hace más de 1 día (tarea de mantenimiento)"""
     try:
@@ -368,6 +561,11 @@ def limpiar_turnos_antiguos():
             
             turnos_eliminados = cursor.rowcount
             
+            cursor.execute('''
+                DELETE FROM llamadas 
+                WHERE llamado_en < ?
+            ''', (time.time() - 86400,))
+            
             # También limpiar turnos_actuales antiguos
             cursor.execute('''
                 DELETE FROM turnos_actuales 
@@ -378,5 +576,5 @@ def limpiar_turnos_antiguos():
             return turnos_eliminados
             
     except Exception as e:
-        print(f"Error al limpiar turnos antiguos: {e}")
+        registro.error('cola', 'limpiar_turnos_antiguos', error=repr(e))
         return 0
\ No newline at end of file
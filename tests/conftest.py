@@ -0,0 +1,45 @@
+"""
+Fixtures compartidas de las pruebas
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import Flask
+from core import database, longpoll, difusion, websocket
+
+@pytest.fixture
+def bd(tmp_path, monkeypatch):
+    """BD temporal con una empresa 'emp1' y dos colas, 'cola1' y 'cola2'"""
+    monkeypatch.setattr(database, 'DATABASE_NAME', str(tmp_path / 'ttoca.db'))
+    # Las versiones del long-polling vienen de la BD: las de otra BD no valen
+    for estado in (longpoll._versiones_cola, longpoll._versiones_empresa, longpoll._cargadas):
+        estado.clear()
+    database.init_database()
+    with database.get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO empresas (id, user_email, nombre) VALUES ('emp1', 'a@b.c', 'Empresa')")
+        cursor.executemany(
+            "INSERT INTO cola_categorias (id, empresa_id, nombre) VALUES (?, 'emp1', ?)",
+            [('cola1', 'Caja'), ('cola2', 'Consultas')]
+        )
+    return database.DATABASE_NAME
+
+@pytest.fixture
+def ws(bd, monkeypatch):
+    """Cliente de prueba de Flask-SocketIO con los handlers de core.websocket"""
+    # init_socketio reemplaza el servidor y el transporte globales: se restauran al terminar
+    monkeypatch.setattr(websocket, 'socketio', websocket.socketio)
+    monkeypatch.setattr(difusion, '_transporte', difusion._transporte)
+    # Los cambios que se agrupen durante la prueba no llegan a otras pruebas
+    monkeypatch.setattr(difusion, '_pendientes', {})
+    app = Flask(__name__)
+    socketio = websocket.init_socketio(app)
+    cliente = socketio.test_client(app)
+    yield cliente
+    if cliente.is_connected():
+        cliente.disconnect()
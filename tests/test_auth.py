@@ -0,0 +1,96 @@
+"""
+Pruebas del registro y del rechazo de logins con el pool de bcrypt saturado
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+import threading
+import pytest
+from flask import Flask
+from api.auth import auth_bp
+from core import contrasenas, limites
+from core.database import get_db_connection
+from services import auth_service
+from services.auth_service import add_user
+from config import get_config
+
+@pytest.fixture
+def cliente(bd, monkeypatch):
+    config = get_config()
+    monkeypatch.setattr(config, 'BCRYPT_COSTE', 4)
+    monkeypatch.setattr(contrasenas, '_semaforo', None)
+    limites._cubos.clear()
+    add_user('usuario', 'a@b.c', 'clave')
+
+    # Sin sitio en la cola de espera: el siguiente cálculo se rechaza
+    monkeypatch.setattr(config, 'BCRYPT_COLA_MAX', 0)
+    app = Flask(__name__)
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    yield app.test_client()
+    limites._cubos.clear()
+
+def test_login_saturado_responde_503(cliente):
+    respuesta = cliente.post('/api/auth/login', json={'correo': 'a@b.c', 'contrasena': 'clave'})
+    assert respuesta.status_code == 503
+    assert respuesta.headers['Retry-After'] == '1'
+
+def test_registro_saturado_responde_503(cliente):
+    respuesta = cliente.post('/api/auth/register', json={
+        'usuario': 'otro', 'correo': 'otro@b.c', 'contrasena': 'clave'
+    })
+    assert respuesta.status_code == 503
+    assert respuesta.headers['Retry-After'] == '1'
+
+def test_con_capacidad_el_login_funciona(cliente, monkeypatch):
+    monkeypatch.setattr(get_config(), 'BCRYPT_COLA_MAX', 20)
+    respuesta = cliente.post('/api/auth/login', json={'correo': 'a@b.c', 'contrasena': 'clave'})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['token']
+
+def _insertar_usuario(email):
+    """Registro concurrente: otra petición confirma su escritura desde otro hilo"""
+    def insertar():
+        with get_db_connection() as conn:
+            conn.execute("INSERT INTO users (email, password) VALUES (?, 'x')", (email,))
+    hilo = threading.Thread(target=insertar)
+    hilo.start()
+    hilo.join()
+
+def _existe(email):
+    with get_db_connection() as conn:
+        return conn.execute('SELECT 1 FROM users WHERE email = ?', (email,)).fetchone() is not None
+
+def test_una_escritura_durante_el_hash_no_impide_el_registro(bd, monkeypatch):
+    def hash_lento(password):
+        _insertar_usuario('otro@b.c')
+        return 'hash'
+
+    monkeypatch.setattr(auth_service, 'hashear', hash_lento)
+    assert add_user('nuevo', 'nuevo@b.c', 'clave') is True
+    assert _existe('nuevo@b.c') and _existe('otro@b.c')
+
+def test_el_mismo_email_registrado_durante_el_hash_ya_existe(bd, monkeypatch):
+    def hash_lento(password):
+        _insertar_usuario('nuevo@b.c')
+        return 'hash'
+
+    monkeypatch.setattr(auth_service, 'hashear', hash_lento)
+    assert add_user('nuevo', 'nuevo@b.c', 'clave') is False
+
+def test_un_error_de_la_bd_no_es_un_usuario_repetido(cliente, monkeypatch):
+    monkeypatch.setattr(get_config(), 'BCRYPT_COLA_MAX', 20)
+
+    def hash_bloqueado(password):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(auth_service, 'hashear', hash_bloqueado)
+    respuesta = cliente.post('/api/auth/register', json={
+        'usuario': 'otro', 'correo': 'otro@b.c', 'contrasena': 'clave'
+    })
+    assert respuesta.status_code == 503
+    assert respuesta.get_json()['message'] != 'El usuario ya existe'
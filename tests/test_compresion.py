@@ -0,0 +1,105 @@
+"""
+Pruebas de la compresión de respuestas y del frontend precomprimido
+(core/compresion.py, api/frontend.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gzip
+import pytest
+from flask import Flask, jsonify
+from api import frontend
+from core.compresion import comprimir_json
+from config import get_config
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(get_config(), 'COMPRESION_MIN_BYTES', 1024)
+    app = Flask(__name__)
+    app.after_request(comprimir_json)
+
+    @app.route('/turnos/<int:n>')
+    def turnos(n):
+        return jsonify({'turnos': [{'numero': i, 'nombre': 'Cliente'} for i in range(n)]})
+
+    return app.test_client()
+
+def test_json_grande_se_comprime_con_gzip(api):
+    respuesta = api.get('/turnos/200', headers={'Accept-Encoding': 'br, gzip'})
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in respuesta.headers['Vary']
+    datos = gzip.decompress(respuesta.get_data())
+    assert len(datos) > len(respuesta.get_data())
+    assert datos.startswith(b'{"turnos":[')
+
+def test_sin_gzip_en_accept_encoding_va_sin_comprimir(api):
+    for cabeceras in ({}, {'Accept-Encoding': 'identity'}, {'Accept-Encoding': 'br'}, {'Accept-Encoding': 'gzip;q=0'}):
+        respuesta = api.get('/turnos/200', headers=cabeceras)
+        assert 'Content-Encoding' not in respuesta.headers, cabeceras
+        assert 'Accept-Encoding' in respuesta.headers['Vary']
+        assert respuesta.get_json()['turnos'][199]['numero'] == 199
+
+def test_json_por_debajo_del_umbral_va_sin_comprimir(api):
+    respuesta = api.get('/turnos/2', headers={'Accept-Encoding': 'gzip'})
+    assert len(respuesta.get_data()) < 1024
+    assert 'Content-Encoding' not in respuesta.headers
+    # Aun sin comprimir, la respuesta depende de Accept-Encoding
+    assert 'Accept-Encoding' in respuesta.headers['Vary']
+
+@pytest.fixture
+def dist(tmp_path, monkeypatch):
+    """dist/ con index.html, un asset con hash (y sus variantes .br/.gz) y un archivo de la raíz"""
+    (tmp_path / 'assets').mkdir()
+    (tmp_path / 'index.html').write_text('<html></html>')
+    (tmp_path / 'favicon.svg').write_text('<svg/>')
+    js = tmp_path / 'assets' / 'index-BGMYLn1n.js'
+    js.write_text('console.log(1)')
+    (tmp_path / 'assets' / 'index-BGMYLn1n.js.br').write_bytes(b'br')
+    (tmp_path / 'assets' / 'index-BGMYLn1n.js.gz').write_bytes(gzip.compress(b'console.log(1)'))
+    monkeypatch.setattr(get_config(), 'FRONTEND_DIR', str(tmp_path))
+    frontend._variantes.clear()
+
+    app = Flask(__name__)
+    app.register_blueprint(frontend.frontend_bp)
+    yield app.test_client()
+    frontend._variantes.clear()
+
+def test_asset_con_hash_elige_la_mejor_variante(dist):
+    ruta = '/assets/index-BGMYLn1n.js'
+    br = dist.get(ruta, headers={'Accept-Encoding': 'gzip, br'})
+    assert br.headers['Content-Encoding'] == 'br'
+    assert br.get_data() == b'br'
+    assert br.mimetype == 'text/javascript'
+
+    gz = dist.get(ruta, headers={'Accept-Encoding': 'gzip'})
+    assert gz.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(gz.get_data()) == b'console.log(1)'
+
+    plano = dist.get(ruta, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plano.headers
+    assert plano.get_data() == b'console.log(1)'
+
+    for respuesta in (br, gz, plano):
+        assert 'Accept-Encoding' in respuesta.headers['Vary']
+        assert respuesta.cache_control.max_age == get_config().FRONTEND_CACHE_SEGUNDOS
+        assert respuesta.cache_control.immutable
+        respuesta.close()
+
+def test_index_y_rutas_de_la_spa_se_revalidan(dist):
+    for ruta in ('/index.html', '/colas/emp1', '/favicon.svg'):
+        respuesta = dist.get(ruta, headers={'Accept-Encoding': 'gzip, br'})
+        assert respuesta.status_code == 200
+        assert respuesta.cache_control.no_cache
+        assert not respuesta.cache_control.immutable
+        # Sin variantes precomprimidas la respuesta no depende de Accept-Encoding
+        assert 'Content-Encoding' not in respuesta.headers
+        assert 'Vary' not in respuesta.headers
+        respuesta.close()
+
+    assert dist.get('/colas/emp1').get_data() == b'<html></html>'
+    assert dist.get('/api/nada').status_code == 404
+    assert dist.get('/assets/../../secreto').status_code == 404
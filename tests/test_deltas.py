@@ -0,0 +1,46 @@
+"""
+Pruebas de la reanudación por deltas del protocolo incremental (core/deltas.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from core import deltas
+from config import get_config
+
+@pytest.fixture
+def cola(monkeypatch):
+    """Cola con 5 deltas registrados y un buffer de 3"""
+    monkeypatch.setattr(get_config(), 'WS_DELTA_BUFFER', 3)
+    for i in range(5):
+        deltas.registrar_delta('emp1', 'cola1', agregados=[{'id': f't{i}'}])
+    yield 'emp1', 'cola1'
+    deltas.descartar_cola('emp1', 'cola1')
+
+def test_misma_epoca_sin_hueco(cola):
+    pendientes = deltas.deltas_desde(*cola, deltas.EPOCA, 3)
+    assert [delta['seq'] for delta in pendientes] == [4, 5]
+    assert deltas.deltas_desde(*cola, deltas.EPOCA, 5) == []
+
+def test_seq_anterior_al_buffer_pide_snapshot(cola):
+    # El buffer conserva los deltas 3 a 5: falta el 2
+    assert [delta['seq'] for delta in deltas.deltas_desde(*cola, deltas.EPOCA, 2)] == [3, 4, 5]
+    assert deltas.deltas_desde(*cola, deltas.EPOCA, 1) is None
+
+def test_seq_posterior_a_la_ultima_pide_snapshot(cola):
+    assert deltas.deltas_desde(*cola, deltas.EPOCA, 6) is None
+
+def test_otra_epoca_pide_snapshot(cola):
+    assert deltas.deltas_desde(*cola, 'otra', 5) is None
+    assert deltas.deltas_desde(*cola, None, 5) is None
+
+@pytest.mark.parametrize('seq', [None, 'abc', '', [], {}, -1, True, '4.5'])
+def test_seq_malformada_pide_snapshot(cola, seq):
+    assert deltas.deltas_desde(*cola, deltas.EPOCA, seq) is None
+
+def test_seq_como_texto_se_interpreta(cola):
+    assert [delta['seq'] for delta in deltas.deltas_desde(*cola, deltas.EPOCA, '4')] == [5]
@@ -0,0 +1,132 @@
+"""
+Pruebas del agrupado y la emisión de cambios comunes a los dos modos (core/difusion.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from core import backpressure, difusion, serializacion
+from services.cola_service import agregar_turno, siguiente_turno
+
+class TransportePrueba(difusion.Transporte):
+    """Registra las emisiones; las tareas programadas se ejecutan a mano"""
+
+    def __init__(self):
+        self.emitidos = []
+        self.programadas = []
+        self.tareas = []
+        self.miembros = {}
+        self.colas = {}
+
+    def emitir(self, evento, datos, to, omitir=None):
+        if isinstance(datos, serializacion.Precodificado):
+            datos = datos.datos
+        self.emitidos.append((evento, datos, to, omitir))
+
+    def cerrar_sala(self, sala):
+        self.miembros.pop(sala, None)
+
+    def participantes(self, salas):
+        salas = [salas] if isinstance(salas, str) else salas
+        return [par for sala in salas for par in self.miembros.get(sala, ())]
+
+    def cola_salida(self, eio_sid):
+        return self.colas.get(eio_sid, 0)
+
+    def desconectar(self, sid):
+        pass
+
+    def programar(self, segundos, funcion, *args):
+        self.programadas.append((funcion, args))
+
+    def iniciar_tarea(self, funcion, *args):
+        self.tareas.append((funcion, args))
+
+    def dormir(self, segundos):
+        pass
+
+    def vaciar(self):
+        programadas, self.programadas = self.programadas, []
+        for funcion, args in programadas:
+            funcion(*args)
+
+    def eventos(self, nombre):
+        return [datos for evento, datos, _to, _omitir in self.emitidos if evento == nombre]
+
+@pytest.fixture
+def transporte(bd):
+    transporte = TransportePrueba()
+    difusion.configurar(transporte)
+    yield transporte
+    difusion.configurar(None)
+    difusion._pendientes.clear()
+    difusion._resumenes.clear()
+    backpressure._retenidos.clear()
+
+def test_los_cambios_de_una_ventana_van_en_un_solo_delta(transporte):
+    for nombre in ('Ana', 'Luis', 'Eva'):
+        agregar_turno('emp1', 'cola1', {'nombre': nombre})
+    assert len(transporte.programadas) == 1
+
+    transporte.vaciar()
+    deltas = transporte.eventos('queue_delta')
+    assert len(deltas) == 1
+    assert [turno['nombre'] for turno in deltas[0]['agregados']] == ['Ana', 'Luis', 'Eva']
+    assert transporte.eventos('resumen_cola') == [
+        {'enEspera': 3, 'etaMinutos': 15, 'empresaId': 'emp1', 'colaId': 'cola1'}
+    ]
+
+def test_resumen_tras_solo_altas_conserva_el_turno_actual(transporte):
+    difusion.construir_resumen_empresa('emp1')
+    agregar_turno('emp1', 'cola1', {'nombre': 'Ana'})
+    agregar_turno('emp1', 'cola1', {'nombre': 'Luis'})
+    llamado = siguiente_turno('emp1', 'cola1')
+    transporte.vaciar()
+
+    agregar_turno('emp1', 'cola1', {'nombre': 'Eva'})
+    transporte.vaciar()
+
+    resumen = transporte.eventos('resumen_cola')[-1]
+    assert resumen['enEspera'] == 2
+    assert resumen['turnoActual'] == difusion.turno_compacto(llamado)
+    assert difusion._resumenes['emp1']['cola1']['turnoActual'] == resumen['turnoActual']
+
+def test_cliente_lento_recibe_un_snapshot_en_lugar_de_los_deltas(transporte):
+    transporte.miembros['queue_emp1_cola1'] = [('lento', 'eio-lento'), ('rapido', 'eio-rapido')]
+    transporte.colas['eio-lento'] = 1000
+
+    agregar_turno('emp1', 'cola1', {'nombre': 'Ana'})
+    transporte.vaciar()
+    agregar_turno('emp1', 'cola1', {'nombre': 'Luis'})
+    transporte.vaciar()
+
+    assert [omitir for evento, _d, _to, omitir in transporte.emitidos if evento == 'queue_delta'] == [['lento'], ['lento']]
+    retenidos = backpressure._retenidos['lento']
+    assert retenidos['criticos'] == []
+    assert list(retenidos['reemplazables']) == [('cola', 'emp1', 'cola1')]
+    assert len(transporte.tareas) == 1
+
+    # Al vaciarse su cola de salida recibe un único snapshot con el estado final
+    transporte.colas['eio-lento'] = 0
+    funcion, args = transporte.tareas[0]
+    funcion(*args)
+    evento, snapshot, to, _omitir = transporte.emitidos[-1]
+    assert (evento, to) == ('queue_snapshot', 'lento')
+    assert [turno['nombre'] for turno in snapshot['turnos']] == ['Ana', 'Luis']
+    assert 'lento' not in backpressure._retenidos
+
+def test_cola_eliminada_descarta_lo_pendiente(transporte):
+    from services.cola_service import eliminar_cola
+
+    agregar_turno('emp1', 'cola1', {'nombre': 'Ana'})
+    eliminar_cola('emp1', 'cola1')
+    transporte.vaciar()
+
+    assert transporte.eventos('queue_delta') == []
+    assert transporte.eventos('cola_eliminada') == [
+        {'empresaId': 'emp1', 'colaId': 'cola1'}
+    ]
@@ -0,0 +1,85 @@
+"""
+Pruebas del outbox de eventos de dominio (core/events.py y core/database.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from core import events
+from core.database import get_db_connection
+
+class ErrorPrueba(Exception):
+    pass
+
+@pytest.fixture
+def recibidos(bd, monkeypatch):
+    """Valores n de los eventos 'prueba' entregados, en orden"""
+    monkeypatch.setattr(events, '_suscriptores', {})
+    monkeypatch.setattr(events, '_transmisores', [])
+    entregados = []
+    events.suscribir('prueba', lambda n: entregados.append(n))
+    return entregados
+
+def _contar_empresas(nombre):
+    with get_db_connection() as conn:
+        return conn.execute('SELECT COUNT(*) AS n FROM empresas WHERE nombre = ?', (nombre,)).fetchone()['n']
+
+def test_fuera_de_una_transaccion_se_entrega_ya(recibidos):
+    events.publicar('prueba', n=1)
+    assert recibidos == [1]
+
+def test_se_entrega_solo_despues_del_commit(recibidos):
+    with get_db_connection() as conn:
+        conn.execute("INSERT INTO empresas (id, user_email, nombre) VALUES ('emp2', 'a@b.c', 'Nueva')")
+        events.publicar('prueba', n=1)
+        events.publicar('prueba', n=2)
+        assert recibidos == []
+    assert recibidos == [1, 2]
+    assert _contar_empresas('Nueva') == 1
+
+def test_rollback_descarta_los_eventos(recibidos):
+    with pytest.raises(ErrorPrueba):
+        with get_db_connection() as conn:
+            conn.execute("INSERT INTO empresas (id, user_email, nombre) VALUES ('emp2', 'a@b.c', 'Nueva')")
+            events.publicar('prueba', n=1)
+            raise ErrorPrueba()
+    assert recibidos == []
+    assert _contar_empresas('Nueva') == 0
+
+    # El outbox descartado no se arrastra a la siguiente transacción
+    with get_db_connection():
+        events.publicar('prueba', n=2)
+    assert recibidos == [2]
+
+def test_conexion_anidada_tiene_su_propio_outbox(recibidos):
+    with get_db_connection():
+        events.publicar('prueba', n=1)
+        with get_db_connection():
+            events.publicar('prueba', n=2)
+        # La conexión interna es otra transacción: sus eventos salen con su commit
+        assert recibidos == [2]
+        events.publicar('prueba', n=3)
+        assert recibidos == [2]
+    assert recibidos == [2, 1, 3]
+
+def test_rollback_externo_no_retira_lo_confirmado_dentro(recibidos):
+    with pytest.raises(ErrorPrueba):
+        with get_db_connection():
+            events.publicar('prueba', n=1)
+            with get_db_connection():
+                events.publicar('prueba', n=2)
+            raise ErrorPrueba()
+    assert recibidos == [2]
+
+def test_un_suscriptor_fallido_no_impide_los_demas(recibidos):
+    def fallar(n):
+        raise ValueError(n)
+
+    events._suscriptores['prueba'].insert(0, fallar)
+    with get_db_connection():
+        events.publicar('prueba', n=1)
+    assert recibidos == [1]
@@ -0,0 +1,45 @@
+"""
+Pruebas del acceso a los endpoints internos (api/internal.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import Flask
+from api.internal import internal_bp
+from config import get_config
+
+@pytest.fixture
+def cliente(monkeypatch):
+    config = get_config()
+    monkeypatch.setattr(config, 'INTERNAL_TOKEN', 'token-interno')
+    monkeypatch.setattr(config, 'INTERNAL_CONFIAR_LOCALHOST', False)
+    app = Flask(__name__)
+    app.register_blueprint(internal_bp, url_prefix='/api/internal')
+    return app.test_client()
+
+def test_localhost_sin_token_se_rechaza(cliente):
+    # Detrás de nginx todas las peticiones llegan desde 127.0.0.1
+    respuesta = cliente.get('/api/internal/perfil', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+    assert respuesta.status_code == 403
+
+def test_token_incorrecto_se_rechaza(cliente):
+    respuesta = cliente.get('/api/internal/perfil', headers={'X-Internal-Token': 'otro'})
+    assert respuesta.status_code == 403
+
+def test_token_interno_en_cabecera_o_bearer(cliente):
+    assert cliente.get('/api/internal/perfil', headers={'X-Internal-Token': 'token-interno'}).status_code == 200
+    assert cliente.get('/api/internal/perfil', headers={'Authorization': 'Bearer token-interno'}).status_code == 200
+
+def test_sin_token_configurado_no_entra_nadie(cliente, monkeypatch):
+    monkeypatch.setattr(get_config(), 'INTERNAL_TOKEN', None)
+    assert cliente.get('/api/internal/perfil', headers={'X-Internal-Token': ''}).status_code == 403
+
+def test_localhost_solo_con_confianza_explicita(cliente, monkeypatch):
+    monkeypatch.setattr(get_config(), 'INTERNAL_CONFIAR_LOCALHOST', True)
+    assert cliente.get('/api/internal/perfil', environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code == 200
+    assert cliente.get('/api/internal/perfil', environ_base={'REMOTE_ADDR': '10.0.0.5'}).status_code == 403
@@ -0,0 +1,68 @@
+"""
+Pruebas de los límites de mutación (core/limites.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import Flask
+from core import limites
+from config import get_config
+
+@pytest.fixture
+def config(monkeypatch):
+    config = get_config()
+    # Ritmos casi nulos: los cubos no se rellenan durante la prueba
+    for alcance, rafaga in (('IP', 10), ('EMPRESA', 10), ('COLA', 2)):
+        monkeypatch.setattr(config, f'MUTACIONES_POR_SEGUNDO_{alcance}', 0.01)
+        monkeypatch.setattr(config, f'MUTACIONES_RAFAGA_{alcance}', rafaga)
+    limites._cubos.clear()
+    limites._rechazos.clear()
+    yield config
+    limites._cubos.clear()
+    limites._rechazos.clear()
+
+def _tokens(tipo, clave):
+    return limites._cubos[f"{tipo}:{clave}"][0]
+
+def test_un_rechazo_no_gasta_el_cupo_de_los_demas(config):
+    for _ in range(2):
+        assert limites.admitir_mutacion('emp1', 'cola1', '1.2.3.4') == 0
+
+    # La cola está agotada: la IP y la empresa conservan su cupo
+    for _ in range(5):
+        assert limites.admitir_mutacion('emp1', 'cola1', '1.2.3.4') > 0
+    assert _tokens('mutacion-ip', '1.2.3.4') == pytest.approx(8, abs=0.01)
+    assert _tokens('mutacion-empresa', 'emp1') == pytest.approx(8, abs=0.01)
+    assert limites.estadisticas()['rechazos'] == {'mutacion-cola': 5}
+
+    # Otra cola de la misma empresa sigue admitiendo
+    assert limites.admitir_mutacion('emp1', 'cola2', '1.2.3.4') == 0
+
+def test_la_espera_es_la_del_limite_mas_lejano(config, monkeypatch):
+    monkeypatch.setattr(config, 'MUTACIONES_RAFAGA_IP', 1)
+    monkeypatch.setattr(config, 'MUTACIONES_POR_SEGUNDO_COLA', 0.5)
+    assert limites.admitir_mutacion('emp1', 'cola1', '1.2.3.4') == 0
+    assert limites.admitir_mutacion('emp1', 'cola1', '5.6.7.8') == 0
+    # Sin cupo en la IP (1 / 0.01 s) ni en la cola (1 / 0.5 s): manda la IP
+    assert limites.admitir_mutacion('emp1', 'cola1', '1.2.3.4') == pytest.approx(100, abs=0.1)
+    # Desde una IP nueva solo falta el cupo de la cola
+    assert limites.admitir_mutacion('emp1', 'cola1', '9.9.9.9') == pytest.approx(2, abs=0.1)
+
+def test_ruta_limitada_responde_429_con_retry_after(config):
+    app = Flask(__name__)
+
+    @app.route('/empresas/<id_empresa>/colas/<id_cola>', methods=['POST'])
+    @limites.limitar_mutacion()
+    def mutar(id_empresa, id_cola):
+        return 'ok'
+
+    cliente = app.test_client()
+    respuestas = [cliente.post('/empresas/emp1/colas/cola1') for _ in range(3)]
+    assert [respuesta.status_code for respuesta in respuestas] == [200, 200, 429]
+    assert int(respuestas[-1].headers['Retry-After']) == 100
+    assert respuestas[-1].get_json()['retryAfter'] == pytest.approx(100, abs=0.1)
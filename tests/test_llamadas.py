@@ -0,0 +1,83 @@
+"""
+Pruebas del feed de llamadas recientes (core/llamadas.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+import pytest
+from core import database, llamadas
+from services.cola_service import agregar_turno, siguiente_turno, obtener_llamadas_recientes
+from config import get_config
+
+def _reiniciar_worker():
+    llamadas._recientes.clear()
+    llamadas._cargadas.clear()
+
+@pytest.fixture
+def historial(bd, monkeypatch):
+    """Cinco llamadas alternando colas: cola1, cola2, cola1, cola1, cola2 (máximo 2 por cola)"""
+    monkeypatch.setattr(get_config(), 'LLAMADAS_RECIENTES', 2)
+    _reiniciar_worker()
+    orden = ['cola1', 'cola2', 'cola1', 'cola1', 'cola2']
+    for i, cola_id in enumerate(orden):
+        agregar_turno('emp1', cola_id, {'nombre': f'T{i}'})
+    for cola_id in orden:
+        siguiente_turno('emp1', cola_id)
+    yield
+    _reiniciar_worker()
+
+def _feed(limite=None):
+    return [(entrada['colaId'], entrada['nombre']) for entrada in llamadas.recientes_empresa('emp1', limite)]
+
+def test_la_consulta_devuelve_las_ultimas_de_cada_cola(historial):
+    filas = obtener_llamadas_recientes('emp1', 2)
+    assert [(fila['categoria_id'], fila['nombre']) for fila in filas] == [
+        ('cola2', 'T1'), ('cola1', 'T2'), ('cola1', 'T3'), ('cola2', 'T4')
+    ]
+    assert [fila['id'] for fila in filas] == sorted(fila['id'] for fila in filas)
+
+def test_la_consulta_usa_el_indice_de_empresa(historial, monkeypatch):
+    sentencias = []
+    conectar = sqlite3.connect
+
+    def conectar_trazado(*args, **kwargs):
+        conn = conectar(*args, **kwargs)
+        conn.set_trace_callback(sentencias.append)
+        return conn
+
+    monkeypatch.setattr(database.sqlite3, 'connect', conectar_trazado)
+    obtener_llamadas_recientes('emp1', 2)
+    monkeypatch.setattr(database.sqlite3, 'connect', conectar)
+    (sql,) = [sentencia for sentencia in sentencias if 'ROW_NUMBER' in sentencia]
+
+    with database.get_db_connection() as conn:
+        plan = ' '.join(fila[-1] for fila in conn.execute(f'EXPLAIN QUERY PLAN {sql}').fetchall())
+    assert 'idx_llamadas_empresa' in plan
+
+def test_feed_tras_un_reinicio_mezcla_las_colas(historial, monkeypatch):
+    # Worker recién arrancado: el historial se lee de la BD
+    _reiniciar_worker()
+    assert _feed() == [('cola2', 'T4'), ('cola1', 'T3')]
+    assert _feed(limite=10) == [('cola2', 'T4'), ('cola1', 'T3')]
+
+    monkeypatch.setattr(get_config(), 'LLAMADAS_RECIENTES', 10)
+    _reiniciar_worker()
+    assert _feed(limite=4) == [('cola2', 'T4'), ('cola1', 'T3'), ('cola1', 'T2'), ('cola2', 'T1')]
+
+def test_llamadas_nuevas_se_agregan_sin_duplicar_el_historial(historial):
+    assert _feed() == [('cola2', 'T4'), ('cola1', 'T3')]
+
+    # Las llamadas posteriores a la carga llegan por evento
+    agregar_turno('emp1', 'cola1', {'nombre': 'T5'})
+    siguiente_turno('emp1', 'cola1')
+    assert _feed() == [('cola1', 'T5'), ('cola2', 'T4')]
+
+    # Una recarga (p. ej. tras un fallo de la BD) se combina con lo que ya estaba en memoria
+    llamadas._cargadas.clear()
+    assert _feed() == [('cola1', 'T5'), ('cola2', 'T4')]
+    assert [len(buffer) for buffer in llamadas._recientes['emp1'].values()] == [2, 2]
@@ -0,0 +1,172 @@
+"""
+Pruebas de las versiones del long-polling entre varios workers (core/longpoll.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+import eventlet
+import pytest
+from flask import Flask
+from api.cola import cola_bp
+from core import events, longpoll
+from config import get_config
+from services.cola_service import agregar_turno, siguiente_turno
+
+def _reiniciar_worker():
+    """Deja el estado de longpoll como el de un worker recién arrancado"""
+    longpoll._versiones_cola.clear()
+    longpoll._versiones_empresa.clear()
+    longpoll._cargadas.clear()
+
+def _versiones():
+    return (
+        longpoll.version_cola('emp1', 'cola1'),
+        longpoll.version_cola('emp1', 'cola2'),
+        longpoll.version_empresa('emp1')
+    )
+
+@pytest.fixture
+def bus(bd, monkeypatch):
+    """Eventos que este worker reenvía al resto por el bus"""
+    enviados = []
+    monkeypatch.setattr(events, '_transmisores', [enviados.extend])
+    _reiniciar_worker()
+    yield enviados
+    _reiniciar_worker()
+
+def _cambios():
+    agregar_turno('emp1', 'cola1', {'nombre': 'Ana'})
+    agregar_turno('emp1', 'cola2', {'nombre': 'Luis'})
+    siguiente_turno('emp1', 'cola1')
+
+def test_dos_workers_dan_la_misma_version(bus):
+    # Worker A: hace los cambios
+    _cambios()
+    worker_a = _versiones()
+    assert worker_a[0] > worker_a[1] > 0
+    assert worker_a[2] == worker_a[0]
+
+    # Worker B: ya conocía la empresa y recibe los mismos eventos por el bus
+    _reiniciar_worker()
+    longpoll._cargadas.add('emp1')
+    for nombre, datos in bus:
+        events.despachar_local(nombre, datos)
+    assert _versiones() == worker_a
+
+    # Un evento repetido no hace retroceder ni avanzar la versión
+    events.despachar_local(*bus[0])
+    assert _versiones() == worker_a
+
+def test_worker_sin_eventos_lee_la_version_de_la_bd(bus):
+    _cambios()
+    worker_a = _versiones()
+
+    # Worker C: arrancó después de los cambios y no recibió ningún evento
+    _reiniciar_worker()
+    assert _versiones() == worker_a
+    assert sorted(longpoll.colas_cambiadas('emp1', worker_a[1] - 1)) == ['cola1', 'cola2']
+    assert longpoll.colas_cambiadas('emp1', worker_a[1]) == ['cola1']
+
+def test_cliente_alternando_workers_no_ve_cambios_inexistentes(bus):
+    _cambios()
+    version = longpoll.version_cola('emp1', 'cola1')
+
+    # El cliente llevaba la versión de A y ahora consulta a B, que la conoce igual
+    _reiniciar_worker()
+    assert longpoll.esperar_cambio_cola('emp1', 'cola1', version, 0) == version
+    assert longpoll.esperar_cambio_empresa('emp1', version, 0) == version
+
+    # B aún no ha recibido el último cambio de A: espera en lugar de responder con otra versión
+    inicio = time.monotonic()
+    longpoll.esperar_cambio_cola('emp1', 'cola1', version + 1, 0.2)
+    assert time.monotonic() - inicio >= 0.2
+
+def _esperar_en_hilo(version, timeout):
+    resultado = {}
+
+    def esperar():
+        inicio = time.monotonic()
+        resultado['version'] = longpoll.esperar_cambio_cola('emp1', 'cola1', version, timeout)
+        resultado['segundos'] = time.monotonic() - inicio
+
+    hilo = threading.Thread(target=esperar)
+    hilo.start()
+    return hilo, resultado
+
+def test_sin_eventlet_la_espera_bloquea_el_hilo_hasta_el_cambio(bus):
+    # Modo ASGI: sin monkey-patching la petición espera en su hilo del executor
+    version = longpoll.version_cola('emp1', 'cola1')
+    hilo, resultado = _esperar_en_hilo(version, 5)
+    time.sleep(0.1)
+    assert hilo.is_alive()
+
+    agregar_turno('emp1', 'cola1', {'nombre': 'Ana'})
+    hilo.join(2)
+    assert not hilo.is_alive()
+    assert resultado['version'] == longpoll.version_cola('emp1', 'cola1') > version
+    assert resultado['segundos'] < 2
+
+def test_sin_eventlet_las_esperas_no_agotan_el_executor(bus, monkeypatch):
+    monkeypatch.setattr(get_config(), 'LONGPOLL_ESPERAS_HILOS', 1)
+    version = longpoll.version_cola('emp1', 'cola1')
+    hilo, _resultado = _esperar_en_hilo(version, 5)
+    time.sleep(0.1)
+
+    # El hilo permitido ya está ocupado: la segunda petición responde sin cambios
+    inicio = time.monotonic()
+    assert longpoll.esperar_cambio_cola('emp1', 'cola1', version, 5) == version
+    assert time.monotonic() - inicio < 1
+
+    agregar_turno('emp1', 'cola1', {'nombre': 'Ana'})
+    hilo.join(2)
+    assert longpoll._esperas_hilos == 0
+
+def test_esperas_vencidas_no_dejan_eventos(bus, monkeypatch):
+    monkeypatch.setattr(longpoll, 'hilos', SimpleNamespace(activo=lambda: True))
+    # Varios clientes sobre la misma cola comparten una entrada hasta que se va el último
+    compartida = eventlet.GreenPool()
+    for _ in range(3):
+        compartida.spawn(longpoll.esperar_cambio_cola, 'emp1', 'cola1', 0, 0.5)
+    inventadas = eventlet.GreenPool()
+    for _ in range(50):
+        inventadas.spawn(longpoll.esperar_cambio_cola, uuid.uuid4().hex, 'cola', 0, 0.01)
+    inventadas.waitall()
+    assert list(longpoll._eventos) == [('cola', 'emp1', 'cola1')]
+    assert longpoll._eventos[('cola', 'emp1', 'cola1')][1] == 3
+    compartida.waitall()
+
+    assert longpoll._eventos == {}
+    # Las empresas inexistentes no se recuerdan como cargadas
+    assert longpoll._cargadas == {'emp1'}
+
+def test_sin_eventlet_esperas_vencidas_no_dejan_eventos(bus):
+    hilos = [
+        threading.Thread(target=longpoll.esperar_cambio_empresa, args=(uuid.uuid4().hex, 0, 0.01))
+        for _ in range(20)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert longpoll._eventos_hilos == {}
+    assert longpoll._cargadas == set()
+
+def test_esperas_sobre_salas_inexistentes_responden_404(bus):
+    app = Flask(__name__)
+    app.register_blueprint(cola_bp, url_prefix='/api')
+    cliente = app.test_client()
+
+    assert cliente.get('/api/proyectos/emp1/cola/nada/cambios?version=0').status_code == 404
+    assert cliente.get('/api/proyectos/otra/cambios?version=0').status_code == 404
+    respuesta = cliente.get('/api/proyectos/emp1/cola/cola1/cambios?version=0&timeout=0')
+    assert respuesta.get_json() == {'version': 0, 'cambios': False}
+    assert longpoll._eventos == {} and longpoll._eventos_hilos == {}
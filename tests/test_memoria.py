@@ -0,0 +1,70 @@
+"""
+Pruebas del diagnóstico de memoria (core/memoria.py y /api/internal/memoria)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tracemalloc
+import pytest
+from flask import Flask
+from api.internal import internal_bp
+from core import limites, memoria
+from config import get_config
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(get_config(), 'INTERNAL_CONFIAR_LOCALHOST', True)
+    limites._cubos.clear()
+    memoria._instantaneas.clear()
+    seguia = tracemalloc.is_tracing()
+    app = Flask(__name__)
+    app.register_blueprint(internal_bp, url_prefix='/api/internal')
+    yield app.test_client()
+    # tracemalloc queda como estaba antes de la prueba
+    if tracemalloc.is_tracing() and not seguia:
+        tracemalloc.stop()
+    memoria._instantaneas.clear()
+    limites._cubos.clear()
+
+def test_instantaneas_y_comparacion(app):
+    seguia = tracemalloc.is_tracing()
+    estado = app.post('/api/internal/memoria/tracemalloc', json={'activo': True, 'marcos': 2}).get_json()
+    assert estado['tracemalloc'] is True
+    if not seguia:
+        assert estado['marcos'] == 2
+
+    assert app.post('/api/internal/memoria/instantaneas', json={'nombre': 'antes'}).status_code == 201
+    reservas = [bytearray(1024) for _ in range(2000)]
+    assert app.post('/api/internal/memoria/instantaneas', json={'nombre': 'despues'}).status_code == 201
+
+    diferencia = app.get('/api/internal/memoria/comparar?desde=antes&hasta=despues').get_json()
+    assert diferencia['diferencia_bytes'] >= 2000 * 1024
+    crecido = next(fila for fila in diferencia['modulos'] if 'test_memoria' in fila['modulo'])
+    assert crecido['diferencia_bytes'] >= 2000 * 1024
+    assert crecido['diferencia_bloques'] >= 2000
+
+    resumen = app.get('/api/internal/memoria/instantaneas/despues?por_linea=1').get_json()
+    assert any('test_memoria' in fila['modulo'] and ':' in fila['modulo'] for fila in resumen['modulos'])
+    assert [i['nombre'] for i in app.get('/api/internal/memoria').get_json()['instantaneas']] == ['antes', 'despues']
+    del reservas
+
+    if not seguia:
+        assert app.post('/api/internal/memoria/tracemalloc', json={'activo': False}).get_json()['tracemalloc'] is False
+        assert not tracemalloc.is_tracing()
+        # Las instantáneas se conservan y se pueden seguir comparando
+        assert app.get('/api/internal/memoria/comparar?desde=antes&hasta=despues').status_code == 200
+    assert tracemalloc.is_tracing() == seguia
+
+def test_errores(app):
+    assert app.get('/api/internal/memoria/instantaneas/no-existe').status_code == 404
+    assert app.get('/api/internal/memoria/comparar?desde=no-existe').status_code == 409
+    if tracemalloc.is_tracing():
+        pytest.skip('el proceso ya se lanzó con tracemalloc activo')
+    respuesta = app.post('/api/internal/memoria/instantaneas', json={'nombre': 'parado'})
+    assert respuesta.status_code == 409
+    assert 'tracemalloc' in respuesta.get_json()['message']
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,27 @@
+"""
+Pruebas de las métricas de las colas (api/metricas.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import metricas
+from services import cola_service
+import api.metricas  # noqa: F401  (registra los medidores)
+
+def test_las_colas_vacias_cuentan_cero(bd):
+    assert cola_service.contar_turnos_en_espera() == {('emp1', 'cola1'): 0, ('emp1', 'cola2'): 0}
+
+    cola_service.agregar_turno('emp1', 'cola1', {'nombre': 'Ana'})
+    cola_service.agregar_turno('emp1', 'cola1', {'nombre': 'Luis'})
+    assert cola_service.contar_turnos_en_espera() == {('emp1', 'cola1'): 2, ('emp1', 'cola2'): 0}
+
+    # Al vaciarse la cola la serie baja a 0 en lugar de desaparecer
+    cola_service.siguiente_turno('emp1', 'cola1')
+    cola_service.siguiente_turno('emp1', 'cola1')
+    texto = metricas.exponer()
+    assert 'ttoca_cola_en_espera{empresa="emp1",cola="cola1"} 0' in texto
+    assert 'ttoca_cola_en_espera{empresa="emp1",cola="cola2"} 0' in texto
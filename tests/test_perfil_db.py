@@ -0,0 +1,72 @@
+"""
+Pruebas de los acumulados del perfilado de SQLite (core/perfil_db.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import pytest
+from core import perfil_db
+
+@pytest.fixture
+def limpio():
+    perfil_db.reiniciar()
+    yield
+    perfil_db.reiniciar()
+
+def test_acumulados_desde_varios_hilos(limpio):
+    # Cambios de hilo muy frecuentes para que las carreras aparezcan
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    hilos, repeticiones = 8, 2000
+    errores = []
+
+    def acumular(i):
+        for j in range(repeticiones):
+            # Sentencias y funciones nuevas mientras otro hilo lee el resumen
+            perfil_db.sentencia(f"funcion{i}", f"SELECT {j % 50}", 0.0001, 1)
+            perfil_db.transaccion(f"funcion{i}", None, 0.0001, 0.0002)
+
+    def leer():
+        try:
+            for _ in range(200):
+                perfil_db.resumen()
+        except RuntimeError as e:
+            errores.append(e)
+
+    trabajadores = [threading.Thread(target=acumular, args=(i,)) for i in range(hilos)]
+    trabajadores.append(threading.Thread(target=leer))
+    for hilo in trabajadores:
+        hilo.start()
+    for hilo in trabajadores:
+        hilo.join()
+    sys.setswitchinterval(intervalo)
+
+    assert errores == []
+    resumen = perfil_db.resumen(limite=100)
+    assert sum(datos['sentencias'] for datos in resumen['funciones'].values()) == hilos * repeticiones
+    assert sum(datos['transacciones'] for datos in resumen['funciones'].values()) == hilos * repeticiones
+    assert sum(sentencia['n'] for sentencia in resumen['sentencias']) == hilos * repeticiones
+    assert all(len(sentencia['funciones']) == hilos for sentencia in resumen['sentencias'])
+
+def test_las_actualizaciones_esperan_al_resumen(limpio):
+    # Mientras se copia el resumen (lock tomado) ningún hilo modifica los acumulados
+    with perfil_db._lock:
+        hilo = threading.Thread(target=perfil_db.sentencia, args=('agregar_turno', 'SELECT 1', 0.001, 3))
+        hilo.start()
+        hilo.join(0.1)
+        assert hilo.is_alive()
+        assert perfil_db._sentencias == {}
+    hilo.join()
+    assert perfil_db.resumen()['sentencias'][0]['n'] == 1
+
+def test_resumen_es_una_copia(limpio):
+    perfil_db.sentencia('agregar_turno', 'SELECT 1', 0.001, 3)
+    resumen = perfil_db.resumen()
+    perfil_db.sentencia('agregar_turno', 'SELECT 1', 0.001, 3)
+    assert resumen['funciones']['agregar_turno']['sentencias'] == 1
+    assert resumen['sentencias'][0]['n'] == 1
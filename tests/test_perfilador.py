@@ -0,0 +1,93 @@
+"""
+Pruebas del perfilado bajo demanda (core/perfilador.py y POST /api/internal/perfil)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pstats
+import time
+import pytest
+from flask import Flask
+from api.internal import internal_bp
+from core import limites, perfilador
+from config import get_config
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    config = get_config()
+    monkeypatch.setattr(config, 'PERFIL_DIR', str(tmp_path / 'perfiles'))
+    monkeypatch.setattr(config, 'INTERNAL_CONFIAR_LOCALHOST', True)
+    limites._cubos.clear()
+    perfilador.armar(0)
+    yield config
+    perfilador.armar(0)
+    perfilador.detener_muestreo()
+    limites._cubos.clear()
+
+@pytest.fixture
+def app(config):
+    app = Flask(__name__)
+    app.register_blueprint(internal_bp, url_prefix='/api/internal')
+    perfilador.instrumentar(app)
+
+    @app.route('/api/proyectos')
+    def proyectos():
+        return {'proyectos': sorted(str(i) for i in range(1000))}
+
+    return app.test_client()
+
+@pytest.mark.parametrize('body', [
+    {'peticiones': 'cinco'}, {'peticiones': -1}, {'peticiones': True}, {'peticiones': 2.5},
+    {'muestreo_segundos': 'x'}, {'muestreo_segundos': 0}, {'peticiones': 1, 'ruta': 3}, [1, 2]
+])
+def test_body_invalido_responde_400(app, body):
+    respuesta = app.post('/api/internal/perfil', json=body)
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['message']
+    # Nada quedó armado a medias
+    assert perfilador.estado()['armado']['peticiones'] == 0
+
+def test_valores_limitados(app, config):
+    respuesta = app.post('/api/internal/perfil', json={'peticiones': 10 ** 6, 'ruta': '/api/proyectos'})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['armado'] == {'peticiones': config.PERFIL_PETICIONES_MAX, 'ruta': '/api/proyectos'}
+
+def test_peticiones_armadas_se_perfilan(app):
+    assert app.post('/api/internal/perfil', json={'peticiones': 1, 'ruta': '/api/proyectos'}).status_code == 200
+
+    perfilada = app.get('/api/proyectos')
+    nombre = perfilada.headers['X-Perfil-Archivo']
+    assert nombre.startswith('peticion-') and nombre.endswith('-proyectos.pstats')
+    assert pstats.Stats(os.path.join(get_config().PERFIL_DIR, nombre)).total_calls > 0
+
+    # Solo la primera: la siguiente ya no se perfila
+    assert 'X-Perfil-Archivo' not in app.get('/api/proyectos').headers
+    assert perfilador.estado()['perfiles'] >= 1
+
+def test_token_de_cabecera(app):
+    token = app.post('/api/internal/perfil/token').get_json()['token']
+    assert 'X-Perfil-Archivo' in app.get('/api/proyectos', headers={'X-Perfil': token}).headers
+
+    expira, firma = token.split('.')
+    falso = f"{int(expira) + 1}.{firma}"
+    assert 'X-Perfil-Archivo' not in app.get('/api/proyectos', headers={'X-Perfil': falso}).headers
+
+def test_muestreador_escribe_pilas_collapsed(config, monkeypatch):
+    monkeypatch.setattr(config, 'PERFIL_MUESTREO_INTERVALO_MS', 5)
+    assert perfilador.iniciar_muestreo(0.3)
+    assert not perfilador.iniciar_muestreo(0.3)  # Ya estaba en marcha
+
+    fin = time.monotonic() + 1
+    while perfilador.estado()['muestreo']['activo'] and time.monotonic() < fin:
+        sum(i * i for i in range(10000))
+
+    archivos = [nombre for nombre in perfilador.archivos() if nombre.endswith('.collapsed')]
+    assert len(archivos) == 1
+    with open(os.path.join(config.PERFIL_DIR, archivos[0]), encoding='utf-8') as archivo:
+        lineas = archivo.read().splitlines()
+    assert any('test_perfilador.py:test_muestreador_escribe_pilas_collapsed' in linea for linea in lineas)
+    assert all(linea.rsplit(' ', 1)[1].isdigit() for linea in lineas)
@@ -0,0 +1,48 @@
+"""
+Pruebas de la IP del cliente detrás de proxies (core/proxy.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import Flask
+from core import proxy
+from config import get_config
+
+def _app():
+    app = Flask(__name__)
+
+    @app.route('/ip')
+    def ip():
+        return proxy.ip_cliente()
+
+    proxy.configurar(app)
+    return app.test_client()
+
+def test_con_un_proxy_se_usa_la_ip_reenviada(monkeypatch):
+    monkeypatch.setattr(get_config(), 'PROXY_SALTOS', 1)
+    respuesta = _app().get('/ip', environ_base={'REMOTE_ADDR': '127.0.0.1'},
+                           headers={'X-Forwarded-For': '1.1.1.1, 203.0.113.7'})
+    # Solo cuenta la IP que anotó nginx: 1.1.1.1 la envió el propio cliente
+    assert respuesta.get_data(as_text=True) == '203.0.113.7'
+
+def test_sin_proxies_se_ignora_la_cabecera(monkeypatch):
+    monkeypatch.setattr(get_config(), 'PROXY_SALTOS', 0)
+    respuesta = _app().get('/ip', environ_base={'REMOTE_ADDR': '198.51.100.2'},
+                           headers={'X-Forwarded-For': '203.0.113.7'})
+    assert respuesta.get_data(as_text=True) == '198.51.100.2'
+
+@pytest.mark.parametrize('saltos, cabecera, esperada', [
+    (1, '203.0.113.7', '203.0.113.7'),
+    (2, '203.0.113.7, 10.0.0.2', '203.0.113.7'),
+    (2, '203.0.113.7', '127.0.0.1'),
+    (0, '203.0.113.7', '127.0.0.1'),
+])
+def test_environ_de_socketio_asgi(monkeypatch, saltos, cabecera, esperada):
+    monkeypatch.setattr(get_config(), 'PROXY_SALTOS', saltos)
+    environ = {'REMOTE_ADDR': '127.0.0.1', 'HTTP_X_FORWARDED_FOR': cabecera}
+    assert proxy.ip_cliente(environ) == esperada
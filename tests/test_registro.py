@@ -0,0 +1,82 @@
+"""
+Pruebas del registro estructurado asíncrono (core/registro.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import threading
+import time
+import pytest
+from core import registro
+from config import get_config
+
+@pytest.fixture
+def salida(capsys, monkeypatch):
+    """Líneas escritas por el hilo del registro (espera a que se vacíe la cola)"""
+    config = get_config()
+    monkeypatch.setattr(config, 'REGISTRO_FORMATO', 'json')
+    monkeypatch.setattr(config, 'REGISTRO_NIVEL', 'INFO')
+    monkeypatch.setattr(config, 'REGISTRO_NIVELES', {'ws': 'WARNING'})
+    monkeypatch.setattr(config, 'REGISTRO_MUESTREO', {'queue_delta': 3})
+    registro._umbrales.clear()
+    registro._vistos.clear()
+    capsys.readouterr()
+
+    def leer(esperados):
+        fin = time.monotonic() + 2
+        lineas = []
+        while len(lineas) < esperados and time.monotonic() < fin:
+            time.sleep(0.01)
+            lineas += capsys.readouterr().out.splitlines()
+        return [json.loads(linea) for linea in lineas]
+
+    yield leer
+    registro._umbrales.clear()
+    registro._vistos.clear()
+
+def test_el_registro_se_escribe_desde_el_hilo_escritor(salida):
+    escritos = registro.estadisticas()['escritos']
+    registro.info('cola', 'turno_agregado', empresa_id='emp1', latencia_ms=1.5)
+
+    (linea,) = salida(1)
+    assert linea['nivel'] == 'INFO'
+    assert linea['subsistema'] == 'cola' and linea['evento'] == 'turno_agregado'
+    assert linea['empresa_id'] == 'emp1' and linea['latencia_ms'] == 1.5
+    assert linea['ts'].endswith('+00:00')
+    assert registro._escritor.name == 'ttoca-registro'
+    assert registro._escritor is not threading.current_thread()
+    assert registro.estadisticas()['escritos'] == escritos + 1
+
+def test_niveles_por_subsistema_y_muestreo(salida):
+    muestreados = registro.estadisticas()['muestreados']
+    registro.info('ws', 'conectado', sid='a')  # ws solo desde WARNING
+    registro.aviso('ws', 'conexion_rechazada', ip='1.2.3.4')
+    for seq in range(6):
+        registro.info('cola', 'queue_delta', seq=seq)
+
+    lineas = salida(3)
+    assert [(linea['evento'], linea.get('seq')) for linea in lineas] == [
+        ('conexion_rechazada', None), ('queue_delta', 0), ('queue_delta', 3)
+    ]
+    assert lineas[1]['muestreo'] == 3
+    assert registro.estadisticas()['muestreados'] == muestreados + 4
+
+def test_un_campo_no_serializable_no_pierde_el_registro(salida):
+    registro.error('auth', 'add_user', error=ValueError('fallo'))
+    (linea,) = salida(1)
+    assert linea['error'] == 'fallo'
+
+def test_formato_texto():
+    linea = registro._formatear(0, registro.NIVELES['WARNING'], 'db', 'consulta_lenta', {'ms': 12}, 'texto')
+    assert linea == '1970-01-01T00:00:00.000+00:00 WARNING [db] consulta_lenta ms=12'
+
+def test_cola_llena_descarta_en_lugar_de_bloquear(monkeypatch):
+    monkeypatch.setattr(get_config(), 'REGISTRO_COLA_MAX', 0)
+    descartados = registro.estadisticas()['descartados']
+    registro.error('cola', 'sin_sitio')
+    assert registro.estadisticas()['descartados'] == descartados + 1
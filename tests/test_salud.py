@@ -0,0 +1,58 @@
+"""
+Pruebas del informe de readiness (core/salud.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+import pytest
+from core import database, salud
+
+@pytest.fixture
+def wal(bd, monkeypatch):
+    """BD con frames en el WAL que aún no se han volcado a la base de datos"""
+    monkeypatch.setattr(salud, 'DATABASE_NAME', bd)
+    conn = sqlite3.connect(bd)
+    conn.execute('PRAGMA wal_autocheckpoint=0')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    for i in range(20):
+        conn.execute("INSERT INTO contadores (nombre, valor) VALUES (?, 0)", (f"prueba{i}",))
+        conn.commit()
+    yield conn
+    conn.close()
+
+def test_el_probe_no_hace_checkpoint(wal, monkeypatch):
+    sentencias = []
+    conectar = sqlite3.connect
+
+    def conectar_trazado(*args, **kwargs):
+        conn = conectar(*args, **kwargs)
+        conn.set_trace_callback(sentencias.append)
+        return conn
+
+    monkeypatch.setattr(database.sqlite3, 'connect', conectar_trazado)
+    informe = salud._medir_base_datos()
+
+    assert sentencias and not any('checkpoint(' in sql for sql in sentencias)
+    # Los frames que informa son los del WAL, sin volcar todavía
+    _bloqueado, frames, _volcados = wal.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+    assert informe['wal_frames'] == frames > 0
+    assert informe['wal_autocheckpoint'] == 1000
+    assert informe['checkpoint_atrasado'] is False
+
+def test_wal_por_encima_del_umbral_es_un_aviso(wal, monkeypatch):
+    conectar = sqlite3.connect
+
+    def conectar_umbral_bajo(*args, **kwargs):
+        conn = conectar(*args, **kwargs)
+        conn.execute('PRAGMA wal_autocheckpoint=5')
+        return conn
+
+    monkeypatch.setattr(database.sqlite3, 'connect', conectar_umbral_bajo)
+    informe = salud._generar()
+    assert informe['base_datos']['checkpoint_atrasado'] is True
+    assert 'WAL grande: hay lectores que impiden el checkpoint' in informe['avisos']
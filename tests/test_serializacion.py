@@ -0,0 +1,74 @@
+"""
+Pruebas del serializador JSON compartido (core/serializacion.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import pytest
+from flask import Flask
+from core import serializacion
+
+DATOS = {
+    'nombre': 'Núñez — café ☕',
+    'llamado': datetime(2024, 3, 1, 9, 30, tzinfo=timezone.utc),
+    'dia': date(2024, 3, 1),
+    'importe': Decimal('12.50'),
+    'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'turnos': [{'numero': 1, 'posicion': 0.5}, None, True],
+    3: 'clave numérica'
+}
+
+requiere_orjson = pytest.mark.skipif(serializacion.orjson is None, reason='orjson no está instalado')
+
+@requiere_orjson
+@pytest.mark.parametrize('ordenar, indentar', [(False, False), (True, False), (True, True)])
+def test_orjson_y_json_dan_la_misma_salida(ordenar, indentar):
+    datos = dict(DATOS)
+    datos.pop(3)  # json no ordena claves de tipos distintos
+    assert serializacion._codificar_orjson(datos, ordenar, indentar) == \
+        serializacion._codificar_json(datos, ordenar, indentar)
+
+@requiere_orjson
+def test_claves_no_texto_igual_que_json():
+    assert serializacion._codificar_orjson(DATOS) == serializacion._codificar_json(DATOS)
+
+def test_conversiones_de_flask_y_utf8():
+    texto = serializacion.dumps(DATOS)
+    assert 'Núñez — café ☕' in texto
+    assert json.loads(texto) == {
+        'nombre': 'Núñez — café ☕',
+        'llamado': 'Fri, 01 Mar 2024 09:30:00 GMT',
+        'dia': 'Fri, 01 Mar 2024 00:00:00 GMT',
+        'importe': '12.50',
+        'id': '12345678-1234-5678-1234-567812345678',
+        'turnos': [{'numero': 1, 'posicion': 0.5}, None, True],
+        '3': 'clave numérica'
+    }
+
+def test_precodificado_se_serializa_una_vez(monkeypatch):
+    llamadas = []
+    codificar = serializacion._codificar
+    monkeypatch.setattr(serializacion, '_codificar', lambda obj, *args: llamadas.append(obj) or codificar(obj, *args))
+
+    datos = serializacion.Precodificado({'seq': 1, 'nombre': 'Ñu'})
+    paquetes = [serializacion.dumps(['queue_delta', datos]) for _ in range(3)]
+    assert paquetes == ['["queue_delta",{"seq":1,"nombre":"Ñu"}]'] * 3
+    # Una vez los datos y una vez cada nombre de evento
+    assert llamadas.count(datos.datos) == 1
+
+def test_proveedor_de_flask():
+    app = Flask(__name__)
+    app.json = serializacion.ProveedorJSON(app)
+    with app.app_context():
+        respuesta = app.json.response({'importe': Decimal('1.5'), 'nombre': 'José'})
+    assert respuesta.mimetype == 'application/json'
+    assert respuesta.get_data() == '{"importe":"1.5","nombre":"José"}\n'.encode('utf-8')
+    assert app.json.loads('{"a": [1, 2]}') == {'a': [1, 2]}
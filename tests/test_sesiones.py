@@ -0,0 +1,111 @@
+"""
+Pruebas de los tokens de sesión firmados (core/sesiones.py)
+"""
+
+import sys
+import os
+import time
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import Flask, jsonify
+from core import sesiones
+from config import get_config
+
+# Claims de otro usuario con la firma del token original
+_OTROS_CLAIMS = sesiones._b64(b'{"sub":"eva@ttoca.test","exp":9999999999}')
+
+@pytest.fixture(autouse=True)
+def claves(monkeypatch):
+    config = get_config()
+    monkeypatch.setattr(config, 'SECRET_KEY', 'clave-actual')
+    monkeypatch.setattr(config, 'SECRET_KEYS_ANTERIORES', [])
+    sesiones._cache.clear()
+    sesiones._propietarios.clear()
+    yield config
+    sesiones._cache.clear()
+    sesiones._propietarios.clear()
+
+def test_token_firmado_se_verifica():
+    token, expira = sesiones.emitir_token('ana@ttoca.test')
+    claims = sesiones.verificar_token(token)
+    assert claims['sub'] == 'ana@ttoca.test'
+    assert claims['exp'] == expira
+
+def test_token_expirado_se_rechaza(claves, monkeypatch):
+    monkeypatch.setattr(claves, 'SESION_DURACION_SEGUNDOS', -1)
+    token, _ = sesiones.emitir_token('ana@ttoca.test')
+    assert sesiones.verificar_token(token) is None
+
+def test_token_expirado_en_cache_se_rechaza(monkeypatch):
+    token, expira = sesiones.emitir_token('ana@ttoca.test')
+    assert sesiones.verificar_token(token) is not None
+    monkeypatch.setattr(time, 'time', lambda: expira + 1)
+    assert sesiones.verificar_token(token) is None
+    assert token not in sesiones._cache
+
+@pytest.mark.parametrize('alterar', [
+    lambda kid, cuerpo, firma: f"{kid}.{_OTROS_CLAIMS}.{firma}",
+    lambda kid, cuerpo, firma: f"{kid}.{cuerpo}.{firma[:-2]}AA",
+    lambda kid, cuerpo, firma: f"{kid}.{cuerpo}",
+    lambda kid, cuerpo, firma: 'basura',
+])
+def test_token_manipulado_se_rechaza(alterar):
+    token, _ = sesiones.emitir_token('ana@ttoca.test')
+    assert sesiones.verificar_token(alterar(*token.split('.'))) is None
+
+def test_rotacion_de_clave(claves, monkeypatch):
+    token, _ = sesiones.emitir_token('ana@ttoca.test')
+
+    # Clave nueva: el token antiguo sigue valiendo mientras la anterior esté configurada
+    monkeypatch.setattr(claves, 'SECRET_KEY', 'clave-nueva')
+    monkeypatch.setattr(claves, 'SECRET_KEYS_ANTERIORES', ['clave-actual'])
+    sesiones._cache.clear()
+    assert sesiones.verificar_token(token)['sub'] == 'ana@ttoca.test'
+    nuevo, _ = sesiones.emitir_token('ana@ttoca.test')
+    assert nuevo.split('.')[0] != token.split('.')[0]
+
+    # Retirada la clave anterior, sus tokens dejan de valer
+    monkeypatch.setattr(claves, 'SECRET_KEYS_ANTERIORES', [])
+    sesiones._cache.clear()
+    assert sesiones.verificar_token(token) is None
+    assert sesiones.verificar_token(nuevo) is not None
+
+@pytest.fixture
+def cliente(claves, monkeypatch):
+    monkeypatch.setattr(claves, 'AUTH_REQUERIDA', True)
+    app = Flask(__name__)
+
+    @app.route('/usuarios/<email>')
+    @sesiones.requiere_sesion(usuario='email')
+    def usuario(email):
+        return jsonify({'ok': True})
+
+    @app.route('/empresas/<id_empresa>')
+    @sesiones.requiere_sesion(empresa='id_empresa')
+    def empresa(id_empresa):
+        return jsonify({'ok': True})
+
+    sesiones._propietarios['emp1'] = 'ana@ttoca.test'
+    return app.test_client()
+
+def _cabecera(email):
+    return {'Authorization': f"Bearer {sesiones.emitir_token(email)[0]}"}
+
+def test_requiere_sesion_sin_token_devuelve_401(cliente):
+    assert cliente.get('/usuarios/ana@ttoca.test').status_code == 401
+    assert cliente.get('/empresas/emp1', headers={'Authorization': 'Bearer basura'}).status_code == 401
+
+def test_requiere_sesion_de_otro_usuario_devuelve_403(cliente):
+    assert cliente.get('/usuarios/ana@ttoca.test', headers=_cabecera('eva@ttoca.test')).status_code == 403
+    assert cliente.get('/empresas/emp1', headers=_cabecera('eva@ttoca.test')).status_code == 403
+
+def test_requiere_sesion_del_propietario_pasa(cliente):
+    assert cliente.get('/usuarios/ana@ttoca.test', headers=_cabecera('ana@ttoca.test')).status_code == 200
+    assert cliente.get('/empresas/emp1', headers=_cabecera('ana@ttoca.test')).status_code == 200
+
+def test_sin_auth_requerida_no_se_comprueba(cliente, claves, monkeypatch):
+    monkeypatch.setattr(claves, 'AUTH_REQUERIDA', False)
+    assert cliente.get('/empresas/emp1').status_code == 200
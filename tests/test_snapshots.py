@@ -0,0 +1,107 @@
+"""
+Pruebas de la caché de snapshots con una sola lectura por cola (core/snapshots.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+import eventlet
+import pytest
+from core import snapshots
+from services import cola_service
+from config import get_config
+
+@pytest.fixture
+def lecturas(bd, monkeypatch):
+    """Cuenta las lecturas de la lista de turnos; cada una cede el control un momento"""
+    contador = {'n': 0}
+
+    def obtener_turnos(empresa_id, cola_id):
+        contador['n'] += 1
+        eventlet.sleep(0.05)
+        return []
+
+    monkeypatch.setattr(cola_service, 'obtener_turnos', obtener_turnos)
+    monkeypatch.setattr(cola_service, 'obtener_turno_actual', lambda empresa_id, cola_id: None)
+    # Como bajo eventlet: los clientes que llegan durante la carga esperan su resultado
+    monkeypatch.setattr(snapshots, 'hilos', SimpleNamespace(activo=lambda: True))
+    snapshots._cache.clear()
+    yield contador
+    snapshots._cache.clear()
+
+def test_uniones_simultaneas_hacen_una_sola_lectura(lecturas):
+    pool = eventlet.GreenPool()
+    resultados = list(pool.imap(lambda _: snapshots.snapshot_cola('emp1', 'cola1'), range(20)))
+
+    assert lecturas['n'] == 1
+    assert all(resultado is resultados[0] for resultado in resultados)
+    assert snapshots.estadisticas()['esperas'] >= 19
+
+def test_un_cambio_en_la_cola_invalida_la_entrada(lecturas):
+    snapshots.snapshot_cola('emp1', 'cola1')
+    snapshots.snapshot_cola('emp1', 'cola1')
+    assert lecturas['n'] == 1
+
+    cola_service.agregar_turno('emp1', 'cola1', {'nombre': 'Ana'})
+    snapshot = snapshots.snapshot_cola('emp1', 'cola1')
+    assert lecturas['n'] == 2
+    assert snapshot['version'] > 0
+
+def test_sin_eventlet_los_hilos_comparten_la_lectura(lecturas, monkeypatch):
+    # Modo ASGI: los clientes llegan desde hilos del executor y esperan con Events nativos
+    monkeypatch.setattr(snapshots, 'hilos', SimpleNamespace(activo=lambda: False))
+
+    def obtener_turnos(empresa_id, cola_id):
+        lecturas['n'] += 1
+        time.sleep(0.05)
+        return []
+
+    monkeypatch.setattr(cola_service, 'obtener_turnos', obtener_turnos)
+    resultados = []
+    hilos = [
+        threading.Thread(target=lambda: resultados.append(snapshots.snapshot_cola('emp1', 'cola1')))
+        for _ in range(10)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert lecturas['n'] == 1
+    assert len(resultados) == 10 and all(resultado is resultados[0] for resultado in resultados)
+    assert snapshots._cargando == {}
+
+def test_las_salas_inexistentes_no_se_guardan(lecturas):
+    snapshots.snapshot_cola('emp1', 'inventada')
+    snapshots.snapshot_cola('otra', 'cola1')
+    assert list(snapshots._cache) == []
+
+def test_la_cache_descarta_las_salas_menos_usadas(lecturas, monkeypatch):
+    monkeypatch.setattr(get_config(), 'WS_SNAPSHOT_MAX_ENTRADAS', 1)
+    snapshots.snapshot_cola('emp1', 'cola1')
+    snapshots.snapshot_cola('emp1', 'cola2')
+    assert list(snapshots._cache) == [('cola', 'emp1', 'cola2')]
+
+def test_asgi_uniones_simultaneas_hacen_una_sola_lectura():
+    from core.websocket_asgi import _una_vez
+
+    contador = {'n': 0}
+
+    def cargar():
+        contador['n'] += 1
+        time.sleep(0.05)
+        return {'turnos': []}
+
+    async def unir():
+        return await asyncio.gather(*(_una_vez(('cola', 'emp1', 'cola1'), cargar) for _ in range(20)))
+
+    resultados = asyncio.run(unir())
+    assert contador['n'] == 1
+    assert all(resultado is resultados[0] for resultado in resultados)
@@ -0,0 +1,59 @@
+"""
+Pruebas de las suscripciones SSE (core/sse.py, api/sse.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import Flask
+from api.sse import sse_bp
+from core import sse
+
+@pytest.fixture
+def limpio():
+    sse._suscriptores.clear()
+    sse._buffers.clear()
+    yield
+    sse._suscriptores.clear()
+    sse._buffers.clear()
+
+def test_un_flujo_no_consumido_no_queda_suscrito(limpio):
+    flujo = sse.suscribir('queue_emp1_cola1')
+    assert sse._suscriptores == {}
+    flujo.close()
+    assert sse._suscriptores == {}
+
+def test_al_cerrar_el_flujo_se_desuscribe(limpio):
+    flujo = sse.suscribir('queue_emp1_cola1', snapshot=lambda: ('queue_snapshot', {'turnos': []}))
+    assert next(flujo).startswith('retry:')
+    assert len(sse._suscriptores['queue_emp1_cola1']) == 1
+
+    sse.difundir('queue_delta', {'seq': 1}, 'queue_emp1_cola1')
+    assert 'event: queue_snapshot' in next(flujo)
+    assert 'event: queue_delta' in next(flujo)
+
+    flujo.close()
+    assert sse._suscriptores == {}
+    # El historial se conserva para las reconexiones con Last-Event-ID
+    assert 'queue_emp1_cola1' in sse._buffers
+
+def test_salas_inexistentes_responden_404(bd, limpio):
+    app = Flask(__name__)
+    app.register_blueprint(sse_bp, url_prefix='/api')
+    cliente = app.test_client()
+
+    assert cliente.get('/api/proyectos/emp1/cola/nada/eventos').status_code == 404
+    assert cliente.get('/api/proyectos/otra/cola/cola1/eventos').status_code == 404
+    assert cliente.get('/api/proyectos/otra/eventos').status_code == 404
+    assert sse._buffers == {}
+
+    respuesta = cliente.get('/api/proyectos/emp1/cola/cola1/eventos', buffered=False)
+    assert respuesta.status_code == 200
+    assert next(respuesta.response).startswith(b'retry:')
+    respuesta.close()
+    assert list(sse._buffers) == ['queue_emp1_cola1']
+    assert sse._suscriptores == {}
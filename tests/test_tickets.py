@@ -0,0 +1,101 @@
+"""
+Pruebas de las posiciones de los turnos seguidos individualmente (core/tickets.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from core import tickets
+from services.cola_service import agregar_turno, siguiente_turno, obtener_turno_por_codigo
+
+@pytest.fixture
+def turnos(bd):
+    """Cuatro turnos en espera en emp1/cola1 (tiempo estimado de 5 minutos)"""
+    creados = [agregar_turno('emp1', 'cola1', {'nombre': nombre}) for nombre in ('Ana', 'Luis', 'Eva', 'Sara')]
+    yield creados
+    tickets._suscripciones.clear()
+    tickets._por_sid.clear()
+
+def _suscribir(sid, turno, avisos=()):
+    return tickets.suscribir(sid, obtener_turno_por_codigo(turno['codigo']), avisos)
+
+def _mensajes():
+    return {turno_id: (mensaje, critico) for turno_id, mensaje, critico in tickets.recalcular('emp1', 'cola1')}
+
+def test_suscribir_devuelve_la_posicion_actual(turnos):
+    assert _suscribir('sid1', turnos[2]) == {
+        'turnoId': turnos[2]['id'], 'codigo': turnos[2]['codigo'], 'posicion': 3, 'etaMinutos': 15
+    }
+
+def test_recalcular_tras_una_llamada(turnos):
+    _suscribir('sid1', turnos[2])
+    _suscribir('sid2', turnos[3])
+
+    siguiente_turno('emp1', 'cola1')
+    mensajes = _mensajes()
+    assert mensajes[turnos[2]['id']] == (
+        {'turnoId': turnos[2]['id'], 'codigo': turnos[2]['codigo'], 'posicion': 2, 'etaMinutos': 10}, False
+    )
+    assert mensajes[turnos[3]['id']] == (
+        {'turnoId': turnos[3]['id'], 'codigo': turnos[3]['codigo'], 'posicion': 3, 'etaMinutos': 15}, False
+    )
+
+def test_aviso_al_alcanzar_la_posicion(turnos):
+    # Alcanzar una posición de aviso es un mensaje crítico, y solo se avisa una vez
+    _suscribir('sid1', turnos[3], avisos=[2])
+
+    siguiente_turno('emp1', 'cola1')
+    mensaje, critico = _mensajes()[turnos[3]['id']]
+    assert (mensaje['posicion'], critico) == (3, False)
+    assert 'aviso' not in mensaje
+
+    siguiente_turno('emp1', 'cola1')
+    mensaje, critico = _mensajes()[turnos[3]['id']]
+    assert (mensaje['posicion'], mensaje['aviso'], critico) == (2, 2, True)
+
+    siguiente_turno('emp1', 'cola1')
+    mensaje, critico = _mensajes()[turnos[3]['id']]
+    assert (mensaje['posicion'], critico) == (1, False)
+    assert 'aviso' not in mensaje
+
+def test_turno_llamado_recibe_su_ultimo_mensaje(turnos):
+    _suscribir('sid1', turnos[0])
+    _suscribir('sid2', turnos[1])
+
+    siguiente_turno('emp1', 'cola1')
+    mensajes = _mensajes()
+    mensaje, critico = mensajes[turnos[0]['id']]
+    assert (mensaje['posicion'], mensaje['etaMinutos'], mensaje['llamado'], critico) == (0, 0, True, True)
+    assert mensajes[turnos[1]['id']][0]['posicion'] == 1
+
+    # El turno llamado deja de estar suscrito; el resto sigue
+    assert turnos[0]['id'] not in tickets._suscripciones[('emp1', 'cola1')]
+    assert tickets._por_sid == {'sid2': {('emp1', 'cola1', turnos[1]['id'])}}
+
+def test_sin_cambios_de_posicion_no_hay_mensajes(turnos):
+    _suscribir('sid1', turnos[3])
+    assert tickets.recalcular('emp1', 'cola1') == []
+
+def test_leer_avisos():
+    assert tickets.leer_avisos(None) == ()
+    assert tickets.leer_avisos([3, 1]) == (3, 1)
+    for invalido in (3, 'abc', {'a': 1}, [0], [True], ['2'], list(range(1, 20))):
+        assert tickets.leer_avisos(invalido) is None
+
+def _recibidos(ws, evento):
+    return [mensaje['args'][0] for mensaje in ws.get_received() if mensaje['name'] == evento]
+
+def test_join_ticket_con_datos_invalidos_responde_error(turnos, ws):
+    for datos in ('ABC', 3, {'codigo': 5}, {'codigo': turnos[0]['codigo'], 'avisos': 3},
+                  {'codigo': turnos[0]['codigo'], 'avisos': 'abc'}):
+        ws.emit('join_ticket', datos)
+        errores = _recibidos(ws, 'error')
+        assert len(errores) == 1, datos
+    assert tickets._suscripciones == {}
+
+    ws.emit('join_ticket', {'codigo': turnos[1]['codigo'].lower(), 'avisos': [1]})
+    assert _recibidos(ws, 'posicion_turno')[0]['posicion'] == 2
@@ -0,0 +1,88 @@
+"""
+Pruebas de los límites de las llamadas RPC por Socket.IO (core/websocket.py)
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from core import connections, limites, websocket
+from config import get_config
+
+@pytest.fixture
+def config(monkeypatch):
+    config = get_config()
+    monkeypatch.setattr(config, 'AUTH_REQUERIDA', False)
+    # Ritmos casi nulos: los cubos no se rellenan durante la prueba
+    monkeypatch.setattr(config, 'WS_RPC_POR_SEGUNDO', 0.01)
+    monkeypatch.setattr(config, 'WS_RPC_RAFAGA', 3)
+    limites._cubos.clear()
+    yield config
+    limites._cubos.clear()
+
+def _emitir_turno(ws, nombre='Ana'):
+    return ws.emit('issue_ticket', {'empresaId': 'emp1', 'colaId': 'cola1', 'nombre': nombre}, callback=True)
+
+def test_rpc_limitado_por_conexion(ws, config):
+    respuestas = [_emitir_turno(ws, f'T{i}') for i in range(4)]
+    assert [respuesta['ok'] for respuesta in respuestas] == [True, True, True, False]
+    assert respuestas[-1]['error'] == 'Demasiadas solicitudes'
+    assert respuestas[-1]['retryAfterMs'] == pytest.approx(100000, abs=100)
+    assert connections.estadisticas()['rechazos']['rpc'] >= 1
+
+    # Los datos inválidos también gastan cupo, pero no llegan al handler
+    assert ws.emit('call_next', 'no es un dict', callback=True)['error'] == 'Demasiadas solicitudes'
+
+def test_datos_invalidos_en_rpc(ws, config):
+    assert ws.emit('issue_ticket', ['lista'], callback=True) == {'ok': False, 'error': 'Datos inválidos'}
+    assert ws.emit('call_next', {'empresaId': 'emp1'}, callback=True) == {
+        'ok': False, 'error': 'empresaId y colaId son requeridos'
+    }
+
+def test_rpc_rechazado_por_los_limites_de_mutacion(ws, config, monkeypatch):
+    monkeypatch.setattr(config, 'MUTACIONES_POR_SEGUNDO_COLA', 0.01)
+    monkeypatch.setattr(config, 'MUTACIONES_RAFAGA_COLA', 1)
+    monkeypatch.setattr(config, 'WS_RPC_RAFAGA', 10)
+
+    assert _emitir_turno(ws)['ok']
+    respuesta = _emitir_turno(ws, 'Luis')
+    assert respuesta == {'ok': False, 'error': 'Demasiadas solicitudes', 'retryAfterMs': respuesta['retryAfterMs']}
+    assert respuesta['retryAfterMs'] == pytest.approx(100000, abs=100)
+    assert limites.estadisticas()['rechazos']['mutacion-cola'] >= 1
+
+    # La llamada comparte el cubo de la cola con las altas
+    assert ws.emit('call_next', {'empresaId': 'emp1', 'colaId': 'cola1'}, callback=True)['ok'] is False
+    # Otra cola de la misma empresa sigue admitiendo
+    assert ws.emit('issue_ticket', {'empresaId': 'emp1', 'colaId': 'cola2', 'nombre': 'Eva'}, callback=True)['ok']
+
+def test_la_plaza_de_la_empresa_se_libera_al_salir_de_sus_salas(ws, config, monkeypatch):
+    monkeypatch.setattr(config, 'WS_MAX_CONEXIONES_POR_EMPRESA', 1)
+    otro = websocket.socketio.test_client(ws.app)
+    try:
+        ws.emit('join_empresa', {'empresaId': 'emp1'})
+        ws.emit('join_queue', {'empresaId': 'emp1', 'colaId': 'cola1'})
+        ws.get_received()
+        assert connections.estadisticas()['por_empresa'] == {'emp1': 1}
+
+        otro.emit('join_empresa', {'empresaId': 'emp1'})
+        assert [m['args'][0]['message'] for m in otro.get_received() if m['name'] == 'error'] == [
+            'Límite de conexiones de la empresa alcanzado'
+        ]
+
+        # Sigue en la sala de la cola: la plaza no se libera todavía
+        ws.emit('leave_empresa', {'empresaId': 'emp1'})
+        assert connections.estadisticas()['por_empresa'] == {'emp1': 1}
+        ws.emit('leave_queue', {'empresaId': 'emp1', 'colaId': 'cola1'})
+        assert connections.estadisticas()['por_empresa'] == {}
+
+        otro.emit('join_empresa', {'empresaId': 'emp1'})
+        assert 'joined_empresa' in [m['name'] for m in otro.get_received()]
+        # Desconectarse después de salir no descuenta dos veces
+        ws.disconnect()
+        assert connections.estadisticas()['por_empresa'] == {'emp1': 1}
+    finally:
+        otro.disconnect()
+    assert connections.estadisticas()['por_empresa'] == {}